@@ -0,0 +1,96 @@
+#壓縮檔輸出
+import io
+import os
+import tarfile
+import threading
+import time
+import zipfile
+
+# 已經是壓縮格式的圖片，再 deflate 幾乎沒有效果，直接以 STORED 存入
+STORED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+ARCHIVE_KINDS = ('zip', 'tar')
+
+
+def archive_kind_for(path):
+    """依副檔名判斷封存格式，無法判斷時預設為 zip。"""
+    lower = path.lower()
+    if lower.endswith('.tar'):
+        return 'tar'
+    return 'zip'
+
+
+class ArchiveWriter:
+    """
+    將編碼後的圖片直接串流寫入 ZIP 或 TAR 檔，不先寫到磁碟再打包。
+
+    可由多個工作執行緒同時呼叫 write_bytes；寫入以鎖保護，
+    每個成員依完成順序依序附加到封存檔。ZIP 一律允許 ZIP64，
+    因此檔案數超過 65535 或總大小超過 4GB 也能正確寫出。
+    """
+
+    def __init__(self, path, kind=None):
+        """
+        Args:
+            path (str): 封存檔輸出路徑。
+            kind (str): 'zip' 或 'tar'，None 表示依副檔名判斷。
+        """
+        self.path = path
+        self.kind = kind or archive_kind_for(path)
+        if self.kind not in ARCHIVE_KINDS:
+            raise ValueError(f"Unsupported archive type: {self.kind}")
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._names = set()
+        if self.kind == 'zip':
+            self._archive = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+        else:
+            self._archive = tarfile.open(path, 'w')
+
+    def _unique_name(self, name):
+        # 不同資料夾的同名檔案會產生相同的成員名稱，加上序號避免覆蓋
+        base, ext = os.path.splitext(name)
+        candidate = name
+        counter = 1
+        while candidate in self._names:
+            candidate = f"{base}_{counter}{ext}"
+            counter += 1
+        self._names.add(candidate)
+        return candidate
+
+    def write_bytes(self, name, data):
+        """
+        寫入一個成員。
+
+        Returns:
+            str: 實際使用的成員名稱（重複時會加上序號）。
+        """
+        compress_type = zipfile.ZIP_STORED if name.lower().endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+        with self._lock:
+            arcname = self._unique_name(name)
+            if self.kind == 'zip':
+                info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+                info.compress_type = compress_type
+                info.external_attr = 0o644 << 16
+                self._archive.writestr(info, data)
+            else:
+                info = tarfile.TarInfo(arcname)
+                info.size = len(data)
+                info.mtime = int(time.time())
+                info.mode = 0o644
+                self._archive.addfile(info, io.BytesIO(data))
+        return arcname
+
+    def close(self):
+        with self._lock:
+            if self._archive is not None:
+                self._archive.close()
+                self._archive = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,359 @@
+#效能基準測試
+"""
+圖片處理流程的基準測試。
+
+即時產生合成圖片（JPEG/PNG/WEBP/GIF，縮圖到 100MP，RGB/RGBA/調色盤模式），
+對 ImageProcessor.process_batch 在不同輸出格式、品質、縮放與執行緒數的組合下
+量測吞吐量、每張圖片延遲的分位數與峰值 RSS，並可與儲存的基準比較。
+
+每個組合在獨立的子行程中執行，峰值 RSS 才不會被前一個組合影響。
+
+用法：
+    python benchmark.py --quick
+    python benchmark.py --save-baseline baseline.json
+    python benchmark.py --baseline baseline.json --threshold 0.15
+    python benchmark.py --presets            # 比較各編碼預設的編碼時間與輸出大小
+"""
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from PIL import Image, features # pyright: ignore[reportMissingImports]
+
+from image_processor import ImageProcessor
+from rotate_processor import Transpose
+from profiling import peak_rss_bytes
+from encoder_presets import PRESET_NAMES
+
+# 名稱 -> (寬, 高)
+SIZES = {
+    "thumb": (160, 120),
+    "small": (640, 480),
+    "hd": (1920, 1080),
+    "12mp": (4000, 3000),
+    "100mp": (12000, 8400),
+}
+SOURCE_FORMATS = ("JPEG", "PNG", "WEBP", "GIF")
+SOURCE_MODES = ("RGB", "RGBA", "P")
+EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+
+# 預設的測試矩陣
+DEFAULT_MATRIX = {
+    "output_format": ["JPEG", "WEBP", "PNG"],
+    "quality": [85],
+    "resize": ["none", "half", "max_edge_1024"],
+    "workers": [1, 4],
+}
+QUICK_MATRIX = {
+    "output_format": ["JPEG"],
+    "quality": [85],
+    "resize": ["none", "half"],
+    "workers": [1, 4],
+}
+# 編碼預設模式：同一批圖片以各預設編碼，比較 CPU 時間與輸出大小
+PRESET_MATRIX = {
+    "output_format": ["JPEG", "WEBP", "PNG"] + (["AVIF"] if features.check("avif") else []),
+    "quality": [85],
+    "resize": ["none"],
+    "workers": [4],
+    "encoder_preset": list(PRESET_NAMES),
+}
+RESIZE_PRESETS = {
+    "none": {"type": "none"},
+    "half": {"type": "scale", "value": 50},
+    "max_edge_1024": {"type": "max_edge", "value": 1024, "no_enlarge": True},
+}
+
+
+def synthetic_image(size, mode, seed=0):
+    """
+    產生可重現的合成圖片：漸層加上雜訊與色塊，壓縮特性接近一般照片。
+    """
+    width, height = size
+    gradient = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise(size, 40 + seed % 20)
+    red = Image.blend(gradient, noise, 0.35)
+    green = gradient.transpose(Transpose.FLIP_LEFT_RIGHT)
+    blue = Image.blend(noise, gradient.rotate(90, expand=False), 0.5)
+    img = Image.merge("RGB", (red, green, blue))
+    # 幾個不透明色塊，讓邊緣與平坦區域都存在
+    for i in range(4):
+        box = (width * i // 5, height * i // 6, width * (i + 1) // 5, height * (i + 2) // 6)
+        img.paste(((60 * i + seed) % 256, 200 - 40 * i, 80 + 30 * i), box)
+
+    if mode == "RGBA":
+        alpha = gradient.point(lambda v: 128 + v // 2)
+        img.putalpha(alpha)
+    elif mode == "P":
+        img = img.quantize(colors=128)
+    return img
+
+
+def build_corpus(directory, sizes, formats, modes, count=1):
+    """
+    在 directory 中建立合成圖片，已存在的檔案會直接沿用。
+
+    Returns:
+        list: 檔案路徑。
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for size_name, fmt, mode, index in itertools.product(sizes, formats, modes, range(count)):
+        if fmt == "JPEG" and mode != "RGB":
+            continue # JPEG 不支援透明度與調色盤
+        if fmt == "GIF" and mode == "RGBA":
+            continue
+        # 檔名主體包含來源格式：輸出檔名只替換副檔名，不同來源格式不能寫到同一個輸出檔
+        path = os.path.join(directory, f"{size_name}_{mode}_{fmt.lower()}_{index}.{EXTENSIONS[fmt]}")
+        if not os.path.exists(path):
+            img = synthetic_image(SIZES[size_name], mode, seed=index)
+            save_options = {"quality": 90} if fmt in ("JPEG", "WEBP") else {}
+            img.save(path, format=fmt, **save_options)
+        paths.append(path)
+    return paths
+
+
+def percentile(values, q):
+    """以線性內插計算分位數 (q 為 0-100)。"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def run_config(config, corpus, repeat=1):
+    """
+    在目前行程中執行一個組合，回傳量測結果。
+    應在獨立子行程中呼叫，峰值 RSS 才只反映這個組合。
+    """
+    processor = ImageProcessor()
+    latencies = []
+    failures = []
+    output_bytes = []
+    megapixels = 0.0
+    for path in corpus:
+        with Image.open(path) as img:
+            megapixels += img.width * img.height / 1e6
+
+    def on_progress(data):
+        if data.get("status") == "success":
+            latencies.append(data["duration"])
+            output_bytes.append(data.get("compressed_size") or 0)
+        elif data.get("status") == "failure":
+            failures.append(data.get("message"))
+
+    wall = 0.0
+    with tempfile.TemporaryDirectory() as output_dir:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            processor.process_batch(
+                corpus,
+                output_dir,
+                config["output_format"],
+                quality=config["quality"],
+                resize_options=RESIZE_PRESETS[config["resize"]],
+                progress_callback=on_progress,
+                max_workers=config["workers"],
+                encoder_preset=config.get("encoder_preset"),
+            )
+            wall += time.perf_counter() - start
+
+    files = len(corpus) * repeat
+    return {
+        "config": config,
+        "files": files,
+        "failures": len(failures),
+        "failure_messages": failures[:5],
+        "wall_time": wall,
+        "files_per_sec": files / wall if wall else None,
+        "megapixels_per_sec": megapixels * repeat / wall if wall else None,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "output_bytes": sum(output_bytes) // repeat,
+    }
+
+
+def config_id(config):
+    key = "{output_format}-q{quality}-{resize}-w{workers}".format(**config)
+    # 沒有編碼預設的組合沿用原本的名稱，既有的基準檔仍可比較
+    if config.get("encoder_preset"):
+        key += f"-{config['encoder_preset']}"
+    return key
+
+
+def expand_matrix(matrix):
+    keys = list(matrix)
+    for values in itertools.product(*(matrix[k] for k in keys)):
+        yield dict(zip(keys, values))
+
+
+def run_in_subprocess(config, corpus, repeat):
+    """以新的 Python 行程執行單一組合，隔離記憶體量測。"""
+    payload = json.dumps({"config": config, "corpus": corpus, "repeat": repeat})
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-config", "-"],
+        input=payload, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{config_id(config)} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """
+    與基準比較：吞吐量下降或 p95 延遲上升超過 threshold（比例）即視為退化。
+
+    Returns:
+        list: 退化項目的說明文字；空列表表示通過。
+    """
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        if base.get("files_per_sec") and current.get("files_per_sec"):
+            change = current["files_per_sec"] / base["files_per_sec"] - 1
+            if change < -threshold:
+                regressions.append(f"{key}: throughput {change:+.1%} ({base['files_per_sec']:.2f} -> {current['files_per_sec']:.2f} files/s)")
+        if base.get("latency_p95") and current.get("latency_p95"):
+            change = current["latency_p95"] / base["latency_p95"] - 1
+            if change > threshold:
+                regressions.append(f"{key}: p95 latency {change:+.1%} ({base['latency_p95'] * 1000:.1f} -> {current['latency_p95'] * 1000:.1f} ms)")
+        if base.get("output_bytes") and current.get("output_bytes"):
+            change = current["output_bytes"] / base["output_bytes"] - 1
+            if change > threshold:
+                regressions.append(f"{key}: output size {change:+.1%} ({base['output_bytes']} -> {current['output_bytes']} bytes)")
+        if current.get("failures"):
+            regressions.append(f"{key}: {current['failures']} files failed")
+    return regressions
+
+
+def _ms(value):
+    return f"{value * 1000:.1f}" if value is not None else "-"
+
+
+def _rate(value):
+    return f"{value:.2f}" if value is not None else "-"
+
+
+def print_table(results):
+    header = f"{'config':<40}{'files/s':>10}{'MP/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RSS MB':>10}{'out MB':>10}"
+    print(header)
+    print("-" * len(header))
+    for key, r in results.items():
+        rss = r["peak_rss_bytes"] / (1024 * 1024) if r.get("peak_rss_bytes") else float("nan")
+        out = r.get("output_bytes", 0) / (1024 * 1024)
+        print(f"{key:<40}{_rate(r['files_per_sec']):>10}{_rate(r['megapixels_per_sec']):>10}"
+              f"{_ms(r['latency_p50']):>10}{_ms(r['latency_p95']):>10}{_ms(r['latency_p99']):>10}{rss:>10.1f}{out:>10.2f}")
+
+
+def print_preset_tradeoff(results):
+    """
+    以 balanced 為基準，列出同一組合下各編碼預設的時間與輸出大小比例。
+    """
+    groups = {}
+    for r in results.values():
+        config = dict(r["config"])
+        preset = config.pop("encoder_preset", None)
+        if preset:
+            groups.setdefault(config_id(config), {})[preset] = r
+    if not groups:
+        return
+    print(f"\n{'config':<32}{'preset':>10}{'time':>10}{'size':>10}")
+    for key, by_preset in groups.items():
+        base = by_preset.get("balanced")
+        for preset in PRESET_NAMES:
+            r = by_preset.get(preset)
+            if not r:
+                continue
+            if base and base["wall_time"] and base["output_bytes"]:
+                time_ratio = f"{r['wall_time'] / base['wall_time']:.2f}x"
+                size_ratio = f"{r['output_bytes'] / base['output_bytes']:.2f}x"
+            else:
+                time_ratio = size_ratio = "-"
+            print(f"{key:<32}{preset:>10}{time_ratio:>10}{size_ratio:>10}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ImageProcessor 效能基準測試")
+    parser.add_argument("--quick", action="store_true", help="使用小型語料與精簡矩陣")
+    parser.add_argument("--sizes", default=None, help=f"逗號分隔的尺寸：{','.join(SIZES)}")
+    parser.add_argument("--formats", default=None, help="逗號分隔的來源格式")
+    parser.add_argument("--modes", default=None, help="逗號分隔的來源模式 (RGB,RGBA,P)")
+    parser.add_argument("--count", type=int, default=2, help="每種組合產生的圖片數量")
+    parser.add_argument("--workers", default=None, help="逗號分隔的執行緒數，覆寫矩陣")
+    parser.add_argument("--presets", nargs="?", const=",".join(PRESET_NAMES), default=None,
+                        help="比較編碼預設（逗號分隔，預設為全部），使用編碼預設矩陣")
+    parser.add_argument("--repeat", type=int, default=1, help="每個組合重複執行次數")
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "imagebatcher_bench_corpus"))
+    parser.add_argument("--output", help="把結果寫入 JSON 檔")
+    parser.add_argument("--save-baseline", help="把結果存為基準檔")
+    parser.add_argument("--baseline", help="與此基準檔比較")
+    parser.add_argument("--threshold", type=float, default=0.15, help="允許的退化比例 (預設 0.15)")
+    parser.add_argument("--run-config", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # 子行程模式：從 stdin 讀取組合並輸出一行 JSON 結果
+    if args.run_config:
+        job = json.load(sys.stdin if args.run_config == "-" else open(args.run_config))
+        print(json.dumps(run_config(job["config"], job["corpus"], job["repeat"])))
+        return 0
+
+    sizes = args.sizes.split(",") if args.sizes else (["thumb", "small"] if args.quick else ["thumb", "small", "hd", "12mp"])
+    formats = args.formats.split(",") if args.formats else list(SOURCE_FORMATS)
+    modes = args.modes.split(",") if args.modes else (["RGB"] if args.quick else list(SOURCE_MODES))
+    if args.presets:
+        matrix = dict(PRESET_MATRIX, encoder_preset=args.presets.split(","))
+        if args.quick:
+            matrix["output_format"] = ["JPEG", "WEBP"]
+    else:
+        matrix = dict(QUICK_MATRIX if args.quick else DEFAULT_MATRIX)
+    if args.workers:
+        matrix["workers"] = [int(w) for w in args.workers.split(",")]
+
+    corpus = build_corpus(args.corpus_dir, sizes, formats, modes, count=args.count)
+    print(f"語料：{len(corpus)} 張圖片 ({', '.join(sizes)}) 於 {args.corpus_dir}")
+
+    results = {}
+    for config in expand_matrix(matrix):
+        key = config_id(config)
+        results[key] = run_in_subprocess(config, corpus, args.repeat)
+    print_table(results)
+    print_preset_tradeoff(results)
+
+    report = {"python": sys.version.split()[0], "sizes": sizes, "formats": formats, "modes": modes, "results": results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+        regressions = compare_with_baseline(results, baseline, args.threshold)
+        if regressions:
+            print("\n退化：")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\n與基準比較通過（門檻 {args.threshold:.0%}）。")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
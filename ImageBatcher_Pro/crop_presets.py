@@ -0,0 +1,48 @@
+#裁剪預設
+import json
+import os
+
+# 使用者設定資料夾，裁剪預設以 JSON 保存，可跨次啟動沿用
+PRESET_DIR = os.path.join(os.path.expanduser("~"), ".imagebatcher_pro")
+CROP_PRESETS_PATH = os.path.join(PRESET_DIR, "crop_presets.json")
+
+
+def load_crop_presets(path=CROP_PRESETS_PATH):
+    """
+    讀取所有裁剪預設。
+
+    Returns:
+        dict: 預設名稱 -> 裁剪選項 (與 ImageProcessor 的 crop_options 格式相同)。
+              檔案不存在或內容損毀時回傳空字典。
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            presets = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return presets if isinstance(presets, dict) else {}
+
+
+def _write_presets(presets, path):
+    # 先寫入暫存檔再取代，避免寫到一半時損毀原本的預設
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(presets, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def save_crop_preset(name, crop_options, path=CROP_PRESETS_PATH):
+    """新增或覆寫一個裁剪預設。"""
+    presets = load_crop_presets(path)
+    presets[name] = crop_options
+    _write_presets(presets, path)
+    return presets
+
+
+def delete_crop_preset(name, path=CROP_PRESETS_PATH):
+    """刪除一個裁剪預設，不存在時不做任何事。"""
+    presets = load_crop_presets(path)
+    if presets.pop(name, None) is not None:
+        _write_presets(presets, path)
+    return presets
@@ -0,0 +1,96 @@
+#資料夾掃描
+import os
+
+# 批次引擎能處理的圖片副檔名（小寫）
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.gif', '.tif', '.tiff')
+
+
+def iter_image_files(root, recursive=True, extensions=IMAGE_EXTENSIONS, skip_hidden=True, follow_symlinks=False):
+    """
+    以 os.scandir 逐一產生資料夾中的圖片路徑，找到就立即 yield，
+    呼叫端不必等整個資料夾樹掃描完成即可開始處理。
+
+    每個資料夾內依名稱排序，子資料夾在該資料夾的檔案之後依序展開（深度優先）。
+    scandir 的 DirEntry 已帶有檔案類型，大多數平台上不需額外的 stat 呼叫。
+
+    Args:
+        root (str): 起始資料夾。
+        recursive (bool): 是否包含子資料夾。
+        extensions (tuple): 要納入的副檔名（小寫）。
+        skip_hidden (bool): 是否略過以 "." 開頭的檔案與資料夾。
+        follow_symlinks (bool): 是否進入符號連結指向的資料夾。
+
+    Yields:
+        str: 標準化後的檔案路徑。
+    """
+    stack = [os.path.normpath(root)]
+    visited = set()
+    while stack:
+        directory = stack.pop()
+        if follow_symlinks:
+            # 避免符號連結造成的循環
+            real = os.path.realpath(directory)
+            if real in visited:
+                continue
+            visited.add(real)
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue # 沒有權限或資料夾已被移除
+
+        subdirs = []
+        for entry in entries:
+            if skip_hidden and entry.name.startswith('.'):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=follow_symlinks):
+                    if recursive:
+                        subdirs.append(entry.path)
+                elif entry.name.lower().endswith(extensions) and entry.is_file(follow_symlinks=True):
+                    yield entry.path
+            except OSError:
+                continue
+        # 反向放入堆疊，讓子資料夾依名稱順序展開
+        stack.extend(reversed(subdirs))
+
+
+class FileIndex:
+    """
+    保持加入順序的去重索引（以 dict 作為有序集合）。
+
+    成員判斷與加入都是 O(1)，加入檔案時不需重新排序整個列表。
+    路徑以 normcase + abspath 比對，同一檔案的不同寫法只會保留第一次加入的路徑。
+    """
+
+    def __init__(self, paths=()):
+        self._paths = {}
+        for path in paths:
+            self.add(path)
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def add(self, path):
+        """加入路徑，回傳是否為新的檔案。"""
+        key = self._key(path)
+        if key in self._paths:
+            return False
+        self._paths[key] = path
+        return True
+
+    def discard(self, path):
+        self._paths.pop(self._key(path), None)
+
+    def clear(self):
+        self._paths.clear()
+
+    def __contains__(self, path):
+        return self._key(path) in self._paths
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __iter__(self):
+        return iter(self._paths.values())
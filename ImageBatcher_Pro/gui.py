@@ -1,26 +1,60 @@
 # 裁剪圖片，旋轉圖片
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog
 import os
+import sys
+import subprocess
 import threading
+import queue
 import datetime
-import zipfile
 import time
-from PIL import Image, ImageTk, ImageSequence # type: ignore
+from PIL import Image, ImageTk, ImageSequence, features # type: ignore
 from ttkthemes import ThemedTk # type: ignore
 
-# 從 image_processor 模組匯入 ImageProcessor 類別
-from image_processor import ImageProcessor
+# 從 image_processor 模組匯入 ImageProcessor 類別與依 EXIF 方向轉正的載入函式
+from image_processor import ImageProcessor, open_oriented_image, load_oriented_thumbnail
 # 從 conversion_handler 模組匯入執行緒轉換函式
 from conversion_handler import run_conversion_in_thread
+# 從 rotate_processor 模組匯入 RotateProcessor 類別與旋轉方法對照表
+from rotate_processor import RotateProcessor, ROTATE_METHODS
 # 從 video_processor 模組匯入 VideoProcessor 類別
-from video_processor import VideoProcessor
+from video_processor import VideoProcessor, VideoSessionPool
+# 從 crop_presets 模組匯入裁剪預設的讀寫函式
+from crop_presets import load_crop_presets, save_crop_preset
+# 從 profiling 模組匯入批次效能分析
+from profiling import BatchProfile
+# 從 smart_crop 模組匯入自動裁剪分析
+from smart_crop import analyze_batch as analyze_smart_crops
+# 從 memory_budget 模組匯入解碼記憶體預算
+from memory_budget import MemoryBudget
+# 從 image_probe 模組匯入只讀檔頭的圖片資訊探測
+from image_probe import probe_many, estimate_batch, format_size
+# 從 file_discovery 模組匯入資料夾掃描與去重索引
+from file_discovery import iter_image_files, FileIndex
+# 從 result_cache 模組匯入以內容雜湊為鍵的輸出快取
+from result_cache import ResultCache
+# 從 encoder_presets 模組匯入編碼預設
+from encoder_presets import QUALITY_FORMATS
 
 
 # 主應用程式類別，繼承自 ThemedTk 以使用主題
 class App(ThemedTk):
     """主要的 GUI 應用程式視窗。"""
 
+    # 批次裁剪的套用方式 -> crop_options 的 type
+    CROP_BATCH_MODES = {"像素": "absolute", "百分比": "percent", "比例": "aspect"}
+
+    # 批次縮放方式 -> resize_options 的 type
+    RESIZE_FIT_MODES = {"精確尺寸": "fixed", "放入範圍": "fit", "填滿並裁切": "fill", "限制最長邊": "max_edge"}
+
+    # 輸出方式 -> 封存檔副檔名（None 表示直接寫入資料夾）
+    OUTPUT_ARCHIVE_EXTENSIONS = {"資料夾": None, "ZIP 壓縮檔": ".zip", "TAR 封存檔": ".tar"}
+    # 編碼預設顯示名稱 -> encoder_presets 的預設名稱（None 表示維持原本的編碼參數）
+    ENCODER_PRESET_LABELS = {"預設": None, "快速": "fast", "平衡": "balanced", "最小檔案": "smallest"}
+
+    # 完成畫面最多列出的失敗檔案數
+    MAX_LISTED_FAILURES = 5
+
     def __init__(self):
         # --- 初始化視窗 ---
         super().__init__(theme="arc")
@@ -47,10 +81,15 @@ class App(ThemedTk):
 
         # --- 初始化變數 ---
         self.file_list = []
+        self._file_index = FileIndex() # 與 file_list 同步的去重索引
+        self._conversion_feed = None # 搜尋資料夾期間開始轉換時，把新找到的檔案交給批次引擎
         self.converted_files = []
         self.output_dir = ""
         self.processor = ImageProcessor()
         self.video_processor = VideoProcessor() # 初始化影片處理器
+        self.video_pool = VideoSessionPool(on_release=self._cancel_frame_count_scan) # 保留最近開啟的影片工作階段
+        self._frame_count_scans = {} # 影片路徑 -> 進行中掃描的取消事件
+        self.memory_budget = MemoryBudget() # 所有批次共用，同時進行的批次也不會超出記憶體
 
         self.file_list_frame = None
         self.file_list_frame = None
@@ -79,6 +118,7 @@ class App(ThemedTk):
         
         # 調整大小變數
         self.resize_image = None
+        self._resize_overlay = None # 尺寸資訊疊加層的畫布項目
 
 
 
@@ -138,6 +178,10 @@ class App(ThemedTk):
         self._create_home_dashboard()
         self._show_home()
 
+    def destroy(self):
+        """關閉視窗時釋放所有影片工作階段（同時取消進行中的影格數掃描）。"""
+        self.video_pool.release_all()
+        super().destroy()
 
     def _show_home(self):
         """顯示首頁儀表板"""
@@ -311,7 +355,8 @@ class App(ThemedTk):
     def _select_crop_images(self):
         files = filedialog.askopenfilenames(title="選擇圖片", filetypes=[("圖片檔案", "*.jpg *.jpeg *.png *.bmp *.webp *.gif")])
         if files:
-            # 這裡我們只取第一張圖片進行編輯
+            # 第一張圖片用於編輯裁剪框，全部圖片可用於批次裁剪
+            self._crop_files = [os.path.normpath(f) for f in files]
             self._crop_file_path = files[0]
             self._load_image_on_canvas(files[0])
             self._switch_to_crop_editor()
@@ -358,6 +403,49 @@ class App(ThemedTk):
         create_input("位置 X (px)", "x")
         create_input("位置 Y (px)", "y")
 
+        # 批次裁剪：以目前的裁剪框作為預設，套用到所有已選圖片
+        batch_frame = ttk.LabelFrame(settings_frame, text="批次裁剪", padding="10")
+        batch_frame.pack(fill=tk.X, pady=(10, 0))
+
+        ttk.Label(batch_frame, text="套用方式").pack(anchor="w")
+        self.crop_batch_mode_var = tk.StringVar(value="像素")
+        ttk.Combobox(batch_frame, textvariable=self.crop_batch_mode_var, values=list(self.CROP_BATCH_MODES), state="readonly").pack(fill=tk.X, pady=(0, 5))
+
+        ttk.Label(batch_frame, text="預設").pack(anchor="w")
+        self.crop_preset_var = tk.StringVar()
+        self.crop_preset_combo = ttk.Combobox(batch_frame, textvariable=self.crop_preset_var, values=sorted(load_crop_presets()), state="readonly")
+        self.crop_preset_combo.pack(fill=tk.X, pady=(0, 5))
+        self.crop_preset_combo.bind("<<ComboboxSelected>>", self._apply_crop_preset)
+        ttk.Button(batch_frame, text="儲存為預設", command=self._save_crop_preset).pack(fill=tk.X, pady=(0, 5))
+
+        count = len(getattr(self, '_crop_files', []))
+        self.crop_batch_button = ttk.Button(batch_frame, text=f"批次裁剪 ({count} 張)", command=self._perform_batch_crop)
+        self.crop_batch_button.pack(fill=tk.X)
+        self.crop_batch_status = ttk.Label(batch_frame, text="", foreground="gray")
+        self.crop_batch_status.pack(anchor="w", pady=(5, 0))
+
+        # 自動裁剪：依顯著度為每張圖片找出裁剪框，可逐張檢視與調整後再套用
+        smart_frame = ttk.LabelFrame(settings_frame, text="自動裁剪", padding="10")
+        smart_frame.pack(fill=tk.X, pady=(10, 0))
+
+        ratio_row = ttk.Frame(smart_frame)
+        ratio_row.pack(fill=tk.X)
+        ttk.Label(ratio_row, text="比例 (寬:高)").pack(side=tk.LEFT)
+        self.smart_crop_ratio_var = tk.StringVar(value="1:1")
+        ttk.Entry(ratio_row, textvariable=self.smart_crop_ratio_var, width=8).pack(side=tk.RIGHT)
+        self.smart_crop_analyze_button = ttk.Button(smart_frame, text="分析所有圖片", command=self._start_smart_crop_analysis)
+        self.smart_crop_analyze_button.pack(fill=tk.X, pady=(5, 5))
+
+        nav_row = ttk.Frame(smart_frame)
+        nav_row.pack(fill=tk.X)
+        ttk.Button(nav_row, text="◀", width=3, command=lambda: self._show_smart_crop(self._smart_crop_index - 1)).pack(side=tk.LEFT)
+        self.smart_crop_nav_label = ttk.Label(nav_row, text="尚未分析", anchor="center")
+        self.smart_crop_nav_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(nav_row, text="▶", width=3, command=lambda: self._show_smart_crop(self._smart_crop_index + 1)).pack(side=tk.RIGHT)
+        ttk.Button(smart_frame, text="套用自動裁剪", command=self._perform_smart_crop).pack(fill=tk.X, pady=(5, 0))
+        self._smart_crop_boxes = {}
+        self._smart_crop_index = 0
+
         # 底部按鈕
         # ttk.Button(settings_frame, text="裁剪圖片", style="Accent.TButton", command=self._perform_crop_and_save).pack(side=tk.BOTTOM, fill=tk.X, pady=20)
         self._create_blue_button(settings_frame, "裁剪圖片", self._perform_crop_and_save).pack(side=tk.BOTTOM, fill=tk.X, pady=20)
@@ -429,10 +517,224 @@ class App(ThemedTk):
         except Exception as e:
             messagebox.showerror("錯誤", f"裁剪或儲存失敗:\n{e}")
 
+    def _current_crop_options(self):
+        """把編輯器中的裁剪框轉換為 crop_options，依套用方式換算成像素、百分比或比例。"""
+        x = self.crop_vars["x"].get()
+        y = self.crop_vars["y"].get()
+        w = self.crop_vars["width"].get()
+        h = self.crop_vars["height"].get()
+        if w <= 0 or h <= 0:
+            raise ValueError("裁剪寬度與高度必須大於 0")
+        img_w, img_h = self.crop_image.size
+        crop_type = self.CROP_BATCH_MODES.get(self.crop_batch_mode_var.get(), "absolute")
+
+        if crop_type == "percent":
+            return {"type": "percent", "x": x / img_w * 100, "y": y / img_h * 100, "width": w / img_w * 100, "height": h / img_h * 100}
+        if crop_type == "aspect":
+            # 錨點：裁剪框在剩餘空間中的相對位置，讓不同尺寸的圖片保持相同的對齊方式
+            anchor_x = x / (img_w - w) if img_w > w else 0.5
+            anchor_y = y / (img_h - h) if img_h > h else 0.5
+            return {"type": "aspect", "ratio": [w, h], "anchor": [min(max(anchor_x, 0), 1), min(max(anchor_y, 0), 1)]}
+        return {"type": "absolute", "x": x, "y": y, "width": w, "height": h}
+
+    def _save_crop_preset(self):
+        if not self.crop_image:
+            return
+        try:
+            crop_options = self._current_crop_options()
+        except (tk.TclError, ValueError) as e:
+            messagebox.showerror("錯誤", f"無效的裁剪範圍:\n{e}")
+            return
+        name = simpledialog.askstring("儲存預設", "預設名稱:", parent=self)
+        if not name:
+            return
+        presets = save_crop_preset(name, crop_options)
+        self.crop_preset_combo.config(values=sorted(presets))
+        self.crop_preset_var.set(name)
+
+    def _apply_crop_preset(self, event=None):
+        # 以預設在目前圖片上計算裁剪框，更新編輯器顯示
+        crop_options = load_crop_presets().get(self.crop_preset_var.get())
+        if not crop_options or not self.crop_image:
+            return
+        img_w, img_h = self.crop_image.size
+        try:
+            left, top, right, bottom = self.processor._compute_crop_box(img_w, img_h, crop_options)
+        except ValueError as e:
+            messagebox.showerror("錯誤", f"預設不適用於此圖片:\n{e}")
+            return
+        mode_names = {v: k for k, v in self.CROP_BATCH_MODES.items()}
+        self.crop_batch_mode_var.set(mode_names.get(crop_options.get("type"), "像素"))
+        self.crop_vars["x"].set(left)
+        self.crop_vars["y"].set(top)
+        self.crop_vars["width"].set(right - left)
+        self.crop_vars["height"].set(bottom - top)
+        self._update_crop_preview()
+
+    def _perform_batch_crop(self):
+        files = getattr(self, '_crop_files', [])
+        if not files or not self.crop_image:
+            return
+        if getattr(self, '_crop_batch_running', False):
+            return
+        try:
+            crop_options = self._current_crop_options()
+        except (tk.TclError, ValueError) as e:
+            messagebox.showerror("錯誤", f"無效的裁剪範圍:\n{e}")
+            return
+        output_dir = filedialog.askdirectory(title="選擇輸出資料夾")
+        if not output_dir:
+            return
+
+        self._crop_batch_running = True
+        self._crop_batch_failures = 0
+        self.crop_batch_button.config(state="disabled")
+        self.crop_batch_status.config(text=f"處理中... 0/{len(files)}")
+
+        # 保留原始格式，經由平行批次引擎處理；JPEG 搭配縮放時會以 draft 縮小解碼
+        settings = {
+            "file_list": files,
+            "output_dir": output_dir,
+            "output_format": None,
+            "crop_options": crop_options,
+            "name_suffix": "_cropped",
+            "progress_callback": lambda data: self.after(0, self._on_batch_crop_progress, data, len(files)),
+            "memory_budget": self.memory_budget,
+        }
+        run_conversion_in_thread(settings)
+
+    def _on_batch_crop_progress(self, result_data, total):
+        status = result_data.get("status")
+        if status == "failure":
+            self._crop_batch_failures += 1
+        if status in ("finished", "error"):
+            self._crop_batch_running = False
+        # 編輯器可能已被關閉，元件不存在時只更新狀態
+        if not self.crop_batch_status.winfo_exists():
+            return
+        if status in ("success", "failure"):
+            done = round(result_data.get("progress", 0) * total / 100)
+            self.crop_batch_status.config(text=f"處理中... {done}/{total}")
+            return
+        if status not in ("finished", "error"):
+            return
+
+        self.crop_batch_button.config(state="normal")
+        if status == "error":
+            self.crop_batch_status.config(text="")
+            messagebox.showerror("錯誤", f"批次裁剪失敗:\n{result_data.get('message')}")
+            return
+        saved = len(result_data.get("output_files", []))
+        self.crop_batch_status.config(text=f"完成：{saved} 張，失敗 {self._crop_batch_failures} 張")
+        messagebox.showinfo("成功", f"已裁剪 {saved} 張圖片。")
+
+    def _parse_smart_crop_ratio(self):
+        # 接受 "16:9"、"4/3" 或單一數值
+        text = self.smart_crop_ratio_var.get().replace("/", ":")
+        parts = [float(p) for p in text.split(":")]
+        ratio = parts[0] / parts[1] if len(parts) == 2 else parts[0]
+        if ratio <= 0:
+            raise ValueError("比例必須大於 0")
+        return ratio
+
+    def _start_smart_crop_analysis(self):
+        files = getattr(self, '_crop_files', [])
+        if not files or getattr(self, '_smart_crop_running', False):
+            return
+        try:
+            ratio = self._parse_smart_crop_ratio()
+        except (ValueError, ZeroDivisionError):
+            messagebox.showerror("錯誤", "無效的比例，請輸入例如 1:1 或 16:9")
+            return
+
+        self._smart_crop_running = True
+        self.smart_crop_analyze_button.config(state="disabled")
+        self.smart_crop_nav_label.config(text="分析中...")
+
+        def job():
+            # 在縮小的圖片上分析，原圖在套用時才完整解碼並裁剪一次
+            boxes = analyze_smart_crops(files, ratio)
+            self.after(0, self._smart_crop_analysis_finished, boxes)
+
+        threading.Thread(target=job, daemon=True).start()
+
+    def _smart_crop_analysis_finished(self, boxes):
+        self._smart_crop_running = False
+        if not self.smart_crop_nav_label.winfo_exists():
+            return
+        self.smart_crop_analyze_button.config(state="normal")
+        # 依原本的檔案順序排列，方便逐張檢視
+        self._smart_crop_boxes = {path: boxes[path] for path in self._crop_files if path in boxes}
+        if not self._smart_crop_boxes:
+            self.smart_crop_nav_label.config(text="沒有可分析的圖片")
+            return
+        self._smart_crop_index = 0
+        self._show_smart_crop(0, store_current=False)
+
+    def _store_current_smart_crop(self):
+        # 把使用者在畫布上調整過的裁剪框寫回目前的檔案
+        paths = list(self._smart_crop_boxes)
+        if not paths:
+            return
+        try:
+            self._smart_crop_boxes[paths[self._smart_crop_index]] = {
+                "type": "absolute",
+                "x": self.crop_vars["x"].get(),
+                "y": self.crop_vars["y"].get(),
+                "width": self.crop_vars["width"].get(),
+                "height": self.crop_vars["height"].get(),
+            }
+        except tk.TclError:
+            pass
+
+    def _show_smart_crop(self, index, store_current=True):
+        paths = list(self._smart_crop_boxes)
+        if not paths or not 0 <= index < len(paths):
+            return
+        if store_current:
+            self._store_current_smart_crop()
+        self._smart_crop_index = index
+        path = paths[index]
+        box = self._smart_crop_boxes[path]
+
+        self._crop_file_path = path
+        self._load_image_on_canvas(path)
+        for key in ("x", "y", "width", "height"):
+            self.crop_vars[key].set(box[key])
+        self.crop_canvas.delete("all")
+        self._draw_canvas_content()
+        self.smart_crop_nav_label.config(text=f"{index + 1}/{len(paths)}  {os.path.basename(path)}")
+
+    def _perform_smart_crop(self):
+        if not self._smart_crop_boxes or getattr(self, '_crop_batch_running', False):
+            return
+        self._store_current_smart_crop()
+        output_dir = filedialog.askdirectory(title="選擇輸出資料夾")
+        if not output_dir:
+            return
+
+        files = list(self._smart_crop_boxes)
+        self._crop_batch_running = True
+        self._crop_batch_failures = 0
+        self.crop_batch_button.config(state="disabled")
+        self.crop_batch_status.config(text=f"處理中... 0/{len(files)}")
+
+        # 每張圖片使用各自檢視過的裁剪框，經由平行批次引擎處理
+        settings = {
+            "file_list": files,
+            "output_dir": output_dir,
+            "output_format": None,
+            "crop_options": {"type": "boxes", "boxes": dict(self._smart_crop_boxes)},
+            "name_suffix": "_cropped",
+            "progress_callback": lambda data: self.after(0, self._on_batch_crop_progress, data, len(files)),
+            "memory_budget": self.memory_budget,
+        }
+        run_conversion_in_thread(settings)
+
     def _load_image_on_canvas(self, file_path):
         if hasattr(self, 'crop_canvas'):
             self._stop_animation(self.crop_canvas)
-        self.crop_image = Image.open(file_path)
+        self.crop_image = open_oriented_image(file_path)
         
         # 初始化裁剪框 (預設為圖片的一半大小，置中)
         w, h = self.crop_image.size
@@ -522,16 +824,24 @@ class App(ThemedTk):
              self._update_crop_preview()
 
     def _update_crop_preview(self, event=None):
+        # 由輸入欄位觸發：以 Tk 變數為準更新裁剪框
         if not self.crop_canvas:
             return
 
         try:
-            w = self.crop_vars["width"].get()
-            h = self.crop_vars["height"].get()
-            x = self.crop_vars["x"].get()
-            y = self.crop_vars["y"].get()
+            self._crop_box = [
+                self.crop_vars["x"].get(),
+                self.crop_vars["y"].get(),
+                self.crop_vars["width"].get(),
+                self.crop_vars["height"].get(),
+            ]
         except tk.TclError:
             return # 忽略無效輸入
+        self._draw_crop_box()
+
+    def _draw_crop_box(self):
+        """依 self._crop_box（圖片像素座標）更新畫布上的裁剪框與控制點。"""
+        x, y, w, h = self._crop_box
 
         # 轉換為 Canvas 座標
         cx = self.canvas_offset_x + (x * self.display_scale)
@@ -555,6 +865,13 @@ class App(ThemedTk):
         self.crop_canvas.coords("handle_bl", cx-r, y2-r, cx+r, y2+r)
         self.crop_canvas.coords("handle_br", x2-r, y2-r, x2+r, y2+r)
 
+    def _sync_crop_vars(self):
+        # 拖曳結束時才寫回 Tk 變數，避免每個滑鼠事件都觸發 trace
+        x, y, w, h = self._crop_box
+        self.crop_vars["x"].set(x)
+        self.crop_vars["y"].set(y)
+        self.crop_vars["width"].set(w)
+        self.crop_vars["height"].set(h)
 
     def _on_crop_press(self, event):
         # 檢查點擊位置
@@ -563,6 +880,13 @@ class App(ThemedTk):
         self.drag_data["start_y"] = y
         self.drag_data["mode"] = None
 
+        # 拖曳期間以純 Python 狀態保存裁剪框，起點的框用來計算累計位移
+        try:
+            self._crop_box = [self.crop_vars[k].get() for k in ("x", "y", "width", "height")]
+        except tk.TclError:
+            return
+        self.drag_data["origin_box"] = list(self._crop_box)
+
         # 檢查是否點擊到縮放點
         overlap = self.crop_canvas.find_overlapping(x-5, y-5, x+5, y+5)
         for item_id in overlap:
@@ -575,97 +899,87 @@ class App(ThemedTk):
                 return
 
         # 檢查是否點擊到矩形內部 (移動)
-        cx = float(self.crop_vars["x"].get()) * self.display_scale + self.canvas_offset_x
-        cy = float(self.crop_vars["y"].get()) * self.display_scale + self.canvas_offset_y
-        cw = float(self.crop_vars["width"].get()) * self.display_scale
-        ch = float(self.crop_vars["height"].get()) * self.display_scale
+        bx, by, bw, bh = self._crop_box
+        cx = bx * self.display_scale + self.canvas_offset_x
+        cy = by * self.display_scale + self.canvas_offset_y
+        cw = bw * self.display_scale
+        ch = bh * self.display_scale
         
         if cx <= x <= cx + cw and cy <= y <= cy + ch:
              self.drag_data["mode"] = "move"
 
     def _on_crop_drag(self, event):
+        # 只記錄最新的指標位置，每個顯示影格（約 16ms）最多套用一次
         if not self.drag_data["mode"]:
             return
-
-        x, y = self.crop_canvas.canvasx(event.x), self.crop_canvas.canvasy(event.y)
-        dx = x - self.drag_data["start_x"]
-        dy = y - self.drag_data["start_y"]
-
-        # 將 Canvas 的位移量轉換為圖片像素位移量
-        img_dx = int(dx / self.display_scale)
-        img_dy = int(dy / self.display_scale)
-        
-        if img_dx == 0 and img_dy == 0:
+        self.drag_data["pointer"] = (self.crop_canvas.canvasx(event.x), self.crop_canvas.canvasy(event.y))
+        if not getattr(self, '_crop_drag_job', None):
+            self._crop_drag_job = self.after(16, self._apply_crop_drag)
+
+    def _apply_crop_drag(self):
+        """把累積的拖曳位移一次套用到裁剪框並重繪。"""
+        self._crop_drag_job = None
+        pointer = self.drag_data.get("pointer")
+        if not self.drag_data["mode"] or pointer is None or not self.crop_image:
             return
-            
-        cur_x = self.crop_vars["x"].get()
-        cur_y = self.crop_vars["y"].get()
-        cur_w = self.crop_vars["width"].get()
-        cur_h = self.crop_vars["height"].get()
+
+        # 從按下時的框與總位移計算，避免逐次取整造成的偏移累積
+        img_dx = int((pointer[0] - self.drag_data["start_x"]) / self.display_scale)
+        img_dy = int((pointer[1] - self.drag_data["start_y"]) / self.display_scale)
+        cur_x, cur_y, cur_w, cur_h = self.drag_data["origin_box"]
+        img_w, img_h = self.crop_image.size
 
         if self.drag_data["mode"] == "move":
             new_x = cur_x + img_dx
             new_y = cur_y + img_dy
             
             # 限制邊界
-            img_w, img_h = self.crop_image.size
-            if new_x < 0: new_x = 0
-            if new_y < 0: new_y = 0
             if new_x + cur_w > img_w: new_x = img_w - cur_w
             if new_y + cur_h > img_h: new_y = img_h - cur_h
+            if new_x < 0: new_x = 0
+            if new_y < 0: new_y = 0
 
-            self.crop_vars["x"].set(new_x)
-            self.crop_vars["y"].set(new_y)
+            self._crop_box = [new_x, new_y, cur_w, cur_h]
             
-        elif self.drag_data["mode"].startswith("resize"):
-            mode = self.drag_data["mode"]
+        else:
+            corner = self.drag_data["mode"].split("_")[1]
             min_size = 10
             
             new_x, new_y, new_w, new_h = cur_x, cur_y, cur_w, cur_h
             
             # 處理 Y 軸變化
-            if "t" in mode: # Top
-                # 向上拖動 dy 為負 -> 高度增加, y 減少
-                # 向下拖動 dy 為正 -> 高度減少, y 增加
-                # 防止高度過小
-                if cur_h - img_dy < min_size:
-                    img_dy = cur_h - min_size # 修正 dy 為最大允許值
-                
+            if "t" in corner: # Top
+                # 向上拖動 dy 為負 -> 高度增加, y 減少；防止高度過小
+                img_dy = min(img_dy, cur_h - min_size)
                 new_y = cur_y + img_dy
                 new_h = cur_h - img_dy
-            elif "b" in mode: # Bottom
-                # 向下拖動 dy 為正 -> 高度增加
-                if cur_h + img_dy < min_size:
-                     img_dy = min_size - cur_h # 修正 dy 
-                     
+            else: # Bottom
+                img_dy = max(img_dy, min_size - cur_h)
                 new_h = cur_h + img_dy
 
             # 處理 X 軸變化
-            if "l" in mode: # Left
-                if cur_w - img_dx < min_size:
-                    img_dx = cur_w - min_size
-                
+            if "l" in corner: # Left
+                img_dx = min(img_dx, cur_w - min_size)
                 new_x = cur_x + img_dx
                 new_w = cur_w - img_dx
-            elif "r" in mode: # Right
-                if cur_w + img_dx < min_size:
-                    img_dx = min_size - cur_w
-                
+            else: # Right
+                img_dx = max(img_dx, min_size - cur_w)
                 new_w = cur_w + img_dx
 
-            self.crop_vars["x"].set(new_x)
-            self.crop_vars["y"].set(new_y)
-            self.crop_vars["width"].set(new_w)
-            self.crop_vars["height"].set(new_h)
+            self._crop_box = [new_x, new_y, new_w, new_h]
 
-        # 更新起始點
-        self.drag_data["start_x"] = x
-        self.drag_data["start_y"] = y
-        
-        self._update_crop_preview()
+        self._draw_crop_box()
 
     def _on_crop_release(self, event):
+        # 套用尚未處理的位移，再同步 Tk 變數
+        job = getattr(self, '_crop_drag_job', None)
+        if job:
+            self.after_cancel(job)
+            self._apply_crop_drag()
+        if self.drag_data["mode"]:
+            self._sync_crop_vars()
         self.drag_data["mode"] = None
+        self.drag_data["pointer"] = None
 
 
 
@@ -693,10 +1007,14 @@ class App(ThemedTk):
     def _select_resize_images(self):
         files = filedialog.askopenfilenames(title="選擇圖片", filetypes=[("圖片檔案", "*.jpg *.jpeg *.png *.bmp *.webp *.gif")])
         if files:
-            # 這裡我們只取第一張圖片進行編輯
-            self._resize_file_path = files[0] # 保存原始路徑
-            self._load_resize_image_on_canvas(files[0])
-            self._switch_to_resize_editor()
+            self._open_resize_files(files)
+
+    def _open_resize_files(self, files):
+        """第一張圖片用於預覽編輯，全部圖片可用於批次調整（gui_benchmark 也由此開啟編輯器）。"""
+        self._resize_files = [os.path.normpath(f) for f in files]
+        self._resize_file_path = files[0] # 保存原始路徑
+        self._load_resize_image_on_canvas(files[0])
+        self._switch_to_resize_editor()
 
     def _switch_to_resize_editor(self):
         for widget in self.resize_tab.winfo_children():
@@ -710,6 +1028,7 @@ class App(ThemedTk):
         # 左側畫布
         self.resize_canvas = tk.Canvas(paned, bg='#cccccc') # 較深的灰色以最大化對比度/檢查置中
         paned.add(self.resize_canvas, weight=1)
+        self._resize_overlay = None # 新畫布需要重新建立疊加層項目
 
         # 右側設定
         settings_frame = ttk.Frame(paned, padding="5") # 減少填充
@@ -768,6 +1087,13 @@ class App(ThemedTk):
         # 選項
         self.maintain_aspect_var = tk.BooleanVar(value=False)
         self.no_enlarge_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.pixels_frame, text="維持長寬比", variable=self.maintain_aspect_var, command=lambda: self._on_resize_dim_change('w')).pack(anchor="w")
+        ttk.Checkbutton(self.pixels_frame, text="不放大小於目標的圖片", variable=self.no_enlarge_var).pack(anchor="w", pady=(2, 8))
+
+        # 批次調整時的縮放方式
+        ttk.Label(self.pixels_frame, text="批次縮放方式:", font=self.font_bold).pack(anchor="w")
+        self.resize_fit_var = tk.StringVar(value="精確尺寸")
+        ttk.Combobox(self.pixels_frame, textvariable=self.resize_fit_var, values=list(self.RESIZE_FIT_MODES), state="readonly", width=18).pack(fill=tk.X, pady=(2, 0))
         
         
         # -- Percentage Inputs Area --
@@ -790,6 +1116,13 @@ class App(ThemedTk):
         self.btn_action_canvas.bind("<Button-1>", lambda e: self._perform_resize_and_save())
         self.btn_action_canvas.bind("<Configure>", self._center_action_btn_text)
 
+        # 批次調整：以相同設定處理所有已選圖片
+        count = len(getattr(self, '_resize_files', []))
+        self.resize_batch_status = ttk.Label(settings_frame, text="", foreground="gray")
+        self.resize_batch_status.pack(side=tk.BOTTOM, anchor="w")
+        self.resize_batch_button = ttk.Button(settings_frame, text=f"批次調整 ({count} 張)", command=self._perform_batch_resize)
+        self.resize_batch_button.pack(side=tk.BOTTOM, fill=tk.X)
+
 
         # 初始狀態
         if self.resize_image:
@@ -924,7 +1257,7 @@ class App(ThemedTk):
     def _load_resize_image_on_canvas(self, file_path):
         if hasattr(self, 'resize_canvas'):
             self._stop_animation(self.resize_canvas)
-        self.resize_image = Image.open(file_path)
+        self.resize_image = open_oriented_image(file_path)
 
     def _draw_resize_canvas_content(self, event=None):
         if not self.resize_image:
@@ -963,15 +1296,73 @@ class App(ThemedTk):
                 self._animate_gif_on_canvas(self.resize_canvas, self._resize_file_path, "img_frame")
         else:
             self._stop_animation(self.resize_canvas)
-            self.resize_canvas.delete("all")
-            self.resize_canvas.create_image(off_x, off_y, anchor="nw", image=self.resize_image_tk)
+            # 只替換圖片項目，疊加層保留在畫布上
+            self.resize_canvas.delete("img_frame")
+            self.resize_canvas.create_image(off_x, off_y, anchor="nw", image=self.resize_image_tk, tags="img_frame")
+            self.resize_canvas.tag_lower("img_frame")
         
         # Draw the info overlay
         self._draw_info_overlay()
 
+    def _create_info_overlay(self):
+        """建立疊加層的所有畫布項目並綁定事件，只在畫布建立後執行一次。"""
+        canvas = self.resize_canvas
+
+        def create_pill(bg, fg):
+            # 圓角矩形（重疊的圓形與矩形）加上文字，座標在 _layout_pill 中設定
+            return {
+                "shapes": [
+                    canvas.create_oval(0, 0, 0, 0, fill=bg, outline=bg, tags="overlay"),
+                    canvas.create_oval(0, 0, 0, 0, fill=bg, outline=bg, tags="overlay"),
+                    canvas.create_rectangle(0, 0, 0, 0, fill=bg, outline=bg, tags="overlay"),
+                    canvas.create_rectangle(0, 0, 0, 0, fill=bg, outline=bg, tags="overlay"),
+                ],
+                "text": canvas.create_text(0, 0, text="", fill=fg, font=("Arial", 9, "bold"), tags="overlay"),
+            }
+
+        self._resize_overlay = {
+            "filename": canvas.create_text(0, 0, text="", fill="#555", font=(self.font_family, 10), tags="overlay"),
+            "orig_pill": create_pill("#999", "white"),
+            "arrow": canvas.create_text(0, 0, text="➔", fill="#555", font=("Arial", 12, "bold"), tags="overlay"),
+            "target_pill": create_pill("#4285f4", "white"),
+            # 為圓形使用特定標籤
+            "close_bg": canvas.create_oval(0, 0, 0, 0, fill="#eee", outline="#ccc", tags=("overlay", "close_btn_bg")),
+            "close_text": canvas.create_text(0, 0, text="✕", fill="#555", font=("Arial", 10, "bold"), tags=("overlay", "close_btn_text")),
+            "state": None, # 上次繪製時的狀態，相同時略過更新
+        }
+
+        # 綁定點擊事件至兩者
+        canvas.tag_bind("close_btn_bg", "<Button-1>", lambda e: self._reset_resize_tab())
+        canvas.tag_bind("close_btn_text", "<Button-1>", lambda e: self._reset_resize_tab())
+        
+        # 綁定懸停事件至背景
+        canvas.tag_bind("close_btn_bg", "<Enter>", lambda e: canvas.itemconfig("close_btn_bg", fill="#e0e0e0"))
+        canvas.tag_bind("close_btn_bg", "<Leave>", lambda e: canvas.itemconfig("close_btn_bg", fill="#eee"))
+        canvas.tag_bind("close_btn_text", "<Enter>", lambda e: canvas.itemconfig("close_btn_bg", fill="#e0e0e0"))
+        canvas.tag_bind("close_btn_text", "<Leave>", lambda e: canvas.itemconfig("close_btn_bg", fill="#eee"))
+
+    def _layout_pill(self, pill, x, y, text):
+        # 根據文字長度計算大約寬度
+        w = len(text) * 8 + 20
+        h = 24
+        x1 = x - w/2
+        y1 = y - h/2
+        x2 = x + w/2
+        y2 = y + h/2
+        r = 12
+        shapes = pill["shapes"]
+        self.resize_canvas.coords(shapes[0], x1, y1, x1+2*r, y1+2*r)
+        self.resize_canvas.coords(shapes[1], x2-2*r, y2-2*r, x2, y2)
+        self.resize_canvas.coords(shapes[2], x1+r, y1, x2-r, y2)
+        self.resize_canvas.coords(shapes[3], x1, y1+r, x2, y2-r)
+        self.resize_canvas.coords(pill["text"], x, y)
+        self.resize_canvas.itemconfig(pill["text"], text=text)
+
     def _draw_info_overlay(self):
-        self.resize_canvas.delete("overlay")
+        """更新疊加層的文字與座標；項目只建立一次，內容未變時不做任何事。"""
         if not self.resize_image: return
+        if self._resize_overlay is None:
+            self._create_info_overlay()
 
         # Calculate Dimensions
         orig_w, orig_h = self.resize_image.size
@@ -994,67 +1385,39 @@ class App(ThemedTk):
             target_w = int(orig_w * p / 100)
             target_h = int(orig_h * p / 100)
 
-        # 繪製疊加層
         cw = self.resize_canvas.winfo_width()
         ch = self.resize_canvas.winfo_height()
-        cx = cw / 2
-        cy = ch - 60 # Position from bottom
-        
         fname = os.path.basename(self._resize_file_path) if hasattr(self, "_resize_file_path") else "Image"
-        
-        # Draw Filename
-        self.resize_canvas.create_text(cx, cy - 30, text=fname, fill="#555", font=(self.font_family, 10), tags="overlay")
-        
-        # Draw Pills
-        def draw_pill(x, y, text, bg, fg):
-            # 根據文字長度計算大約寬度
-            w = len(text) * 8 + 20
-            h = 24
-            x1 = x - w/2
-            y1 = y - h/2
-            x2 = x + w/2
-            y2 = y + h/2
-            
-            # Draw rounded rect (using overlapping oval/rect)
-            r = 12
-            self.resize_canvas.create_oval(x1, y1, x1+2*r, y1+2*r, fill=bg, outline=bg, tags="overlay")
-            self.resize_canvas.create_oval(x2-2*r, y2-2*r, x2, y2, fill=bg, outline=bg, tags="overlay")
-            self.resize_canvas.create_rectangle(x1+r, y1, x2-r, y2, fill=bg, outline=bg, tags="overlay")
-            self.resize_canvas.create_rectangle(x1, y1+r, x2, y2-r, fill=bg, outline=bg, tags="overlay")
-            
-            # 文字
-            self.resize_canvas.create_text(x, y, text=text, fill=fg, font=("Arial", 9, "bold"), tags="overlay")
-
-        # 原始
         orig_txt = f"{orig_w} x {orig_h}"
-        draw_pill(cx - 70, cy, orig_txt, "#999", "white")
-        
-        # Arrow
-        self.resize_canvas.create_text(cx, cy, text="➔", fill="#555", font=("Arial", 12, "bold"), tags="overlay")
-        
-        # Target
         target_txt = f"{target_w} x {target_h}"
-        draw_pill(cx + 70, cy, target_txt, "#4285f4", "white")
 
-        # 繪製關閉按鈕（右上角）
+        overlay = self._resize_overlay
+        state = (cw, ch, fname, orig_txt, target_txt)
+        if state == overlay["state"]:
+            return
+        size_changed = overlay["state"] is None or overlay["state"][:4] != state[:4]
+        overlay["state"] = state
+
+        cx = cw / 2
+        cy = ch - 60 # Position from bottom
+
+        # 只有目標尺寸改變時（例如輸入寬度），僅更新目標標籤
+        self._layout_pill(overlay["target_pill"], cx + 70, cy, target_txt)
+        if not size_changed:
+            return
+
+        self.resize_canvas.coords(overlay["filename"], cx, cy - 30)
+        self.resize_canvas.itemconfig(overlay["filename"], text=fname)
+        self._layout_pill(overlay["orig_pill"], cx - 70, cy, orig_txt)
+        self.resize_canvas.coords(overlay["arrow"], cx, cy)
+
+        # 關閉按鈕（右上角）
         padding = 15
         btn_r = 14
         cx_btn = cw - padding - btn_r
         cy_btn = padding + btn_r
-        
-        # 為圓形使用特定標籤
-        self.resize_canvas.create_oval(cx_btn-btn_r, cy_btn-btn_r, cx_btn+btn_r, cy_btn+btn_r, fill="#eee", outline="#ccc", tags=("overlay", "close_btn_bg"))
-        self.resize_canvas.create_text(cx_btn, cy_btn, text="✕", fill="#555", font=("Arial", 10, "bold"), tags=("overlay", "close_btn_text"))
-        
-        # 綁定點擊事件至兩者
-        self.resize_canvas.tag_bind("close_btn_bg", "<Button-1>", lambda e: self._reset_resize_tab())
-        self.resize_canvas.tag_bind("close_btn_text", "<Button-1>", lambda e: self._reset_resize_tab())
-        
-        # 綁定懸停事件至背景
-        self.resize_canvas.tag_bind("close_btn_bg", "<Enter>", lambda e: self.resize_canvas.itemconfig("close_btn_bg", fill="#e0e0e0"))
-        self.resize_canvas.tag_bind("close_btn_bg", "<Leave>", lambda e: self.resize_canvas.itemconfig("close_btn_bg", fill="#eee"))
-        self.resize_canvas.tag_bind("close_btn_text", "<Enter>", lambda e: self.resize_canvas.itemconfig("close_btn_bg", fill="#e0e0e0"))
-        self.resize_canvas.tag_bind("close_btn_text", "<Leave>", lambda e: self.resize_canvas.itemconfig("close_btn_bg", fill="#eee"))
+        self.resize_canvas.coords(overlay["close_bg"], cx_btn-btn_r, cy_btn-btn_r, cx_btn+btn_r, cy_btn+btn_r)
+        self.resize_canvas.coords(overlay["close_text"], cx_btn, cy_btn)
 
     def _perform_resize_and_save(self):
         if not self.resize_image: return
@@ -1127,6 +1490,82 @@ class App(ThemedTk):
             messagebox.showerror("錯誤", f"失敗:\n{e}")
 
 
+    def _current_resize_options(self):
+        """把編輯器的設定轉換為 ImageProcessor 使用的 resize_options。"""
+        if self.resize_mode_var.get() != "pixels":
+            return {'type': 'scale', 'value': self.resize_percent_var.get()}
+
+        width = self.resize_w_var.get()
+        height = self.resize_h_var.get()
+        if width <= 0 or height <= 0:
+            raise ValueError("尺寸必須大於 0")
+        resize_type = self.RESIZE_FIT_MODES.get(self.resize_fit_var.get(), 'fixed')
+        options = {
+            'type': resize_type,
+            'width': width,
+            'height': height,
+            'keep_aspect': self.maintain_aspect_var.get(),
+            'no_enlarge': self.no_enlarge_var.get(),
+        }
+        if resize_type == 'max_edge':
+            options['value'] = max(width, height)
+        return options
+
+    def _perform_batch_resize(self):
+        files = getattr(self, '_resize_files', [])
+        if not files or getattr(self, '_resize_batch_running', False):
+            return
+        try:
+            resize_options = self._current_resize_options()
+        except (tk.TclError, ValueError) as e:
+            messagebox.showerror("錯誤", f"無效的尺寸:\n{e}")
+            return
+        output_dir = filedialog.askdirectory(title="選擇輸出資料夾")
+        if not output_dir:
+            return
+
+        self._resize_batch_running = True
+        self._resize_batch_failures = 0
+        self.resize_batch_button.config(state="disabled")
+        self.resize_batch_status.config(text=f"處理中... 0/{len(files)}")
+
+        # 保留原始格式，經由平行批次引擎處理；JPEG 縮小時以 draft 直接縮小解碼
+        settings = {
+            "file_list": files,
+            "output_dir": output_dir,
+            "output_format": None,
+            "resize_options": resize_options,
+            "name_suffix": "_resized",
+            "progress_callback": lambda data: self.after(0, self._on_batch_resize_progress, data, len(files)),
+            "memory_budget": self.memory_budget,
+        }
+        run_conversion_in_thread(settings)
+
+    def _on_batch_resize_progress(self, result_data, total):
+        status = result_data.get("status")
+        if status == "failure":
+            self._resize_batch_failures += 1
+        if status in ("finished", "error"):
+            self._resize_batch_running = False
+        # 編輯器可能已被關閉，元件不存在時只更新狀態
+        if not self.resize_batch_status.winfo_exists():
+            return
+        if status in ("success", "failure"):
+            done = round(result_data.get("progress", 0) * total / 100)
+            self.resize_batch_status.config(text=f"處理中... {done}/{total}")
+            return
+        if status not in ("finished", "error"):
+            return
+
+        self.resize_batch_button.config(state="normal")
+        if status == "error":
+            self.resize_batch_status.config(text="")
+            messagebox.showerror("錯誤", f"批次調整失敗:\n{result_data.get('message')}")
+            return
+        saved = len(result_data.get("output_files", []))
+        self.resize_batch_status.config(text=f"完成：{saved} 張，失敗 {self._resize_batch_failures} 張")
+        messagebox.showinfo("成功", f"已調整 {saved} 張圖片的尺寸。")
+
     def _reset_resize_tab(self):
         if hasattr(self, 'resize_canvas'):
             self._stop_animation(self.resize_canvas)
@@ -1274,7 +1713,17 @@ class App(ThemedTk):
         # Info Box
         info_box = tk.Label(right_panel, text="所有圖片都將被壓縮，同時保持最佳品質和大小比例。", 
                             bg="#dbeafe", fg="#333", font=(self.font_family, 11), pady=20, padx=20, wraplength=260, justify="left")
-        info_box.pack(fill=tk.X, pady=(0, 40))
+        info_box.pack(fill=tk.X, pady=(0, 20))
+
+        # 檔頭探測的總計：數千張圖片也只需讀取檔頭，於背景完成後更新
+        self.compress_summary_label = ttk.Label(right_panel, text="正在讀取圖片資訊…", foreground="#666", wraplength=260, justify="left")
+        self.compress_summary_label.pack(fill=tk.X, pady=(0, 20))
+        self._start_compress_summary()
+
+        # 輸出方式：勾選時直接串流寫入單一 ZIP 檔
+        if not hasattr(self, 'compress_zip_var'):
+            self.compress_zip_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(right_panel, text="輸出為 ZIP 壓縮檔", variable=self.compress_zip_var).pack(anchor="w", pady=(0, 20))
 
         # Start Button
         self.btn_compress_action = tk.Canvas(right_panel, width=280, height=60, bg="#f0f0f0", highlightthickness=0, cursor="hand2")
@@ -1288,6 +1737,29 @@ class App(ThemedTk):
         self.btn_compress_action.create_text(140, 30, text="壓縮多個圖片文檔 ➔", fill="black", font=(self.font_family, 13, "bold"))
         self.btn_compress_action.bind("<Button-1>", lambda e: self._initiate_compression())
 
+    def _start_compress_summary(self):
+        files = list(self.compress_files_list)
+
+        def job():
+            summary = estimate_batch(probe_many(files).values(), None, 75)
+            self.after(0, self._show_compress_summary, files, summary)
+
+        threading.Thread(target=job, daemon=True).start()
+
+    def _show_compress_summary(self, files, summary):
+        label = getattr(self, 'compress_summary_label', None)
+        if files != self.compress_files_list or not label or not label.winfo_exists():
+            return
+        formats = "、".join(f"{fmt} {count}" for fmt, count in sorted(summary["formats"].items()))
+        lines = [
+            f"{summary['files']} 張圖片 · {format_size(summary['input_bytes'])} · {summary['megapixels']:.1f} MP",
+            f"格式：{formats}" if formats else "",
+            f"預估壓縮後約 {format_size(summary['estimated_output_bytes'])}",
+        ]
+        if summary["failures"]:
+            lines.append(f"{summary['failures']} 個檔案無法讀取")
+        label.config(text="\n".join(line for line in lines if line))
+
     def _create_thumbnail_card(self, parent, file_path, row, col):
         card_frame = tk.Frame(parent, bg="white", padx=5, pady=5) # Simple card
         # Border
@@ -1311,8 +1783,7 @@ class App(ThemedTk):
 
         try:
             # Thumbnail
-            img = Image.open(file_path)
-            img.thumbnail((120, 120))
+            img = load_oriented_thumbnail(file_path, (120, 120))
             photo = ImageTk.PhotoImage(img)
             self._thumbnail_cache.append(photo) # Keep ref
             
@@ -1340,49 +1811,80 @@ class App(ThemedTk):
                 self._show_compress_review() # Refresh
 
     def _initiate_compression(self):
-        output_dir = filedialog.askdirectory(title="選擇輸出資料夾")
-        if not output_dir:
+        if getattr(self, '_compressing', False):
             return
+        archive_path = None
+        if self.compress_zip_var.get():
+            archive_path = filedialog.asksaveasfilename(
+                title="儲存壓縮檔",
+                defaultextension=".zip",
+                initialfile="compressed_images.zip",
+                filetypes=[("ZIP", "*.zip"), ("TAR", "*.tar")]
+            )
+            if not archive_path:
+                return
+            output_dir = os.path.dirname(archive_path)
+        else:
+            output_dir = filedialog.askdirectory(title="選擇輸出資料夾")
+            if not output_dir:
+                return
         
-        self._perform_batch_compression(output_dir)
+        self._perform_batch_compression(output_dir, archive_path)
 
-    def _perform_batch_compression(self, output_dir):
+    def _perform_batch_compression(self, output_dir, archive_path=None):
         # 初始化統計數據
         self.compression_stats = {"total_orig": 0, "total_new": 0, "count": 0}
         self.last_output_dir = output_dir
+        self.last_archive_path = archive_path
+        self._compressing = True
         
-        # 建立進度視窗或隱藏當前介面以顯示處理中 (可選)
-        
-        # 循環處理每個檔案
-        for file_path in self.compress_files_list:
-            try:
-                # 這裡原本是手動處理，現在改用 ImageProcessor 類別
-                # 為了獲取大小，我們調用 _convert_and_save
-                # 注意：compression 通常不需要 resize，所以 resize_options=None
-                result = self.processor._convert_and_save(
-                    file_path, 
-                    output_dir, 
-                    output_format=os.path.splitext(file_path)[1][1:].upper() or "JPEG",
-                    quality=75, # 預設壓縮品質
-                    resize_options=None
-                )
-                
-                self.compression_stats["total_orig"] += result["original_size"]
-                self.compression_stats["total_new"] += result["compressed_size"]
-                self.compression_stats["count"] += 1
-                
-                # 防止 UI 凍結
-                self.update()
-                    
-            except Exception as e:
-                print(f"壓縮過程中出錯: {e}")
-        
-        # 處理完成後顯示結果頁面
-        if self.compression_stats["count"] > 0:
-            self._show_compress_result()
-        else:
-            messagebox.showwarning("提示", "沒有圖片被成功壓縮。")
+        # 在背景以平行批次引擎處理，沿用原始格式；
+        # 指定封存檔時每張圖片完成後直接寫入，不會先寫到磁碟
+        settings = {
+            "file_list": list(self.compress_files_list),
+            "output_dir": output_dir,
+            "output_format": None,
+            "quality": 75, # 預設壓縮品質
+            "archive_path": archive_path,
+            "progress_callback": lambda data: self.after(0, self._on_compress_progress, data),
+            "memory_budget": self.memory_budget,
+        }
+        run_conversion_in_thread(settings)
+
+    def _on_compress_progress(self, result_data):
+        status = result_data.get("status")
+        if status == "success":
+            self.compression_stats["total_orig"] += result_data.get("original_size") or 0
+            self.compression_stats["total_new"] += result_data.get("compressed_size") or 0
+            self.compression_stats["count"] += 1
+        elif status == "failure":
+            print(f"壓縮過程中出錯: {result_data.get('message')}")
+        elif status == "error":
+            self._compressing = False
+            messagebox.showerror("錯誤", f"壓縮失敗:\n{result_data.get('message')}")
             self._show_compress_landing()
+        elif status == "finished":
+            self._compressing = False
+            # 處理完成後顯示結果頁面
+            if self.compression_stats["count"] > 0:
+                self._show_compress_result()
+            else:
+                messagebox.showwarning("提示", "沒有圖片被成功壓縮。")
+                self._show_compress_landing()
+
+    def _open_path(self, path):
+        """以系統預設的檔案管理員開啟資料夾。"""
+        if not path:
+            return
+        try:
+            if os.name == 'nt':
+                os.startfile(path)
+            elif sys.platform == 'darwin':
+                subprocess.Popen(['open', path])
+            else:
+                subprocess.Popen(['xdg-open', path])
+        except OSError as e:
+            messagebox.showerror("錯誤", f"無法開啟資料夾:\n{e}")
 
     def _show_compress_result(self):
         for widget in self.compress_container.winfo_children():
@@ -1423,7 +1925,10 @@ class App(ThemedTk):
         dl_btn.create_line(cx-10, cy+5, cx-10, cy+12, cx+10, cy+12, cx+10, cy+5, fill="white", width=3, capstyle="round") # Tray
         
         dl_btn.create_text(210, 30, text="下載已壓縮的圖片文檔", fill="black", font=(self.font_family, 14, "bold"))
-        dl_btn.bind("<Button-1>", lambda e: os.startfile(self.last_output_dir) if os.name == 'nt' else None)
+        dl_btn.bind("<Button-1>", lambda e: self._open_path(self.last_output_dir))
+
+        if getattr(self, 'last_archive_path', None):
+            ttk.Label(content, text=f"已輸出至: {self.last_archive_path}", foreground="#666").pack()
 
         # Stats Area
         stats_frame = ttk.Frame(content)
@@ -1469,6 +1974,10 @@ class App(ThemedTk):
         frame.grid_columnconfigure(0, weight=1)
         btn_files = ttk.Button(frame, text="📂 選擇圖片檔案", command=self._select_files, style="Blue.TButton")
         btn_files.grid(row=0, column=0, sticky="ew", pady=5)
+        self.btn_folder = ttk.Button(frame, text="📁 選擇資料夾", command=self._select_folder, style="Blue.TButton")
+        self.btn_folder.grid(row=1, column=0, sticky="ew", pady=5)
+        self.recursive_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(frame, text="包含子資料夾", variable=self.recursive_var).grid(row=2, column=0, sticky="w")
 
     def _create_settings_widgets(self, parent):
         frame = ttk.LabelFrame(parent, text="2. 進行設定", padding="15")
@@ -1477,7 +1986,7 @@ class App(ThemedTk):
 
         ttk.Label(frame, text="輸出格式:").grid(row=0, column=0, sticky="w", pady=5)
         self.output_format_var = tk.StringVar(value="JPEG")
-        formats = ["JPEG", "PNG", "BMP", "WEBP", "GIF"]
+        formats = ["JPEG", "PNG", "BMP", "WEBP", "GIF"] + (["AVIF"] if features.check("avif") else [])
         format_menu = ttk.OptionMenu(frame, self.output_format_var, formats[0], *formats, command=self._on_format_change)
         format_menu.grid(row=0, column=1, sticky="ew", pady=5)
 
@@ -1497,6 +2006,28 @@ class App(ThemedTk):
         self.quality_label = ttk.Label(self.quality_frame, text="95%", font=self.font_normal)
         self.quality_label.grid(row=0, column=2)
 
+        # 輸出方式：資料夾，或在每張圖片完成時直接串流寫入 ZIP / TAR
+        ttk.Label(frame, text="輸出方式:").grid(row=3, column=0, sticky="w", pady=5)
+        self.output_mode_var = tk.StringVar(value="資料夾")
+        ttk.Combobox(frame, textvariable=self.output_mode_var, values=list(self.OUTPUT_ARCHIVE_EXTENSIONS), state="readonly", width=12).grid(row=3, column=1, sticky="ew", pady=5)
+
+        # 中繼資料：EXIF 預設移除；ICC 色彩描述檔預設保留，取消勾選時移除
+        self.keep_metadata_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame, text="保留 EXIF 資訊", variable=self.keep_metadata_var).grid(row=2, column=0, sticky="w", pady=5)
+        self.keep_icc_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(frame, text="保留 ICC 色彩描述檔", variable=self.keep_icc_var).grid(row=2, column=1, sticky="w", pady=5)
+
+        # 結果快取：相同圖片以相同設定轉換時直接沿用先前的輸出
+        self.use_cache_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame, text="使用結果快取", variable=self.use_cache_var).grid(row=4, column=0, columnspan=2, sticky="w", pady=5)
+
+        # 編碼預設：在編碼時間與輸出大小之間取捨；指定時品質也套用到 WEBP / AVIF
+        ttk.Label(frame, text="編碼預設:").grid(row=5, column=0, sticky="w", pady=5)
+        self.encoder_preset_var = tk.StringVar(value="預設")
+        preset_combo = ttk.Combobox(frame, textvariable=self.encoder_preset_var, values=list(self.ENCODER_PRESET_LABELS), state="readonly", width=12)
+        preset_combo.grid(row=5, column=1, sticky="ew", pady=5)
+        preset_combo.bind("<<ComboboxSelected>>", self._on_format_change)
+
     def _draw_quality_slider(self):
         cv = self.quality_slider_canvas
         if not cv.winfo_exists(): return
@@ -1663,8 +2194,7 @@ class App(ThemedTk):
                 
                 # 列表縮圖預覽
                 try:
-                    thumb_img = Image.open(f_path)
-                    thumb_img.thumbnail((40, 40))
+                    thumb_img = load_oriented_thumbnail(f_path, (40, 40))
                     thumb_photo = ImageTk.PhotoImage(thumb_img)
                     self._thumbnail_cache.append(thumb_photo)
                     
@@ -1692,7 +2222,9 @@ class App(ThemedTk):
     def _remove_file(self, file_to_remove):
         try:
             self.file_list.remove(file_to_remove)
+            self._file_index.discard(file_to_remove)
             self._update_file_list()
+            self._refresh_file_list_summary()
             self._log(f"已從列表中移除: {os.path.basename(file_to_remove)}")
         except ValueError:
             self._log(f"嘗試移除不存在的檔案: {os.path.basename(file_to_remove)}", is_error=True)
@@ -1705,11 +2237,95 @@ class App(ThemedTk):
         
         files = filedialog.askopenfilenames(title="選擇圖片檔案", filetypes=[("圖片檔案", "*.jpg *.jpeg *.png *.bmp *.webp *.gif"), ("所有檔案", "*.*")])
         if files:
-            normalized_files = [os.path.normpath(f) for f in files]
-            self.file_list.extend(normalized_files)
-            self.file_list = sorted(list(set(self.file_list)))
+            added = self._add_to_file_list(os.path.normpath(f) for f in files)
             self._update_file_list()
-            self._log(f"已新增 {len(files)} 個檔案至列表。")
+            self._refresh_file_list_summary()
+            self._log(f"已新增 {added} 個檔案至列表。")
+
+    def _add_to_file_list(self, paths):
+        """依加入順序附加新檔案，已在列表中的檔案以索引判斷後略過，回傳新增數量。"""
+        added = 0
+        for path in paths:
+            if self._file_index.add(path):
+                self.file_list.append(path)
+                added += 1
+        return added
+
+    def _select_folder(self):
+        folder = filedialog.askdirectory(title="選擇圖片資料夾")
+        if not folder or getattr(self, '_scanning_folder', False):
+            return
+        if self.converted_files:
+            self.converted_files.clear()
+        self._scanning_folder = True
+        self._folder_added = 0
+        self.btn_folder.config(state="disabled")
+        recursive = self.recursive_var.get()
+
+        def job():
+            # 邊掃描邊分批交給介面，大型資料夾也能立即看到進度
+            chunk = []
+            last_flush = time.monotonic()
+            try:
+                for path in iter_image_files(folder, recursive=recursive):
+                    chunk.append(path)
+                    if len(chunk) >= 500 or time.monotonic() - last_flush > 0.2:
+                        self.after(0, self._add_discovered_files, chunk)
+                        chunk = []
+                        last_flush = time.monotonic()
+            finally:
+                self.after(0, self._add_discovered_files, chunk, True)
+
+        self.file_list_frame.config(text="正在搜尋圖片…")
+        threading.Thread(target=job, daemon=True).start()
+
+    def _add_discovered_files(self, paths, finished=False):
+        start = len(self.file_list)
+        self._folder_added += self._add_to_file_list(paths)
+        feed = self._conversion_feed
+        if feed is not None:
+            # 轉換已在進行：新找到的檔案直接交給批次引擎，搜尋結束後送出結束標記
+            feed.put(self.file_list[start:])
+            if finished:
+                feed.put(None)
+                self._conversion_feed = None
+        if not finished:
+            self.file_list_frame.config(text=f"正在搜尋圖片… 已找到 {len(self.file_list)} 個")
+            return
+        # 掃描完成後才重建列表，避免每批都重新建立所有項目
+        self._scanning_folder = False
+        self.btn_folder.config(state="normal")
+        self._update_file_list()
+        self._refresh_file_list_summary()
+        self._log(f"已從資料夾新增 {self._folder_added} 個檔案至列表。")
+
+    def _refresh_file_list_summary(self):
+        """在背景讀取檔頭，完成後於列表標題顯示總數、像素與預估輸出大小。"""
+        files = list(self.file_list)
+        if not files or self.converted_files:
+            self._file_list_probe = None
+            if not self.converted_files:
+                self.file_list_frame.config(text="待處理檔案")
+            return
+
+        def job():
+            infos = probe_many(files)
+            self.after(0, self._show_file_list_summary, files, infos)
+
+        threading.Thread(target=job, daemon=True).start()
+
+    def _show_file_list_summary(self, files, infos):
+        # 讀取期間列表已改變時忽略過期的結果
+        if files != self.file_list or self.converted_files or not self.file_list_frame.winfo_exists():
+            return
+        self._file_list_probe = infos
+        summary = estimate_batch(infos.values(), self.output_format_var.get(), self.quality_var.get(),
+                                 encoder_preset=self._selected_encoder_preset())
+        text = (f"待處理檔案 ({summary['files']} 個 · {summary['megapixels']:.1f} MP · "
+                f"{format_size(summary['input_bytes'])} → 預估 {format_size(summary['estimated_output_bytes'])})")
+        if summary["failures"]:
+            text = text[:-1] + f" · {summary['failures']} 個無法讀取)"
+        self.file_list_frame.config(text=text)
 
     def _select_output_folder(self):
         folder = filedialog.askdirectory(title="選擇輸出資料夾")
@@ -1717,9 +2333,17 @@ class App(ThemedTk):
             self.output_dir = os.path.normpath(folder)
             self.output_dir_label.config(text=f"輸出至: {self.output_dir}")
 
+    def _selected_encoder_preset(self):
+        return self.ENCODER_PRESET_LABELS.get(self.encoder_preset_var.get())
+
     def _on_format_change(self, *args):
-        is_jpeg = self.output_format_var.get().upper() == "JPEG"
+        # 品質一律套用到 JPEG；指定編碼預設時也套用到 WEBP / AVIF
+        output_format = self.output_format_var.get().upper()
+        is_jpeg = output_format == "JPEG" or (self._selected_encoder_preset() is not None and output_format in QUALITY_FORMATS)
         self.quality_enabled = is_jpeg
+        # 檔頭資訊已快取，直接依新格式重新估計
+        if getattr(self, '_file_list_probe', None):
+            self._show_file_list_summary(self.file_list, self._file_list_probe)
         state = "normal" if is_jpeg else "disabled"
         
         # Redraw slider to reflect enabled/disabled state
@@ -1753,9 +2377,30 @@ class App(ThemedTk):
             self.log_tree.see(self.log_tree.get_children()[-1])
 
         elif status == "finished":
+            if result_data.get("profile"):
+                self._log_profile_summary(result_data["profile"])
+            if result_data.get("cache"):
+                cache = result_data["cache"]
+                self._log(f"結果快取: 命中 {cache['hits']}，未命中 {cache['misses']}，使用 {format_size(cache['bytes'])}")
             output_files = result_data.get("output_files", [])
             self._processing_finished(output_files)
 
+    def _log_profile_summary(self, profile):
+        # 列出累計耗時最多的階段，協助判斷批次的瓶頸
+        stages = {name: stats["sum"] for name, stats in profile.get("stages", {}).items() if name != "total"}
+        total = sum(stages.values())
+        if not total:
+            return
+        slowest = sorted(stages.items(), key=lambda item: item[1], reverse=True)[:3]
+        parts = [f"{name} {seconds:.2f}s ({seconds / total:.0%})" for name, seconds in slowest]
+        self._log(f"階段耗時: {', '.join(parts)}")
+
+    def _get_result_cache(self):
+        # 第一次使用時才建立，避免啟動時掃描快取資料夾
+        if getattr(self, '_result_cache', None) is None:
+            self._result_cache = ResultCache()
+        return self._result_cache
+
     def _start_conversion(self):
         if not self.file_list:
             messagebox.showerror("錯誤", "尚未選擇任何輸入檔案。")
@@ -1773,23 +2418,53 @@ class App(ThemedTk):
         # 禁用所有動作按鈕
         if hasattr(self, 'start_button'): self.start_button.config(state="disabled")
         
+        file_list = self.file_list
+        if getattr(self, '_scanning_folder', False):
+            # 資料夾仍在搜尋：先處理已找到的檔案，之後找到的檔案陸續加入同一批次
+            self._conversion_feed = queue.Queue()
+            file_list = self._iter_conversion_files(list(self.file_list), self._conversion_feed)
+            self._log("資料夾仍在搜尋中，找到的檔案會陸續加入轉換。")
+
         settings = {
-            "file_list": self.file_list,
+            "file_list": file_list,
             "output_dir": out_dir,
             "output_format": self.output_format_var.get(),
             "quality": self.quality_var.get(),
             "resize_options": {'type': 'none'},
-            "progress_callback": self._update_progress
+            "progress_callback": self._update_progress,
+            "keep_metadata": self.keep_metadata_var.get(),
+            "keep_icc": self.keep_icc_var.get(),
+            "profile": BatchProfile(),
+            "memory_budget": self.memory_budget,
+            "result_cache": self._get_result_cache() if self.use_cache_var.get() else None,
+            "encoder_preset": self._selected_encoder_preset(),
         }
 
+        archive_ext = self.OUTPUT_ARCHIVE_EXTENSIONS.get(self.output_mode_var.get())
+        if archive_ext:
+            stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            settings["archive_path"] = os.path.join(out_dir, f"converted_{stamp}{archive_ext}")
+            self._log(f"輸出將寫入封存檔: {settings['archive_path']}")
+
         # 呼叫獨立的轉換處理函式來執行背景任務
         run_conversion_in_thread(settings)
 
+    @staticmethod
+    def _iter_conversion_files(initial, feed):
+        """先產生開始轉換時已找到的檔案，再依序產生搜尋中新找到的檔案，直到收到 None。"""
+        yield from initial
+        while True:
+            paths = feed.get()
+            if paths is None:
+                return
+            yield from paths
+
     def _processing_finished(self, output_files):
         self.start_button.config(state="normal")
         messagebox.showinfo("成功", "圖片處理完成！")
         # 清空列表並重置 UI
         self.file_list = []
+        self._file_index.clear()
         self.converted_files = []
         self._update_file_list()
         
@@ -1849,8 +2524,9 @@ class App(ThemedTk):
             widget.destroy()
 
         # 主要佈局：左側（預覽）+ 右側（側邊欄）
-        self._rotate_original_images = [] # 清除舊狀態
-        self.rotate_original_backup = []
+        self._rotate_preview_images = [] # 清除舊狀態（只保留小縮圖，不保留原圖）
+        # 每個檔案累計的順時針旋轉角度，存檔時才真正套用
+        self._rotate_angles = [0] * len(self.rotate_files_list)
         
         layout_frame = ttk.Frame(self.rotate_container)
         layout_frame.pack(fill=tk.BOTH, expand=True)
@@ -1979,11 +2655,12 @@ class App(ThemedTk):
         self.btn_rotate_action.tag_bind("action", "<Button-1>", on_action_click)
 
     def _reset_all_rotations(self):
-        """從備份還原所有圖片"""
-        if not self.rotate_original_backup: return
+        """清除所有圖片的累計旋轉角度"""
+        if not self._rotate_angles: return
         
-        self._rotate_original_images = [img.copy() for img in self.rotate_original_backup]
-        self._load_rotate_previews()
+        self._rotate_angles = [0] * len(self._rotate_angles)
+        for index in range(len(self._rotate_angles)):
+            self._refresh_rotate_thumbnail(index)
         self._log("已重置所有旋轉設定。")
 
         
@@ -1997,7 +2674,7 @@ class App(ThemedTk):
              
     def _load_rotate_previews(self):
         self._rotate_thumbnail_cache = []
-        if not self._rotate_original_images:
+        if not self._rotate_preview_images:
              init_load = True
         else:
              init_load = False
@@ -2013,29 +2690,37 @@ class App(ThemedTk):
         center_container.pack(expand=True, pady=50)
 
         for i, file_path in enumerate(self.rotate_files_list):
+            if init_load:
+                try:
+                    preview = self._load_rotate_preview_image(file_path)
+                except Exception as e:
+                    print(f"Error: {e}")
+                    preview = None
+                # 失敗的檔案也佔一個位置，確保索引與檔案列表對齊
+                self._rotate_preview_images.append(preview)
+
+            img = self._rotate_preview_images[i]
+            if img is None:
+                self._rotate_thumbnail_cache.append(None)
+                self._rotate_preview_labels.append(None)
+                continue
+
             try:
-                if init_load:
-                    img = Image.open(file_path)
-                    self._rotate_original_images.append(img.copy())
-                    self.rotate_original_backup.append(img.copy())
-                
-                img = self._rotate_original_images[i]
+                angle = self._rotate_angles[i]
                 
                 thumb_frame = tk.Frame(center_container, bg="white", padx=5, pady=5)
                 thumb_frame.pack(side=tk.LEFT, padx=10)
                 
-                # 初始縮圖
-                thumb_copy = img.copy()
-                thumb_copy.thumbnail((150, 150))
-                photo = ImageTk.PhotoImage(thumb_copy)
+                # 初始縮圖（先縮小再套用累計角度）
+                photo = ImageTk.PhotoImage(self._make_rotate_thumbnail(img, angle))
                 self._rotate_thumbnail_cache.append(photo)
                 
                 img_label = tk.Label(thumb_frame, image=photo, bg="white")
                 img_label.pack()
                 self._rotate_preview_labels.append(img_label)
                 
-                # 若為 GIF，啟動動畫
-                if file_path.lower().endswith('.gif'):
+                # 若為 GIF 且未旋轉，啟動動畫；旋轉後僅顯示靜態影格
+                if file_path.lower().endswith('.gif') and angle == 0:
                     self._animate_gif(img_label, file_path)
                 
                 # 點擊單張旋轉
@@ -2176,65 +2861,101 @@ class App(ThemedTk):
             del self._gif_animations[widget]
 
 
+    def _load_rotate_preview_image(self, file_path):
+        """
+        只解碼出預覽用的小縮圖；原圖在存檔時才由背景工作逐一讀取。
+        thumbnail 會先對 JPEG 使用 draft，以 DCT 縮放方式解碼，並依 EXIF 方向轉正。
+        """
+        return load_oriented_thumbnail(file_path, (150, 150))
+
+    def _make_rotate_thumbnail(self, img, angle):
+        """由預覽縮圖套用順時針角度（transpose 不需插值）。"""
+        thumb = img
+        if angle % 360:
+            thumb = thumb.transpose(ROTATE_METHODS[angle % 360])
+        return thumb
+
+    def _refresh_rotate_thumbnail(self, index):
+        """
+        依累計角度更新單一預覽標籤的圖片。
+        只轉換 150px 的快取縮圖並更新既有標籤，不重建版面。
+        """
+        if index >= len(self._rotate_preview_labels):
+            return
+        label = self._rotate_preview_labels[index]
+        base = self._rotate_preview_images[index]
+        if label is None or base is None:
+            return
+
+        angle = self._rotate_angles[index]
+        # 停止任何動畫
+        self._stop_animation(label)
+        
+        photo = ImageTk.PhotoImage(self._make_rotate_thumbnail(base, angle))
+        # 更新快取以防止 GC
+        self._rotate_thumbnail_cache[index] = photo
+        label.configure(image=photo)
+        label.image = photo
+        
+        # GIF 回到原始方向時恢復動畫，旋轉後僅顯示靜態旋轉影格
+        file_path = self.rotate_files_list[index]
+        if file_path.lower().endswith('.gif') and angle == 0:
+            self._animate_gif(label, file_path)
+
     def _rotate_single_image(self, index):
-        # 將特定圖片向右旋轉 90 度
-        if index < len(self._rotate_original_images):
-             img = self._rotate_original_images[index]
-             rotated = img.rotate(-90, expand=True) 
-             self._rotate_original_images[index] = rotated
-             
+        # 將特定圖片向右旋轉 90 度（只記錄角度）
+        if index < len(self._rotate_preview_images) and self._rotate_preview_images[index] is not None:
+             self._rotate_angles[index] = (self._rotate_angles[index] + 90) % 360
              # 僅更新此標籤的精確操作，以防止滾動重置
-             label = self._rotate_preview_labels[index]
-             # 停止任何動畫
-             self._stop_animation(label)
-             
-             thumb_copy = rotated.copy()
-             thumb_copy.thumbnail((150, 150))
-             photo = ImageTk.PhotoImage(thumb_copy)
-             # 更新快取以防止 GC
-             self._rotate_thumbnail_cache[index] = photo
-             label.configure(image=photo)
-             label.image = photo
-             
-             # 若為 GIF，我們可能想要重新啟動動畫但旋轉之
-             # 目前為求簡單，僅顯示靜態旋轉影格
+             self._refresh_rotate_thumbnail(index)
 
     def _perform_single_step_rotate(self, direction):
-        # 旋轉記憶體中的所有圖片（僅預覽，直到儲存）
-        angle = -90 if direction == "right" else 90
-        
-        for i in range(len(self._rotate_original_images)):
-            img = self._rotate_original_images[i]
-            rotated = img.rotate(angle, expand=True)
-            self._rotate_original_images[i] = rotated
+        # 累加所有圖片的旋轉角度（僅預覽，直到儲存）
+        step = 90 if direction == "right" else 270
+        self._rotate_angles = [(angle + step) % 360 for angle in self._rotate_angles]
         
-        self._load_rotate_previews()
+        # 就地更新每個縮圖，不銷毀與重建元件
+        for index in range(len(self._rotate_angles)):
+            self._refresh_rotate_thumbnail(index)
             
     def _perform_batch_rotate_save(self):
-        # 儲存 self._rotate_original_images 中的所有圖片
-        # 詢問輸出目錄
-         output_dir = filedialog.askdirectory(title="選擇輸出資料夾")
-         if not output_dir: return
-         
-         success_count = 0
-         for i, img in enumerate(self._rotate_original_images):
-             try:
-                 src_path = self.rotate_files_list[i]
-                 fname = os.path.basename(src_path)
-                 name, ext = os.path.splitext(fname)
-                 save_path = os.path.join(output_dir, f"{name}_rotated{ext}")
-                 img.save(save_path)
-                 success_count += 1
-             except Exception as e:
-                 print(e)
-         
-         messagebox.showinfo("成功", f"成功旋轉 {success_count} 張圖片！\n圖片已儲存至:\n{output_dir}")
-         self._show_rotate_landing()
-         
-         
-
-    def _show_rotate_result(self, count):
-        """顯示旋轉結果"""
+        # 依累計角度平行旋轉並儲存所有圖片
+        # JPEG 只改寫 EXIF orientation（或使用 jpegtran），其他格式解碼與編碼各一次
+        output_dir = filedialog.askdirectory(title="選擇輸出資料夾")
+        if not output_dir: return
+        if getattr(self, '_rotate_saving', False): return
+
+        jobs = list(zip(self.rotate_files_list, self._rotate_angles))
+        self._rotate_saving = True
+        self.last_rotate_output = output_dir
+
+        def job():
+            saved = None
+            failures = []
+
+            def on_progress(result):
+                if result["status"] == "failure":
+                    failures.append((result["filename"], result["message"]))
+
+            try:
+                saved = RotateProcessor().rotate_batch(jobs, output_dir, progress_callback=on_progress)
+            except Exception as e:
+                self.after(0, messagebox.showerror, "錯誤", f"旋轉儲存失敗:\n{e}")
+            finally:
+                # 無論成功與否都要解除儲存中的狀態，否則儲存按鈕會一直被擋住
+                self.after(0, self._rotate_save_finished, saved, failures)
+
+        threading.Thread(target=job, daemon=True).start()
+
+    def _rotate_save_finished(self, saved, failures):
+        self._rotate_saving = False
+        for filename, message in failures:
+            self._log(f"旋轉失敗 {filename}: {message}", is_error=True)
+        if saved is not None:
+            self._show_rotate_result(len(saved), failures)
+
+    def _show_rotate_result(self, count, failures=()):
+        """顯示旋轉結果；有失敗的檔案時一併列出。"""
         for widget in self.rotate_container.winfo_children():
             widget.destroy()
 
@@ -2243,6 +2964,12 @@ class App(ThemedTk):
 
         # 標題
         ttk.Label(content, text=f"成功旋轉 {count} 張圖片！", font=(self.font_family, 24, "bold"), foreground="#333").pack(pady=(0, 30))
+        if failures:
+            lines = [f"{filename}: {message}" for filename, message in failures[:self.MAX_LISTED_FAILURES]]
+            if len(failures) > self.MAX_LISTED_FAILURES:
+                lines.append(f"…另有 {len(failures) - self.MAX_LISTED_FAILURES} 個檔案")
+            ttk.Label(content, text=f"{len(failures)} 張圖片旋轉失敗：\n" + "\n".join(lines),
+                      foreground="#c62828", justify="left", wraplength=480).pack(pady=(0, 20))
 
         # 下載按鈕
         row1 = ttk.Frame(content)
@@ -2272,12 +2999,16 @@ class App(ThemedTk):
         dl_btn.create_line(cx-10, cy+5, cx-10, cy+12, cx+10, cy+12, cx+10, cy+5, fill="white", width=3, capstyle="round")
         
         dl_btn.create_text(210, 30, text="開啟輸出資料夾", fill="black", font=(self.font_family, 14, "bold"))
-        dl_btn.bind("<Button-1>", lambda e: os.startfile(self.last_rotate_output) if os.name == 'nt' else None)
+        dl_btn.bind("<Button-1>", lambda e: self._open_path(self.last_rotate_output))
 
     def _reset_video_tab(self):
         # 若正在播放則停止
         if self.is_playing:
             self._toggle_play()
+        # 重設後不再需要背景的影格數掃描
+        for cancel_event in self._frame_count_scans.values():
+            cancel_event.set()
+        self._frame_count_scans.clear()
         
         # 清除子元件
         for widget in self.video_tab.winfo_children():
@@ -2305,9 +3036,23 @@ class App(ThemedTk):
         self.video_info_label = ttk.Label(control_frame, text="尚未載入影片", font=self.font_normal, foreground="#555")
         self.video_info_label.pack(side=tk.LEFT, padx=15)
 
+        # 已開啟的影片（工作階段）切換
+        self.video_session_var = tk.StringVar()
+        self.video_session_combo = ttk.Combobox(control_frame, textvariable=self.video_session_var, state="readonly", width=28)
+        self.video_session_combo.pack(side=tk.RIGHT)
+        self.video_session_combo.bind("<<ComboboxSelected>>", self._on_video_session_selected)
+        ttk.Label(control_frame, text="已開啟:", font=self.font_normal).pack(side=tk.RIGHT, padx=(0, 5))
+        self._refresh_video_sessions()
+        self.video_session_var.set("") # 重置分頁後尚未顯示任何影片
+
         # 預覽區（畫布）
         self.video_canvas = tk.Canvas(main_frame, bg="black", height=400)
         self.video_canvas.pack(fill=tk.BOTH, expand=True)
+        # 持久的 PhotoImage 與畫布項目，每張影格只更新像素內容
+        self._video_photo = None
+        self._video_image_item = None
+        self._video_overlay_size = None
+        self._current_video_index = None
 
         # 播放/預覽控制（滑桿與儲存）
         bottom_frame = ttk.Frame(main_frame, padding="10")
@@ -2324,6 +3069,17 @@ class App(ThemedTk):
         self.video_slider_canvas.bind("<B1-Motion>", self._on_slider_interact)
         self.video_slider_canvas.bind("<Configure>", lambda e: self._draw_video_slider())
 
+        # 動畫片段區間（起點/終點影格）
+        self._clip_in = None
+        self._clip_out = None
+        clip_frame = ttk.Frame(bottom_frame)
+        clip_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Button(clip_frame, text="[ 設定起點", command=lambda: self._set_clip_marker("in"), width=10).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(clip_frame, text="設定終點 ]", command=lambda: self._set_clip_marker("out"), width=10).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(clip_frame, text="清除", command=self._clear_clip_markers, width=6).pack(side=tk.LEFT, padx=(0, 10))
+        self.clip_info_label = ttk.Label(clip_frame, text="尚未設定片段", font=self.font_normal, foreground="#555")
+        self.clip_info_label.pack(side=tk.LEFT)
+
         # 按鈕與資訊
         action_frame = ttk.Frame(bottom_frame)
         action_frame.pack(fill=tk.X)
@@ -2353,6 +3109,14 @@ class App(ThemedTk):
         # 我們不使用 ttk 的 state，而是保留此變數以相容舊程式碼引用
         self.btn_save_frame = self.btn_save_frame_canvas 
 
+        # 場景變化截圖：只保存畫面有明顯變化的影格
+        self.btn_scene_extract = self._create_blue_button(action_frame, "場景截圖", self._extract_scene_frames, height=35, width=120)
+        self.btn_scene_extract.pack(side=tk.RIGHT, padx=(0, 10))
+
+        # 匯出動畫 GIF/WebP
+        self.btn_clip_export = self._create_blue_button(action_frame, "匯出動畫", self._export_video_clip, height=35, width=120)
+        self.btn_clip_export.pack(side=tk.RIGHT, padx=(0, 10))
+
 
     def _select_video(self):
         file_path = filedialog.askopenfilename(
@@ -2360,25 +3124,111 @@ class App(ThemedTk):
             filetypes=[("Video Files", "*.mp4 *.avi *.mov *.mkv *.wmv"), ("All Files", "*.*")]
         )
         if file_path:
-            try:
-                info = self.video_processor.load_video(file_path)
-                self.video_info_label.config(text=f"已載入: {os.path.basename(file_path)}")
-                
-                # 更新控制項
-                self.video_slider_max = info["total_frames"] - 1
-                self.video_slider_var.set(0)
-                self._draw_video_slider() # 初始繪製
-                self.btn_save_frame.configure(state="normal")
-                self.btn_play_video.configure(state="normal") # 啟用播放按鈕
-                self.btn_rewind.configure(state="normal")
-                self.btn_forward.configure(state="normal")
-                
-                # 顯示第一幀
-                self._update_video_preview(0)
+            self._activate_video_session(file_path)
 
-                
+    def _activate_video_session(self, file_path):
+        """切換至指定影片；已開啟的影片直接沿用其解碼狀態與播放位置。"""
+        if self.is_playing:
+            self._toggle_play()
+        try:
+            self.video_processor = self.video_pool.acquire(file_path)
+            info = self.video_processor.get_info()
+            self.video_info_label.config(text=f"已載入: {os.path.basename(file_path)}")
+            
+            # 更新控制項
+            self.video_slider_max = info["total_frames"] - 1
+            self._clear_clip_markers()
+            position = self.video_processor.position
+            self.video_slider_var.set(position)
+            self._draw_video_slider() # 初始繪製
+            self.btn_save_frame.configure(state="normal")
+            self.btn_play_video.configure(state="normal") # 啟用播放按鈕
+            self.btn_rewind.configure(state="normal")
+            self.btn_forward.configure(state="normal")
+            
+            # 顯示上次的位置（新影片為第一幀）
+            self._update_video_preview(position)
+
+            # 中繼資料的影格數不可靠時（沒有逐格索引的容器），於背景掃描實際影格數
+            if self.video_processor.frame_count_needs_scan():
+                self._start_frame_count_scan(self.video_processor)
+            
+        except Exception as e:
+            messagebox.showerror("錯誤", f"無法載入影片:\n{e}")
+        self._refresh_video_sessions()
+
+    def _frame_count_scan_key(self, file_path):
+        return os.path.normcase(os.path.abspath(file_path))
+
+    def _start_frame_count_scan(self, processor):
+        """
+        在背景執行緒中確認影格數，完成後更新滑桿範圍。
+
+        同一部影片同時只掃描一次；工作階段被淘汰或影片分頁重設時取消掃描。
+        背景執行緒只讀取影片，結果在 UI 執行緒套用到處理器。
+        """
+        if processor.frame_count_verified or not processor.file_path:
+            return
+        key = self._frame_count_scan_key(processor.file_path)
+        if key in self._frame_count_scans:
+            return
+        cancel_event = threading.Event()
+        self._frame_count_scans[key] = cancel_event
+
+        def job():
+            timestamps = None
+            try:
+                timestamps = processor.scan_frame_timestamps(cancel_event=cancel_event)
             except Exception as e:
-                messagebox.showerror("錯誤", f"無法載入影片:\n{e}")
+                self.after(0, self._log, f"影格數掃描失敗 ({os.path.basename(processor.file_path)}): {e}", True)
+            self.after(0, self._frame_count_scan_finished, processor, key, cancel_event, timestamps)
+
+        threading.Thread(target=job, daemon=True).start()
+
+    def _cancel_frame_count_scan(self, file_path):
+        """取消指定影片進行中的影格數掃描（工作階段被釋放時呼叫）。"""
+        cancel_event = self._frame_count_scans.pop(self._frame_count_scan_key(file_path), None)
+        if cancel_event:
+            cancel_event.set()
+
+    def _frame_count_scan_finished(self, processor, key, cancel_event, timestamps):
+        if self._frame_count_scans.get(key) is cancel_event:
+            del self._frame_count_scans[key]
+        if cancel_event.is_set() or timestamps is None:
+            return
+        processor.apply_frame_timestamps(timestamps)
+        # 只在使用者仍停留在同一部影片時更新
+        if processor is not self.video_processor or not self.frame_info_label.winfo_exists():
+            return
+        self.video_slider_max = max(0, processor.total_frames - 1)
+        if self.video_slider_var.get() > self.video_slider_max:
+            self.video_slider_var.set(self.video_slider_max)
+        self._draw_video_slider()
+        self._update_frame_info(int(self.video_slider_var.get()))
+
+    def _update_frame_info(self, frame_idx, show_decode_rate=False):
+        """更新影格資訊標籤；影格數尚未確認時以 ~ 標示。"""
+        processor = self.video_processor
+        total = processor.total_frames if processor.frame_count_verified else f"~{processor.total_frames}"
+        timestamp = processor.timestamp_of(frame_idx)
+        text = f"Frame: {frame_idx} / {total}  ({timestamp:.2f}s)"
+        if show_decode_rate:
+            text += f"  解碼 {processor.get_decode_stats()['decode_fps']:.0f} fps"
+        self.frame_info_label.config(text=text)
+
+    def _refresh_video_sessions(self):
+        """更新已開啟影片的下拉選單。"""
+        self._video_session_paths = self.video_pool.paths()
+        self.video_session_combo.configure(values=[os.path.basename(p) for p in self._video_session_paths])
+        if self._video_session_paths and self.video_processor.file_path in self._video_session_paths:
+            self.video_session_combo.current(self._video_session_paths.index(self.video_processor.file_path))
+        else:
+            self.video_session_var.set("")
+
+    def _on_video_session_selected(self, event=None):
+        index = self.video_session_combo.current()
+        if 0 <= index < len(self._video_session_paths):
+            self._activate_video_session(self._video_session_paths[index])
 
     def _draw_video_slider(self):
         cv = self.video_slider_canvas
@@ -2406,6 +3256,14 @@ class App(ThemedTk):
         # Draw Progress Track (Blue)
         if ratio > 0:
             cv.create_line(margin_x, cy, thumb_x, cy, fill="#4285f4", width=4, capstyle="round")
+
+        # Draw Clip Range (Orange)
+        if self.video_slider_max > 0 and (self._clip_in is not None or self._clip_out is not None):
+            clip_in = self._clip_in if self._clip_in is not None else 0
+            clip_out = self._clip_out if self._clip_out is not None else self.video_slider_max
+            x_in = margin_x + track_w * clip_in / self.video_slider_max
+            x_out = margin_x + track_w * clip_out / self.video_slider_max
+            cv.create_rectangle(x_in, cy - 6, x_out, cy + 6, fill="", outline="#f4a142", width=2)
             
         # Draw Thumb (Circle)
         r = 5
@@ -2441,18 +3299,18 @@ class App(ThemedTk):
         frame_idx = int(float(val))
         
         # 更新影格資訊標籤
-        total = self.video_processor.total_frames
-        fps = self.video_processor.fps
-        timestamp = frame_idx / fps if fps > 0 else 0
-        self.frame_info_label.config(text=f"Frame: {frame_idx} / {total}  ({timestamp:.2f}s)")
-
-        # 取得影格
-        image = self.video_processor.get_frame(frame_idx)
-        if image:
-            self._display_video_frame(image)
-        
-        # 儲存目前圖片以供存檔
-        self._current_video_frame = image
+        self._update_frame_info(frame_idx)
+
+        # 取得已縮放至畫布尺寸的影格
+        canvas_w, canvas_h = self._get_video_canvas_size()
+        frame = self.video_processor.get_display_frame(frame_idx, canvas_w, canvas_h)
+        if frame is not None:
+            self._display_video_frame(frame)
+            # 只記錄索引，存檔時再讀取完整解析度影格
+            self._current_video_index = frame_idx
+        elif not self.video_processor.frame_count_verified:
+            # 讀不到中繼資料範圍內的影格，表示影格數不正確，改以掃描結果為準
+            self._start_frame_count_scan(self.video_processor)
         
         # 確保滑桿與值同步 (若是從播放器更新)
         # 注意：避免無窮迴圈，只有當數值改變時才需要擔心
@@ -2477,44 +3335,64 @@ class App(ThemedTk):
         self._update_video_preview(new_frame_idx)
         self._draw_video_slider()
 
-    def _display_video_frame(self, image):
-        # 調整大小以適應畫布並維持長寬比
+    def _get_video_canvas_size(self):
         canvas_w = self.video_canvas.winfo_width()
         canvas_h = self.video_canvas.winfo_height()
         
         if canvas_w < 10 or canvas_h < 10:
-             # 若畫布尚未繪製，猜測或等待？
-             # 僅使用合理的預設值以避免崩潰
+             # 若畫布尚未繪製，使用合理的預設值以避免崩潰
              canvas_w = 600
              canvas_h = 400
-        
-        img_w, img_h = image.size
-        scale = min(canvas_w / img_w, canvas_h / img_h)
-        new_w = int(img_w * scale)
-        new_h = int(img_h * scale)
-        
-        resized = image.resize((new_w, new_h), Image.Resampling.LANCZOS)
-        self._video_tk_image = ImageTk.PhotoImage(resized) # 保留引用
+        return canvas_w, canvas_h
+
+    def _display_video_frame(self, frame):
+        """
+        顯示已縮放的 RGB 影格緩衝區。
+
+        PhotoImage 與畫布項目只建立一次，之後以 paste 就地更新像素，
+        只有在顯示尺寸改變時才重新配置。
+        """
+        canvas_w, canvas_h = self._get_video_canvas_size()
+        new_h, new_w = frame.shape[:2]
+
+        # Image.fromarray 直接引用 NumPy 緩衝區，不額外複製
+        image = Image.fromarray(frame)
+        if self._video_photo is None or (self._video_photo.width(), self._video_photo.height()) != (new_w, new_h):
+            self._video_photo = ImageTk.PhotoImage(image) # 保留引用
+            if self._video_image_item is None:
+                self._video_image_item = self.video_canvas.create_image(0, 0, anchor="nw", image=self._video_photo)
+            else:
+                self.video_canvas.itemconfig(self._video_image_item, image=self._video_photo)
+        else:
+            self._video_photo.paste(image)
         
         # 置中
         off_x = (canvas_w - new_w) // 2
         off_y = (canvas_h - new_h) // 2
-        
-        self.video_canvas.delete("all")
-        self.video_canvas.create_image(off_x, off_y, anchor="nw", image=self._video_tk_image)
+        self.video_canvas.coords(self._video_image_item, off_x, off_y)
 
-        # 繪製關閉按鈕
+        if self._video_overlay_size != (canvas_w, canvas_h):
+            self._draw_video_overlay(canvas_w)
+            self._video_overlay_size = (canvas_w, canvas_h)
+
+    def _draw_video_overlay(self, canvas_w):
+        """建立或移動影片畫布上的關閉按鈕。"""
         padding = 15
         btn_r = 14
         cx_btn = canvas_w - padding - btn_r
         cy_btn = padding + btn_r
+
+        if self.video_canvas.find_withtag("close_btn_bg"):
+            self.video_canvas.coords("close_btn_bg", cx_btn-btn_r, cy_btn-btn_r, cx_btn+btn_r, cy_btn+btn_r)
+            self.video_canvas.coords("close_btn_text", cx_btn, cy_btn)
+            return
         
         # 圓圈
         self.video_canvas.create_oval(cx_btn-btn_r, cy_btn-btn_r, cx_btn+btn_r, cy_btn+btn_r, fill="#eee", outline="#ccc", tags=("vid_overlay", "close_btn_bg"))
         # X
         self.video_canvas.create_text(cx_btn, cy_btn, text="✕", fill="#555", font=("Arial", 10, "bold"), tags=("vid_overlay", "close_btn_text"))
         
-        # 綁定
+        # 綁定（只在建立時綁定一次）
         self.video_canvas.tag_bind("close_btn_bg", "<Button-1>", lambda e: self._reset_video_tab())
         self.video_canvas.tag_bind("close_btn_text", "<Button-1>", lambda e: self._reset_video_tab())
         
@@ -2544,22 +3422,20 @@ class App(ThemedTk):
         if not self.is_playing:
             return
 
-        image, idx = self.video_processor.get_next_frame()
+        canvas_w, canvas_h = self._get_video_canvas_size()
+        frame, idx = self.video_processor.get_next_display_frame(canvas_w, canvas_h)
         
-        if image:
+        if frame is not None:
             # 更新滑桿數值並重新繪製滑桿視覺
             self.video_slider_var.set(idx)
             self._draw_video_slider()
             
             # Update display
-            self._display_video_frame(image) # Directly display, skip re-seek
-            self._current_video_frame = image
+            self._display_video_frame(frame) # Directly display, skip re-seek
+            self._current_video_index = idx
             
             # Update label
-            total = self.video_processor.total_frames
-            fps = self.video_processor.fps
-            timestamp = idx / fps if fps > 0 else 0
-            self.frame_info_label.config(text=f"Frame: {idx} / {total}  ({timestamp:.2f}s)")
+            self._update_frame_info(idx, show_decode_rate=True)
             
             # Schedule next frame
             # FPS control: 1000ms / fps
@@ -2569,10 +3445,19 @@ class App(ThemedTk):
         else:
             # End of video
             self._toggle_play()
+            if not self.video_processor.frame_count_verified and self.video_slider_var.get() < self.video_slider_max:
+                # 影片在中繼資料的影格數之前就結束，掃描實際影格數
+                self._start_frame_count_scan(self.video_processor)
 
     def _save_screenshot(self):
 
-        if hasattr(self, '_current_video_frame') and self._current_video_frame:
+        if getattr(self, '_current_video_index', None) is not None:
+            if self.is_playing:
+                self._toggle_play()
+            # 存檔時才讀取完整解析度影格
+            image = self.video_processor.get_frame(self._current_video_index)
+            if image is None:
+                return
             file_path = filedialog.asksaveasfilename(
                 title="儲存截圖",
                 defaultextension=".jpg",
@@ -2580,9 +3465,138 @@ class App(ThemedTk):
             )
             if file_path:
                 try:
-                    self._current_video_frame.save(file_path)
+                    image.save(file_path)
                     messagebox.showinfo("成功", f"圖片已儲存至:\n{file_path}")
                     self._reset_video_tab()
                 except Exception as e:
                     messagebox.showerror("錯誤", f"儲存失敗:\n{e}")
 
+    def _extract_scene_frames(self):
+        """在背景執行緒中偵測場景變化，並將每個場景的第一張影格存檔。"""
+        if not self.video_processor.cap or not self.video_processor.file_path:
+            return
+        if getattr(self, '_scene_extracting', False):
+            return
+
+        output_dir = filedialog.askdirectory(title="選擇場景截圖輸出資料夾")
+        if not output_dir:
+            return
+
+        if self.is_playing:
+            self._toggle_play()
+
+        video_path = self.video_processor.file_path
+        base_name = os.path.splitext(os.path.basename(video_path))[0]
+        self._scene_extracting = True
+
+        def report_progress(idx, total):
+            # 每 30 張影格回報一次，避免大量排程 UI 更新
+            if total > 0 and idx % 30 == 0:
+                percent = idx / total * 100
+                self.after(0, lambda: self.video_info_label.config(text=f"場景偵測中... {percent:.0f}%"))
+
+        def job():
+            count = 0
+            error = None
+            try:
+                for idx, image in self.video_processor.iter_scene_frames(step=2, progress_callback=report_progress):
+                    image.save(os.path.join(output_dir, f"{base_name}_scene_{idx:06d}.jpg"), quality=95)
+                    count += 1
+            except Exception as e:
+                error = e
+            self.after(0, self._scene_extraction_finished, video_path, output_dir, count, error)
+
+        threading.Thread(target=job, daemon=True).start()
+
+    def _scene_extraction_finished(self, video_path, output_dir, count, error):
+        self._scene_extracting = False
+        if self.video_info_label.winfo_exists():
+            self.video_info_label.config(text=f"已載入: {os.path.basename(video_path)}")
+        if error:
+            messagebox.showerror("錯誤", f"場景偵測失敗:\n{error}")
+        else:
+            messagebox.showinfo("成功", f"共擷取 {count} 個場景畫面，已儲存至:\n{output_dir}")
+
+    def _set_clip_marker(self, which):
+        """以目前影格設定動畫片段的起點或終點。"""
+        if not self.video_processor.cap:
+            return
+        frame_idx = int(self.video_slider_var.get())
+        if which == "in":
+            self._clip_in = frame_idx
+        else:
+            self._clip_out = frame_idx
+        self._update_clip_info()
+
+    def _clear_clip_markers(self):
+        self._clip_in = None
+        self._clip_out = None
+        self._update_clip_info()
+
+    def _get_clip_range(self):
+        """回傳 (起點, 終點)，未設定的一端使用影片開頭或結尾。"""
+        clip_in = self._clip_in if self._clip_in is not None else 0
+        clip_out = self._clip_out if self._clip_out is not None else max(0, self.video_processor.total_frames - 1)
+        return min(clip_in, clip_out), max(clip_in, clip_out)
+
+    def _update_clip_info(self):
+        if self._clip_in is None and self._clip_out is None:
+            self.clip_info_label.config(text="尚未設定片段")
+        else:
+            clip_in, clip_out = self._get_clip_range()
+            fps = self.video_processor.fps if self.video_processor.fps > 0 else 30
+            self.clip_info_label.config(text=f"片段: {clip_in} - {clip_out}  ({(clip_out - clip_in) / fps:.2f}s)")
+        self._draw_video_slider()
+
+    def _export_video_clip(self):
+        """將選取的片段在背景匯出為動態 GIF 或 WebP。"""
+        if not self.video_processor.cap or not self.video_processor.file_path:
+            return
+        if getattr(self, '_clip_exporting', False):
+            return
+
+        fps = simpledialog.askinteger("匯出動畫", "每秒影格數 (fps):", initialvalue=10, minvalue=1, maxvalue=60, parent=self)
+        if not fps:
+            return
+        max_size = simpledialog.askinteger("匯出動畫", "最長邊 (px):", initialvalue=480, minvalue=16, maxvalue=4096, parent=self)
+        if not max_size:
+            return
+        file_path = filedialog.asksaveasfilename(
+            title="儲存動畫",
+            defaultextension=".gif",
+            filetypes=[("GIF", "*.gif"), ("WebP", "*.webp")]
+        )
+        if not file_path:
+            return
+
+        if self.is_playing:
+            self._toggle_play()
+
+        processor = self.video_processor
+        clip_in, clip_out = self._get_clip_range()
+        self._clip_exporting = True
+
+        def report_progress(done, total):
+            percent = done / total * 100 if total else 0
+            self.after(0, lambda: self.clip_info_label.config(text=f"匯出中... {percent:.0f}%"))
+
+        def job():
+            count = 0
+            error = None
+            try:
+                count = processor.export_clip(file_path, clip_in, clip_out, fps=fps, max_size=max_size,
+                                              progress_callback=report_progress)
+            except Exception as e:
+                error = e
+            self.after(0, self._clip_export_finished, file_path, count, error)
+
+        threading.Thread(target=job, daemon=True).start()
+
+    def _clip_export_finished(self, file_path, count, error):
+        self._clip_exporting = False
+        if self.clip_info_label.winfo_exists():
+            self._update_clip_info()
+        if error:
+            messagebox.showerror("錯誤", f"匯出動畫失敗:\n{error}")
+        else:
+            messagebox.showinfo("成功", f"已匯出 {count} 張影格的動畫至:\n{file_path}")
@@ -0,0 +1,518 @@
+#介面回應測試
+"""
+GUI 回應速度的基準測試。
+
+在無頭環境（Xvfb）中建立 App，以腳本操作介面，並記錄：
+    - 事件迴圈停頓：以固定間隔的 after 心跳量測實際延遲，超過門檻即視為停頓。
+    - 各處理函式的耗時：把 App 上指定的方法換成計時包裝。
+
+情境：
+    file_list      轉換分頁的檔案列表一次顯示大量項目 (_update_file_list)
+    resize_redraw  調整大小編輯器反覆改變視窗尺寸與重繪 (_draw_resize_canvas_content)
+    gif_jitter     GIF 動畫的影格間隔與目標 100ms 的偏差
+    video_scrub    影片滑桿拖曳時每次跳轉的延遲 (_on_slider_interact)
+
+沒有 DISPLAY 時會自動啟動 Xvfb；也可以用 xvfb-run 執行。
+
+用法：
+    python gui_benchmark.py --check      # 只檢查情境使用的 App 屬性，不需顯示器
+    python gui_benchmark.py --quick
+    python gui_benchmark.py --save-baseline gui_baseline.json
+    python gui_benchmark.py --baseline gui_baseline.json --threshold 0.25
+"""
+import argparse
+import ast
+import functools
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import cv2 # pyright: ignore[reportMissingImports]
+import numpy as np
+
+from benchmark import percentile, synthetic_image
+
+# 心跳間隔與預設的停頓門檻
+HEARTBEAT_MS = 10
+STALL_THRESHOLD = 0.05
+# gui.py 中 GIF 動畫的影格間隔
+GIF_FRAME_INTERVAL = 0.1
+SCENARIOS = ("file_list", "resize_redraw", "gif_jitter", "video_scrub")
+# 記錄但不列入退化判斷的微小差距（秒），避免毫秒級的雜訊誤判
+MIN_REGRESSION_DELTA = 0.005
+
+
+def ensure_display(size="1280x1024x24"):
+    """
+    確保有可用的 X 顯示器；沒有 DISPLAY 時啟動 Xvfb。
+
+    Returns:
+        subprocess.Popen: 由此函式啟動的 Xvfb 行程，已有顯示器時為 None。
+    """
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+        return None
+    xvfb = shutil.which("Xvfb")
+    if not xvfb:
+        raise RuntimeError("No DISPLAY and Xvfb not found; install Xvfb or run under xvfb-run.")
+    for number in range(99, 120):
+        if os.path.exists(f"/tmp/.X11-unix/X{number}"):
+            continue
+        proc = subprocess.Popen([xvfb, f":{number}", "-screen", "0", size, "-nolisten", "tcp"],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        # 等待 socket 出現才算啟動完成
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            if os.path.exists(f"/tmp/.X11-unix/X{number}"):
+                os.environ["DISPLAY"] = f":{number}"
+                return proc
+            if proc.poll() is not None:
+                break
+            time.sleep(0.05)
+        proc.kill()
+    raise RuntimeError("Failed to start Xvfb.")
+
+
+def summarize(values):
+    """耗時列表 -> 次數、總和與分位數（秒）。"""
+    return {
+        "count": len(values),
+        "total": sum(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+class StallMonitor:
+    """
+    以 after 心跳量測事件迴圈延遲。
+
+    每 interval_ms 排程一次 tick，實際觸發時間與預期時間的差即為該期間
+    事件迴圈被佔用的時間；差值超過 threshold 記為一次停頓。
+    """
+
+    def __init__(self, widget, interval_ms=HEARTBEAT_MS, threshold=STALL_THRESHOLD):
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self.threshold = threshold
+        self.lags = []
+        self._expected = None
+        self._job = None
+
+    def start(self):
+        self.lags = []
+        self._expected = time.perf_counter() + self.interval_ms / 1000
+        self._job = self.widget.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        now = time.perf_counter()
+        self.lags.append(max(0.0, now - self._expected))
+        self._expected = now + self.interval_ms / 1000
+        self._job = self.widget.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+
+    def summary(self):
+        stalls = [lag for lag in self.lags if lag > self.threshold]
+        result = summarize(self.lags)
+        result.update({"stalls": len(stalls), "stalled_time": sum(stalls), "threshold": self.threshold})
+        return result
+
+
+class HandlerProfiler:
+    """
+    把 App 實例上的方法換成計時包裝，記錄每次呼叫的耗時。
+
+    包裝是實例屬性，因此需在建立相關元件前安裝，bind 與 after 取得的才會是包裝後的方法。
+    """
+
+    def __init__(self, app, names):
+        self.app = app
+        self.names = tuple(names)
+        self.durations = {name: [] for name in self.names}
+
+    def install(self):
+        for name in self.names:
+            setattr(self.app, name, self._wrap(name, getattr(self.app, name)))
+        return self
+
+    def _wrap(self, name, func):
+        durations = self.durations[name]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                durations.append(time.perf_counter() - start)
+        return wrapper
+
+    def restore(self):
+        for name in self.names:
+            self.app.__dict__.pop(name, None)
+
+    def summary(self):
+        return {name: summarize(values) for name, values in self.durations.items()}
+
+
+def drive(app, steps, interval_ms=0, settle_ms=300):
+    """
+    透過事件迴圈依序執行步驟，全部完成並等待 settle_ms 後返回。
+
+    步驟以 after 排程，而非直接呼叫，心跳才能量測到它們造成的停頓。
+    回呼中的例外會中止並重新拋出。
+    """
+    remaining = iter(steps)
+    errors = []
+
+    def report(exc_type, exc_value, traceback):
+        errors.append(exc_value)
+        app.quit()
+
+    def next_step():
+        step = next(remaining, None)
+        if step is None:
+            app.after(settle_ms, app.quit)
+            return
+        step()
+        app.after(interval_ms, next_step)
+
+    previous = app.report_callback_exception
+    app.report_callback_exception = report
+    try:
+        app.after(0, next_step)
+        app.mainloop()
+    finally:
+        app.report_callback_exception = previous
+    if errors:
+        raise errors[0]
+
+
+def build_gui_corpus(directory, rows):
+    """建立各情境用的圖片、GIF 與影片；已存在的檔案直接沿用。"""
+    os.makedirs(directory, exist_ok=True)
+    corpus = {"rows": []}
+
+    rows_dir = os.path.join(directory, "rows")
+    os.makedirs(rows_dir, exist_ok=True)
+    base = synthetic_image((64, 48), "RGB")
+    for index in range(rows):
+        path = os.path.join(rows_dir, f"row_{index:05d}.jpg")
+        if not os.path.exists(path):
+            base.rotate(index % 360).save(path, quality=80)
+        corpus["rows"].append(path)
+
+    corpus["photo"] = os.path.join(directory, "photo_12mp.jpg")
+    if not os.path.exists(corpus["photo"]):
+        synthetic_image((4000, 3000), "RGB").save(corpus["photo"], quality=90)
+
+    corpus["gif"] = os.path.join(directory, "animation.gif")
+    if not os.path.exists(corpus["gif"]):
+        frames = [synthetic_image((480, 360), "P", seed=i) for i in range(20)]
+        frames[0].save(corpus["gif"], save_all=True, append_images=frames[1:],
+                       duration=int(GIF_FRAME_INTERVAL * 1000), loop=0)
+
+    corpus["video"] = os.path.join(directory, "clip.avi")
+    if not os.path.exists(corpus["video"]):
+        write_synthetic_video(corpus["video"])
+    return corpus
+
+
+def write_synthetic_video(path, size=(640, 360), frames=300, fps=30):
+    """以 MJPG 寫出合成影片；每一影格平移畫面，避免相鄰影格完全相同。"""
+    base = np.asarray(synthetic_image(size, "RGB"))[:, :, ::-1]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    try:
+        for index in range(frames):
+            writer.write(np.ascontiguousarray(np.roll(base, index * 4, axis=1)))
+    finally:
+        writer.release()
+
+
+# --- 情境 ---
+# 每個情境接收 (app, corpus, options)，在安裝好計時包裝後執行，回傳額外的量測值
+
+def scenario_file_list(app, corpus, options):
+    paths = corpus["rows"][:options.rows]
+    timings = {}
+
+    def show_tab():
+        app._show_tool(3)
+
+    def render():
+        app._thumbnail_cache = []
+        app.converted_files = []
+        app.file_list = []
+        app._file_index.clear()
+        app._add_to_file_list(paths)
+        start = time.perf_counter()
+        app._update_file_list()
+        built = time.perf_counter()
+        app.update_idletasks()
+        timings["build"] = built - start
+        timings["layout"] = time.perf_counter() - built
+
+    drive(app, [show_tab, render], settle_ms=1000)
+    return {"rows": len(paths), **timings}
+
+
+def scenario_resize_redraw(app, corpus, options):
+    sizes = ["1000x700", "1280x860", "900x640", "1200x800"]
+
+    def open_editor():
+        app._show_tool(1)
+        app._open_resize_files([corpus["photo"]])
+
+    steps = [open_editor]
+    for index in range(options.redraws):
+        # 交替改變視窗尺寸（觸發 Configure）與直接重繪
+        if index % 2:
+            steps.append(functools.partial(app.geometry, sizes[index // 2 % len(sizes)]))
+        else:
+            steps.append(lambda: app._draw_resize_canvas_content())
+    drive(app, steps, interval_ms=50, settle_ms=500)
+    return {"redraws": options.redraws}
+
+
+def scenario_gif_jitter(app, corpus, options):
+    frame_times = []
+
+    def open_gif():
+        app._show_tool(1)
+        app._open_resize_files([corpus["gif"]])
+        # 以畫布的 create_image 記錄每一影格實際顯示的時間
+        canvas = app.resize_canvas
+        create_image = canvas.create_image
+
+        def timed_create_image(*args, **kwargs):
+            if kwargs.get("tags") == "img_frame":
+                frame_times.append(time.perf_counter())
+            return create_image(*args, **kwargs)
+        canvas.create_image = timed_create_image
+
+    drive(app, [open_gif], settle_ms=int(options.gif_seconds * 1000))
+    intervals = [b - a for a, b in zip(frame_times, frame_times[1:])]
+    deviations = [abs(i - GIF_FRAME_INTERVAL) for i in intervals]
+    return {
+        "frames": len(frame_times),
+        "target_interval": GIF_FRAME_INTERVAL,
+        "interval": summarize(intervals),
+        "jitter": summarize(deviations),
+    }
+
+
+def scenario_video_scrub(app, corpus, options):
+    rng = random.Random(0)
+
+    def open_video():
+        app._show_tool(5)
+        app._activate_video_session(corpus["video"])
+
+    def scrub(fraction):
+        width = app.video_slider_canvas.winfo_width()
+        app._on_slider_interact(SimpleNamespace(x=10 + fraction * max(1, width - 20)))
+
+    # 前半模擬連續拖曳，後半模擬隨機點擊跳轉
+    half = options.scrubs // 2
+    fractions = [i / max(1, half) for i in range(half)]
+    fractions += [rng.random() for _ in range(options.scrubs - half)]
+    steps = [open_video] + [functools.partial(scrub, f) for f in fractions]
+    drive(app, steps, interval_ms=30, settle_ms=300)
+    return {"scrubs": len(fractions)}
+
+
+SCENARIO_HANDLERS = {
+    "file_list": (scenario_file_list, ("_update_file_list",)),
+    "resize_redraw": (scenario_resize_redraw, ("_draw_resize_canvas_content", "_draw_info_overlay")),
+    "gif_jitter": (scenario_gif_jitter, ("_animate_gif_on_canvas", "_draw_resize_canvas_content")),
+    "video_scrub": (scenario_video_scrub, ("_on_slider_interact", "_update_video_preview", "_draw_video_slider")),
+}
+# 情境直接操作的 App 內部屬性（除了上面計時的方法）；gui.py 改名時 --check 會列出
+SCENARIO_APP_ATTRIBUTES = (
+    "_show_tool", "_thumbnail_cache", "converted_files", "file_list", "_file_index", "_add_to_file_list",
+    "_open_resize_files", "resize_canvas", "_activate_video_session", "video_slider_canvas",
+)
+
+
+def check_app_attributes(gui_path=None):
+    """
+    不需顯示器：解析 gui.py，確認情境使用的 App 方法與屬性仍然存在。
+
+    Returns:
+        list: gui.py 中找不到的名稱；空列表表示全部存在。
+    """
+    gui_path = gui_path or os.path.join(os.path.dirname(os.path.abspath(__file__)), "gui.py")
+    with open(gui_path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    app = next(node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == "App")
+    defined = set()
+    for node in ast.walk(app):
+        if isinstance(node, ast.FunctionDef):
+            defined.add(node.name)
+        elif isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Store) \
+                and isinstance(node.value, ast.Name) and node.value.id == "self":
+            defined.add(node.attr)
+    names = set(SCENARIO_APP_ATTRIBUTES)
+    for _, handlers in SCENARIO_HANDLERS.values():
+        names.update(handlers)
+    return sorted(names - defined)
+
+
+def run_scenario(name, corpus, options):
+    """建立新的 App、安裝量測並執行單一情境。"""
+    from gui import App # 需要顯示器，延後到確認 DISPLAY 後才匯入
+
+    func, handlers = SCENARIO_HANDLERS[name]
+    app = App()
+    app.geometry("1200x800")
+    try:
+        drive(app, [], settle_ms=300) # 等待首頁完成繪製，不列入量測
+        profiler = HandlerProfiler(app, handlers).install()
+        monitor = StallMonitor(app, threshold=options.stall_threshold)
+        monitor.start()
+        start = time.perf_counter()
+        extra = func(app, corpus, options)
+        wall = time.perf_counter() - start
+        monitor.stop()
+        profiler.restore()
+    finally:
+        app.destroy()
+    return {
+        "wall_time": wall,
+        "event_loop": monitor.summary(),
+        "handlers": profiler.summary(),
+        "metrics": extra,
+    }
+
+
+def _regressed(base, current, threshold):
+    return (base is not None and current is not None
+            and current - base > MIN_REGRESSION_DELTA
+            and current > base * (1 + threshold))
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """
+    與基準比較：事件迴圈 p95 延遲、最長停頓與各處理函式的 p95 耗時
+    上升超過 threshold（比例）即視為退化。
+
+    Returns:
+        list: 退化項目的說明文字；空列表表示通過。
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key in ("p95", "max"):
+            b, c = base["event_loop"].get(key), current["event_loop"].get(key)
+            if _regressed(b, c, threshold):
+                regressions.append(f"{name}: event loop {key} {b * 1000:.1f} -> {c * 1000:.1f} ms")
+        for handler, stats in current["handlers"].items():
+            b = base["handlers"].get(handler, {}).get("p95")
+            if _regressed(b, stats.get("p95"), threshold):
+                regressions.append(f"{name}: {handler} p95 {b * 1000:.1f} -> {stats['p95'] * 1000:.1f} ms")
+        b_jitter = base["metrics"].get("jitter", {}).get("p95")
+        c_jitter = current["metrics"].get("jitter", {}).get("p95")
+        if _regressed(b_jitter, c_jitter, threshold):
+            regressions.append(f"{name}: GIF jitter p95 {b_jitter * 1000:.1f} -> {c_jitter * 1000:.1f} ms")
+    return regressions
+
+
+def _ms(value):
+    return f"{value * 1000:.1f}" if value is not None else "-"
+
+
+def print_report(results):
+    for name, r in results.items():
+        loop = r["event_loop"]
+        print(f"\n[{name}] {r['wall_time']:.2f}s  事件迴圈 p50 {_ms(loop['p50'])} / p95 {_ms(loop['p95'])} / "
+              f"max {_ms(loop['max'])} ms，停頓 {loop['stalls']} 次共 {_ms(loop['stalled_time'])} ms")
+        for handler, stats in r["handlers"].items():
+            if stats["count"]:
+                print(f"    {handler:<32}{stats['count']:>6} 次  p50 {_ms(stats['p50']):>8}  p95 {_ms(stats['p95']):>8}  max {_ms(stats['max']):>8} ms")
+        if "jitter" in r["metrics"]:
+            jitter = r["metrics"]["jitter"]
+            print(f"    GIF 影格 {r['metrics']['frames']} 張，偏差 p50 {_ms(jitter['p50'])} / p95 {_ms(jitter['p95'])} ms")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ImageBatcher Pro 介面回應速度基準測試")
+    parser.add_argument("--quick", action="store_true", help="縮小各情境的規模")
+    parser.add_argument("--check", action="store_true", help="只檢查情境使用的 App 屬性是否存在（不需顯示器）")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"逗號分隔的情境：{','.join(SCENARIOS)}")
+    parser.add_argument("--rows", type=int, default=None, help="檔案列表的項目數 (預設 5000)")
+    parser.add_argument("--redraws", type=int, default=None, help="調整大小畫布的重繪次數 (預設 60)")
+    parser.add_argument("--gif-seconds", type=float, default=None, help="GIF 動畫觀察秒數 (預設 5)")
+    parser.add_argument("--scrubs", type=int, default=None, help="影片滑桿操作次數 (預設 120)")
+    parser.add_argument("--stall-threshold", type=float, default=STALL_THRESHOLD, help="視為停頓的延遲（秒）")
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "imagebatcher_gui_bench_corpus"))
+    parser.add_argument("--output", help="把結果寫入 JSON 檔")
+    parser.add_argument("--save-baseline", help="把結果存為基準檔")
+    parser.add_argument("--baseline", help="與此基準檔比較")
+    parser.add_argument("--threshold", type=float, default=0.25, help="允許的退化比例 (預設 0.25)")
+    args = parser.parse_args(argv)
+
+    defaults = {"rows": (500, 5000), "redraws": (20, 60), "gif_seconds": (2, 5), "scrubs": (40, 120)}
+    for key, (quick, full) in defaults.items():
+        if getattr(args, key) is None:
+            setattr(args, key, quick if args.quick else full)
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    missing = check_app_attributes()
+    if missing:
+        print(f"gui.py 中找不到情境使用的 App 屬性：{', '.join(missing)}")
+        return 2
+    if args.check:
+        print("情境使用的 App 屬性都存在。")
+        return 0
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        print(f"未知的情境：{', '.join(sorted(unknown))}")
+        return 2
+
+    xvfb = ensure_display()
+    try:
+        corpus = build_gui_corpus(args.corpus_dir, args.rows)
+        results = {name: run_scenario(name, corpus, args) for name in scenarios}
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+    print_report(results)
+
+    report = {"python": sys.version.split()[0], "options": vars(args), "results": results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+        regressions = compare_with_baseline(results, baseline, args.threshold)
+        if regressions:
+            print("\n退化：")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\n與基準比較通過（門檻 {args.threshold:.0%}）。")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
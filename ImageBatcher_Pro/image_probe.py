@@ -0,0 +1,215 @@
+#圖片檔頭探測
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PIL import Image # pyright: ignore[reportMissingImports]
+
+from image_processor import ImageProcessor, SWAP_AXES_ORIENTATIONS, get_orientation
+from memory_budget import pixel_bytes
+
+# 檔頭探測幾乎都在等待磁碟 I/O，執行緒數可以比 CPU 核心數多
+PROBE_WORKERS = 16
+# 估計輸出大小用的每像素位元數（一般照片的經驗值，只用於顯示概估）
+OUTPUT_BITS_PER_PIXEL = {"PNG": 12.0, "GIF": 4.0, "BMP": 24.0, "TIFF": 24.0}
+WEBP_TO_JPEG_RATIO = 0.7
+AVIF_TO_JPEG_RATIO = 0.5
+# 未指定編碼預設時批次引擎不設定 WEBP / AVIF 品質，編碼器使用 Pillow 的預設值
+WEBP_DEFAULT_QUALITY = 80
+AVIF_DEFAULT_QUALITY = 75
+
+
+def format_size(num_bytes):
+    """把位元組數格式化成 B / KB / MB / GB。"""
+    for unit in ("B", "KB", "MB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.2f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.2f} GB"
+
+
+def probe_image(file_path):
+    """
+    只讀取檔頭取得圖片資訊，不解碼像素。
+
+    Returns:
+        dict: path、format、width、height（轉正後）、stored_size、mode、frames、
+              orientation、file_size、mtime_ns。
+    """
+    stat = os.stat(file_path)
+    with Image.open(file_path) as img:
+        orientation = get_orientation(img)
+        stored_w, stored_h = img.size
+        info = {
+            "path": file_path,
+            "format": img.format,
+            "mode": img.mode,
+            "stored_size": (stored_w, stored_h),
+            "frames": getattr(img, "n_frames", 1),
+            "orientation": orientation,
+        }
+    if orientation in SWAP_AXES_ORIENTATIONS:
+        info["width"], info["height"] = stored_h, stored_w
+    else:
+        info["width"], info["height"] = stored_w, stored_h
+    info["file_size"] = stat.st_size
+    info["mtime_ns"] = stat.st_mtime_ns
+    return info
+
+
+class ProbeCache:
+    """
+    以路徑為鍵的探測結果快取；檔案的修改時間或大小改變時視為失效。
+    可由多個執行緒同時存取。
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, file_path):
+        """回傳仍然有效的快取結果，沒有或已失效時回傳 None。"""
+        with self._lock:
+            info = self._entries.get(file_path)
+        if info is None:
+            return None
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        if stat.st_mtime_ns != info["mtime_ns"] or stat.st_size != info["file_size"]:
+            return None
+        return info
+
+    def put(self, info):
+        with self._lock:
+            self._entries[info["path"]] = info
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+# 整個程式共用的快取，重複選取同一批檔案時不需再讀檔頭
+DEFAULT_CACHE = ProbeCache()
+
+
+def probe_cached(file_path, cache=DEFAULT_CACHE):
+    info = cache.get(file_path)
+    if info is None:
+        info = probe_image(file_path)
+        cache.put(info)
+    return info
+
+
+def probe_many(file_list, max_workers=PROBE_WORKERS, cache=DEFAULT_CACHE, progress_callback=None):
+    """
+    平行探測多個檔案；已在快取中的檔案不會再讀取。
+
+    Args:
+        file_list (list): 圖片檔案路徑。
+        max_workers (int): 執行緒數。
+        cache (ProbeCache): 使用的快取，None 表示不使用快取。
+        progress_callback (function): 每完成一個檔案呼叫一次，接收結果字典。
+
+    Returns:
+        dict: 檔案路徑 -> 探測結果（依 file_list 的順序）；無法讀取的檔案只有 path 與 error。
+    """
+    results = {}
+    pending = []
+    for path in file_list:
+        info = cache.get(path) if cache is not None else None
+        if info is not None:
+            results[path] = info
+        else:
+            pending.append(path)
+
+    probe = probe_image if cache is None else lambda path: probe_cached(path, cache)
+    total = len(pending)
+    if pending:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(probe, path): path for path in pending}
+            for done, future in enumerate(as_completed(futures), start=1):
+                path = futures[future]
+                try:
+                    results[path] = future.result()
+                    result = {"filename": os.path.basename(path), "status": "success"}
+                except Exception as e:
+                    results[path] = {"path": path, "error": str(e)}
+                    result = {"filename": os.path.basename(path), "status": "failure", "message": str(e)}
+                result["progress"] = done / total * 100
+                if progress_callback:
+                    progress_callback(result)
+    return {path: results[path] for path in file_list if path in results}
+
+
+def _jpeg_bits_per_pixel(quality):
+    return 0.5 + 3.5 * (quality / 100) ** 3
+
+
+def _estimate_output_bytes(info, output_size, output_format, quality, encoder_preset=None):
+    """
+    依經驗值概估單一檔案的輸出大小。
+
+    與 ImageProcessor.convert_file 一致：quality 只影響 JPEG（沿用原始格式時也是），
+    指定編碼預設時也影響 WEBP 與 AVIF；
+    沿用原始格式的其他圖片以來源的壓縮率依像素數比例換算。
+    """
+    out_w, out_h = output_size
+    fmt = (output_format or info["format"] or "").upper()
+    if fmt == "MPO":
+        fmt = "JPEG"
+    if fmt == "JPEG":
+        bits = _jpeg_bits_per_pixel(quality)
+    elif fmt == "WEBP" and output_format:
+        bits = _jpeg_bits_per_pixel(quality if encoder_preset else WEBP_DEFAULT_QUALITY) * WEBP_TO_JPEG_RATIO
+    elif fmt == "AVIF" and output_format:
+        bits = _jpeg_bits_per_pixel(quality if encoder_preset else AVIF_DEFAULT_QUALITY) * AVIF_TO_JPEG_RATIO
+    elif not output_format:
+        return info["file_size"] * (out_w * out_h) / max(1, info["width"] * info["height"])
+    else:
+        bits = OUTPUT_BITS_PER_PIXEL.get(fmt, 24.0)
+    return out_w * out_h * bits / 8 * info["frames"]
+
+
+def estimate_batch(infos, output_format=None, quality=95, resize_options=None, encoder_preset=None):
+    """
+    根據探測結果概估整批工作：總像素、解碼記憶體與輸出大小。
+
+    Args:
+        infos (iterable): probe_image 的結果（含 error 的項目會被計為失敗）。
+        output_format (str): 輸出格式，None 表示沿用原始格式。
+        quality (int): JPEG 品質。
+        resize_options (dict): 與 process_batch 相同的縮放選項。
+        encoder_preset (str): 與 process_batch 相同的編碼預設。
+
+    Returns:
+        dict: files、failures、input_bytes、megapixels、output_megapixels、
+              largest_decoded_bytes、estimated_output_bytes、formats（格式 -> 檔案數）。
+    """
+    processor = ImageProcessor()
+    summary = {
+        "files": 0, "failures": 0, "input_bytes": 0, "megapixels": 0.0, "output_megapixels": 0.0,
+        "largest_decoded_bytes": 0, "estimated_output_bytes": 0, "formats": {},
+    }
+    for info in infos:
+        if "error" in info:
+            summary["failures"] += 1
+            continue
+        width, height = info["width"], info["height"]
+        output_size = (width, height)
+        if resize_options and resize_options.get("type") != "none":
+            output_size = processor._compute_resize_target(width, height, resize_options) or output_size
+
+        summary["files"] += 1
+        summary["input_bytes"] += info["file_size"]
+        summary["megapixels"] += width * height / 1e6
+        summary["output_megapixels"] += output_size[0] * output_size[1] / 1e6
+        summary["largest_decoded_bytes"] = max(summary["largest_decoded_bytes"], width * height * pixel_bytes(info["mode"]))
+        summary["estimated_output_bytes"] += int(_estimate_output_bytes(info, output_size, output_format, quality, encoder_preset))
+        summary["formats"][info["format"]] = summary["formats"].get(info["format"], 0) + 1
+    return summary
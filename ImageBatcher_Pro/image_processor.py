@@ -1,7 +1,18 @@
 # 壓縮圖片文檔，調整圖片的大小，轉換至JPG文檔
+import io
+import math
 import os
+import queue
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image # pyright: ignore[reportMissingImports]
+from rotate_processor import ORIENTATION_TAG, ORIENTATION_METHODS
+from archive_writer import ArchiveWriter
+from profiling import StageTimer
+from memory_budget import estimate_working_set
+from result_cache import file_digest
+from encoder_presets import PRESET_NAMES, encoder_options
 
 # 處理 Pillow 版本相容性問題
 try:
@@ -11,145 +22,716 @@ except AttributeError:
     # Pillow < 10.0.0
     LANCZOS = Image.LANCZOS
 
+# 會交換寬高的 EXIF orientation 值（含 90°/270° 旋轉）
+SWAP_AXES_ORIENTATIONS = (5, 6, 7, 8)
+# 每個執行緒最多排隊的工作數；串流輸入時限制已送出但尚未完成的 future 數量
+PENDING_PER_WORKER = 4
+# 大圖縮放時先以整數倍 reduce 再 LANCZOS，減少縮放的中間緩衝與運算量
+LARGE_IMAGE_REDUCING_GAP = 3.0
+# 支援寫入 EXIF / ICC 資訊的輸出格式
+EXIF_FORMATS = ('JPEG', 'PNG', 'WEBP', 'TIFF', 'AVIF')
+ICC_FORMATS = ('JPEG', 'PNG', 'WEBP', 'TIFF', 'AVIF')
+
+
+def get_orientation(img):
+    """讀取 EXIF orientation（只讀檔頭，不需解碼），沒有時回傳 1。"""
+    try:
+        orientation = img.getexif().get(ORIENTATION_TAG, 1)
+    except Exception:
+        return 1
+    return orientation if orientation in ORIENTATION_METHODS else 1
+
+
+def apply_orientation(img, orientation):
+    """依 orientation 以 transpose 轉正圖片（不需插值）。"""
+    method = ORIENTATION_METHODS.get(orientation)
+    return img.transpose(method) if method is not None else img
+
+
+def open_oriented_image(file_path):
+    """
+    開啟圖片並依 EXIF orientation 轉正，供裁剪、縮放等編輯器使用。
+    動態圖片（多影格）維持原樣，以保留影格序列。
+    """
+    img = Image.open(file_path)
+    if getattr(img, "n_frames", 1) > 1:
+        return img
+    orientation = get_orientation(img)
+    if orientation == 1:
+        return img
+    img.load()
+    return apply_orientation(img, orientation)
+
+
+def load_oriented_thumbnail(file_path, size):
+    """
+    建立已轉正的縮圖。先縮小（JPEG 會透過 draft 以 DCT 縮放解碼）再 transpose，
+    轉正只需處理縮圖大小的像素。
+    """
+    with Image.open(file_path) as img:
+        orientation = get_orientation(img)
+        if orientation in SWAP_AXES_ORIENTATIONS:
+            size = (size[1], size[0])
+        img.thumbnail(size)
+        return apply_orientation(img, orientation)
+
+
+def display_box_to_stored(box, stored_size, orientation):
+    """
+    把轉正後（顯示方向）座標的裁剪框換算成儲存方向的座標，
+    讓裁剪可以在 transpose 之前進行。
+
+    Args:
+        box (tuple): 顯示方向的 (left, top, right, bottom)。
+        stored_size (tuple): 儲存方向的 (寬, 高)。
+        orientation (int): EXIF orientation 值。
+    """
+    w, h = stored_size
+    # 顯示座標 (x, y) -> 儲存座標，對應 ORIENTATION_METHODS 的反向轉換
+    mapping = {
+        2: lambda x, y: (w - x, y),
+        3: lambda x, y: (w - x, h - y),
+        4: lambda x, y: (x, h - y),
+        5: lambda x, y: (y, x),
+        6: lambda x, y: (y, h - x),
+        7: lambda x, y: (w - y, h - x),
+        8: lambda x, y: (w - y, x),
+    }.get(orientation)
+    if mapping is None:
+        return tuple(box)
+    x1, y1 = mapping(box[0], box[1])
+    x2, y2 = mapping(box[2], box[3])
+    return (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
 # 核心功能: 圖片處理
 class ImageProcessor:
     """負責核心的圖片處理邏輯。"""
 
-    def process_batch(self, file_list, output_dir, output_format, quality=95, resize_options=None, progress_callback=None):
+    def process_batch(self, file_list, output_dir, output_format, quality=95, resize_options=None, progress_callback=None, keep_metadata=False, crop_options=None, max_workers=None, name_suffix="", archive_path=None, profile=None, memory_budget=None, result_cache=None, outputs=None, encoder_preset=None, keep_icc=True):
         """
         根據給定的設定批量處理圖片。
 
+        每張圖片的解碼、裁剪、縮放與編碼彼此獨立，以多執行緒平行處理
+        （Pillow 在解碼、縮放與編碼時會釋放 GIL）。
+
         Args:
-            file_list (list): 圖片檔案的絕對路徑列表。
+            file_list (iterable): 圖片檔案的絕對路徑；可以是產生器（例如 file_discovery.iter_image_files），
+                                  探索到的檔案會立即開始處理，不需等待掃描完成。
             output_dir (str): 儲存轉換後圖片的資料夾。
-            output_format (str): 目標圖片格式 (例如 "PNG", "JPEG")。
-            quality (int): JPEG 圖片的品質 (1-100)。
+            output_format (str): 目標圖片格式 (例如 "PNG", "JPEG")，None 表示沿用原始格式。
+            quality (int): JPEG 圖片的品質 (1-100)；指定 encoder_preset 時也套用到 WEBP 與 AVIF。
             resize_options (dict): 包含縮放選項的字典。
             progress_callback (function): 用於回報進度更新的函式，接收一個包含結果的字典。
+            keep_metadata (bool): 是否保留 EXIF。
+            crop_options (dict): 裁剪選項，見 _compute_crop_box。
+            max_workers (int): 執行緒數，None 表示依 CPU 核心數決定。
+            name_suffix (str): 附加在輸出檔名後的字串 (例如 "_cropped")。
+            archive_path (str): 指定時不寫入 output_dir，而是在每張圖片完成時
+                                直接串流寫入此 ZIP/TAR 檔（依副檔名判斷）。
+            profile (profiling.BatchProfile): 彙整各階段耗時直方圖並在結束時寫入 sink。
+                                              每個檔案的階段耗時一律放在回報資料的 "stages" 中。
+            memory_budget (memory_budget.MemoryBudget): 解碼前依檔頭估計記憶體用量並預約，
+                                                       預算不足時等待；超過門檻的大圖以獨佔方式處理。
+            result_cache (result_cache.ResultCache): 輸入內容與設定相同時直接沿用快取的輸出，
+                                                     不重新解碼與編碼。
+            outputs (list): 多重輸出規格，每個來源只解碼一次並產生多個版本。每個規格是字典：
+                            format、quality、resize_options、name_suffix、subdir（輸出子資料夾）、
+                            encoder_preset、encoder_options（覆寫個別編碼參數，例如 {"lossless": True}），
+                            未指定的鍵沿用上面的同名參數（subdir 預設為無）。None 表示只輸出一個版本。
+            encoder_preset (str): 編碼預設 fast / balanced / smallest（見 encoder_presets），
+                                  None 表示維持原本的編碼參數。
+            keep_icc (bool): 是否保留 ICC 色彩描述檔；移除後廣色域圖片會被當成 sRGB 顯示。
         """
-        total_files = len(file_list)
-        processed_files = [] # 初始化已處理檔案列表
-        for i, file_path in enumerate(file_list):
+        specs = self._build_output_specs(outputs, output_format, quality, resize_options, name_suffix, encoder_preset)
+        results = {} # 依原始順序整理輸出檔案
+        archive = ArchiveWriter(archive_path) if archive_path else None
+        if archive is None:
+            os.makedirs(output_dir, exist_ok=True)
+
+        def work(file_path):
+            # 失敗時也回報實際耗時，錯誤交給 _report_result 處理
             start_time = time.time()
-            original_filename = os.path.basename(file_path)
-            progress_percent = ((i + 1) / total_files) * 100
-            
+            timer = StageTimer()
             try:
-                # 呼叫內部方法來轉換並儲存單一圖片，並獲取相關資訊
-                result = self._convert_and_save(file_path, output_dir, output_format, quality, resize_options)
-                new_filename = result["filename"]
-                
-                # 將完整的輸出路徑加入列表
-                full_output_path = os.path.join(output_dir, new_filename)
-                processed_files.append(full_output_path)
-
-                duration = time.time() - start_time
-                # 如果有提供進度回報函式，則回報成功結果
-                if progress_callback:
-                    callback_data = {
-                        "filename": new_filename, # 在日誌中使用新的檔案名稱
-                        "status": "success",
-                        "duration": duration,
-                        "message": "轉換成功",
-                        "progress": progress_percent,
-                        "original_size": result.get("original_size"),
-                        "compressed_size": result.get("compressed_size")
-                    }
-                    progress_callback(callback_data)
-
+                result = self._render_outputs(file_path, output_dir, specs, keep_metadata, crop_options, archive, timer, memory_budget, result_cache, keep_icc)
+                error = None
             except Exception as e:
-                duration = time.time() - start_time
-                # 如果處理過程中發生錯誤，透過進度回報函式顯示錯誤訊息
-                if progress_callback:
-                    progress_callback({
-                        "filename": original_filename, # 發生錯誤時，使用原始檔案名稱
-                        "status": "failure",
-                        "duration": duration,
-                        "message": str(e),
-                        "progress": progress_percent
-                    })
-        
+                result, error = None, e
+            return result, time.time() - start_time, timer, error
+
+        if profile:
+            profile.start()
+        # 快取物件可能跨批次重複使用，命中數以這個批次開始前的快照相減
+        cache_before = result_cache.stats() if result_cache else None
+        try:
+            self._run_batch(file_list, work, results, output_dir, archive, max_workers, progress_callback, profile)
+        finally:
+            # 封存檔必須在回報完成之前關閉，確保中央目錄已寫入
+            if archive:
+                archive.close()
+
+        processed_files = [path for i in sorted(results) for path in results[i]]
         # 所有檔案處理完畢後，回報處理完成
         if progress_callback:
-            progress_callback({"status": "finished", "progress": 100, "message": "批量處理完成。", "output_files": processed_files})
+            finished = {"status": "finished", "progress": 100, "message": "批量處理完成。", "output_files": processed_files}
+            if archive_path:
+                finished["archive_path"] = archive_path
+            if profile:
+                finished["profile"] = profile.finish()
+            if result_cache:
+                cache = result_cache.stats()
+                cache["hits"] -= cache_before["hits"]
+                cache["misses"] -= cache_before["misses"]
+                finished["cache"] = cache
+            progress_callback(finished)
+        elif profile:
+            profile.finish()
+
+    def _build_output_specs(self, outputs, output_format, quality, resize_options, name_suffix, encoder_preset=None):
+        """
+        把 outputs 整理成完整的輸出規格；同一來源的輸出檔名必須互不相同。
 
-    def _convert_and_save(self, input_path, output_dir, output_format, quality, resize_options):
+        Raises:
+            ValueError: 兩個規格會產生相同的輸出路徑，或編碼預設名稱不存在。
         """
-        轉換、縮放並儲存單一圖片。
+        defaults = {"format": output_format, "quality": quality, "resize_options": resize_options, "name_suffix": name_suffix,
+                    "encoder_preset": encoder_preset}
+        specs = [dict(defaults, **spec) for spec in outputs] if outputs else [defaults]
+        seen = set()
+        for spec in specs:
+            if spec["encoder_preset"] is not None and spec["encoder_preset"] not in PRESET_NAMES:
+                raise ValueError(f"未知的編碼預設：{spec['encoder_preset']}（可用：{', '.join(PRESET_NAMES)}）")
+            # 沿用原始格式時副檔名依來源而定，以 None 代表
+            name = (spec.get("subdir") or "", spec["name_suffix"] or "", spec["format"].lower() if spec["format"] else None)
+            if name in seen:
+                raise ValueError(f"多重輸出的檔名重複：請為每個輸出設定不同的 name_suffix 或 subdir（{name}）")
+            seen.add(name)
+        return specs
+
+    def _run_batch(self, file_list, work, outputs, output_dir, archive, max_workers, progress_callback, profile=None):
+        """
+        以執行緒池執行 work，依完成順序回報進度，並把輸出記錄到 outputs。
+
+        file_list 可以是任何可迭代物件；工作隨讀隨送，同時未完成的 future 數量有上限，
+        因此來源是產生器時處理會與探索同時進行。來源在獨立的執行緒中讀取，
+        等待來源產生下一個檔案時，已完成的結果仍會立即回報。
+        總數未知時，進度以目前已送出的數量計算，在來源耗盡之前不會達到 100%。
         """
-        # 如果輸出資料夾不存在，則建立它
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        total_files = len(file_list) if hasattr(file_list, '__len__') else None
+        workers = max_workers or min(32, (os.cpu_count() or 1) + 4) # 與 ThreadPoolExecutor 的預設值相同
+        slots = threading.Semaphore(workers * PENDING_PER_WORKER)
+        completed = queue.Queue() # (索引, 路徑, future)；None 表示來源已耗盡
+        state = {"submitted": 0, "error": None}
+
+        def submit_all(executor):
+            try:
+                for file_path in file_list:
+                    slots.acquire()
+                    index = state["submitted"]
+                    future = executor.submit(work, file_path)
+                    state["submitted"] += 1
+                    future.add_done_callback(lambda f, i=index, p=file_path: completed.put((i, p, f)))
+            except Exception as e:
+                state["error"] = e
+            finally:
+                completed.put(None)
+
+        exhausted = False
+        done = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            threading.Thread(target=submit_all, args=(executor,), daemon=True).start()
+            while not exhausted or done < state["submitted"]:
+                item = completed.get()
+                if item is None:
+                    exhausted = True
+                    continue
+                index, file_path, future = item
+                slots.release()
+                done += 1
+                total = total_files or (state["submitted"] if exhausted else state["submitted"] + 1)
+                self._report_result(future, index, file_path, done, total, outputs, output_dir, archive, progress_callback, profile)
+        if state["error"] is not None:
+            raise state["error"]
+
+    def _report_result(self, future, index, file_path, done, total_files, outputs, output_dir, archive, progress_callback, profile):
+        """處理單一完成的工作：記錄輸出、彙整效能資料並回報進度。"""
+        original_filename = os.path.basename(file_path)
+        progress_percent = (done / total_files) * 100
+        duration = 0
 
+        try:
+            # 取得單一圖片的轉換結果
+            result, duration, timer, error = future.result()
+            if error is not None:
+                raise error
+            new_filename = result["filename"]
+            if profile:
+                profile.record(timer)
+
+            # 將完整的輸出路徑（封存模式下為成員名稱）加入列表
+            names = result.get("outputs", [new_filename])
+            outputs[index] = names if archive else [os.path.join(output_dir, name) for name in names]
+
+            # 如果有提供進度回報函式，則回報成功結果
+            if progress_callback:
+                callback_data = {
+                    "filename": new_filename, # 在日誌中使用新的檔案名稱
+                    "status": "success",
+                    "duration": duration,
+                    "message": "轉換成功",
+                    "progress": progress_percent,
+                    "original_size": result.get("original_size"),
+                    "compressed_size": result.get("compressed_size"),
+                    "stages": dict(timer.timings)
+                }
+                progress_callback(callback_data)
+
+        except Exception as e:
+            if profile:
+                profile.record_failure()
+            # 如果處理過程中發生錯誤，透過進度回報函式顯示錯誤訊息
+            if progress_callback:
+                progress_callback({
+                    "filename": original_filename, # 發生錯誤時，使用原始檔案名稱
+                    "status": "failure",
+                    "duration": duration,
+                    "message": str(e),
+                    "progress": progress_percent
+                })
+
+    def convert_file(self, input_path, output_dir, output_format, quality=95, resize_options=None, keep_metadata=False, crop_options=None, name_suffix="", archive=None, timer=None, memory_budget=None, result_cache=None, encoder_preset=None, keep_icc=True):
+        """
+        裁剪、轉換、縮放並儲存單一圖片（不經過 process_batch 的單檔入口，例如 watch_folder）。
+
+        裁剪框以轉正後的座標描述，先換算回儲存方向，在 transpose 之前裁剪；
+        EXIF orientation 會在縮放之後以 transpose 轉正，只需處理縮小後的像素；
+        keep_metadata 為 True 時保留 EXIF（orientation 重設為 1）；keep_icc 為 True 時保留 ICC 色彩描述檔。
+        提供 archive (ArchiveWriter) 時在記憶體中編碼並寫入封存檔，不產生中間檔案。
+        timer (StageTimer) 記錄各階段耗時：stat、hash、open、admit、decode、crop、convert、resize、orient、encode、write、cache。
+        memory_budget (MemoryBudget) 在 img.load() 之前以檔頭尺寸預約記憶體，處理完成後釋放；
+        大圖改走省記憶體的路徑：獨佔執行，縮放時先 reduce 再 LANCZOS。
+        result_cache (ResultCache) 以輸入內容雜湊與設定查詢快取，命中時直接放置快取的輸出，
+        未命中時在編碼後把結果加入快取。
+        encoder_preset 選擇編碼速度與檔案大小的取捨（見 encoder_presets）。
+        """
+        spec = {"format": output_format, "quality": quality, "resize_options": resize_options, "name_suffix": name_suffix,
+                "encoder_preset": encoder_preset}
+        return self._render_outputs(input_path, output_dir, [spec], keep_metadata, crop_options, archive, timer, memory_budget, result_cache, keep_icc)
+
+    def _render_outputs(self, input_path, output_dir, specs, keep_metadata=False, crop_options=None, archive=None, timer=None, memory_budget=None, result_cache=None, keep_icc=True):
+        """
+        解碼一次，依 specs 產生一或多個輸出（見 process_batch 的 outputs）。
+
+        輸出依尺寸由大到小處理；相同裁剪區域與色彩模式的輸出，由已產生的中間結果中
+        最小且不小於目標的那一個再縮小，不必每次都從原始解析度縮放。
+        JPEG 的 draft 以所有輸出中需要最多像素的比例決定。
+
+        Returns:
+            dict: filename（第一個輸出的名稱）、outputs（依 specs 順序的輸出名稱，含 subdir）、
+                  original_size、compressed_size（所有輸出的合計）。
+        """
+        timer = timer or StageTimer()
+        # 如果輸出資料夾不存在，則建立它（多執行緒時可能同時建立）
+        if archive is None:
+            os.makedirs(output_dir, exist_ok=True)
+
+        # 逐檔裁剪框（例如自動裁剪的結果）：依檔案取出各自的裁剪選項
+        if crop_options and crop_options.get('type') == 'boxes':
+            crop_options = crop_options['boxes'].get(input_path)
+
+        reserved = 0
+        large_image = False
         try:
             # 標準化路徑，確保跨平台相容性
             normalized_path = os.path.normpath(input_path)
-            
+
             # 獲取原始大小
             original_size = os.path.getsize(normalized_path)
+            timer.lap("stat")
+            timer.count("bytes_read", original_size)
+
+            results = [None] * len(specs) # (輸出名稱, 大小)
+            cache_keys = [None] * len(specs) # (快取鍵, 副檔名)
+
+            # 結果快取：輸入內容與設定都相同的輸出直接沿用先前的編碼結果
+            if result_cache is not None:
+                digest = file_digest(normalized_path)
+                for i, spec in enumerate(specs):
+                    cached_ext = spec["format"].lower() if spec.get("format") else os.path.splitext(input_path)[1].lstrip('.')
+                    if not cached_ext:
+                        continue
+                    key = result_cache.make_key(digest, {
+                        "output_format": spec.get("format"),
+                        "output_ext": cached_ext,
+                        "quality": spec.get("quality"),
+                        "resize_options": spec.get("resize_options"),
+                        "crop_options": crop_options,
+                        "keep_metadata": keep_metadata,
+                        "keep_icc": keep_icc,
+                        "encoder_preset": spec.get("encoder_preset"),
+                        "encoder_options": spec.get("encoder_options"),
+                    })
+                    cache_keys[i] = (key, cached_ext)
+                timer.lap("hash")
+                for i, spec in enumerate(specs):
+                    if not cache_keys[i]:
+                        continue
+                    name = self._output_name(input_path, cache_keys[i][1], spec.get("name_suffix", ""), spec.get("subdir"))
+                    results[i] = self._place_cached(result_cache, cache_keys[i][0], output_dir, name, archive)
+                    if results[i]:
+                        timer.count("bytes_written", results[i][1])
+                        timer.count("cache_hits", 1)
+                if any(results):
+                    timer.lap("write")
+                if all(results):
+                    return self._render_summary(results, original_size)
 
             # 使用 'with open' 來開啟檔案，可以更好地處理路徑問題
             with open(normalized_path, 'rb') as f:
                 img = Image.open(f)
+                # 從檔頭讀取方向，決定縮放目標是否需要交換寬高
+                orientation = get_orientation(img)
+                swap_axes = orientation in SWAP_AXES_ORIENTATIONS
+                exif = img.getexif() if keep_metadata else None
+                icc_profile = img.info.get('icc_profile') if keep_icc else None
+                source_format = img.format
+
+                # 裁剪框：以顯示方向計算，再換算成儲存方向；每個輸出依填滿模式可能有各自的區域
+                display_size = (img.height, img.width) if swap_axes else img.size
+                crop_box = None
+                if crop_options and crop_options.get('type') != 'none':
+                    crop_box = self._compute_crop_box(display_size[0], display_size[1], crop_options)
+                plans = []
+                for i, spec in enumerate(specs):
+                    if results[i]:
+                        continue
+                    resize_options = spec.get("resize_options")
+                    display_box = crop_box
+                    if resize_options and resize_options.get('type') == 'fill' and resize_options.get('width') and resize_options.get('height'):
+                        # 填滿：先置中裁成目標比例，再縮放到精確尺寸
+                        display_box = self._fit_box_to_aspect(display_box or (0, 0) + tuple(display_size), resize_options)
+                    stored_box = display_box_to_stored(display_box, img.size, orientation) if display_box else None
+                    region_size = (stored_box[2] - stored_box[0], stored_box[3] - stored_box[1]) if stored_box else img.size
+                    target_size = None
+                    if resize_options and resize_options.get('type') != 'none':
+                        target_size = self._compute_stored_target(region_size, resize_options, swap_axes)
+                    plans.append({"index": i, "spec": spec, "box": stored_box, "region_size": region_size, "target": target_size})
+
+                if img.format == 'JPEG' and all(plan["target"] for plan in plans):
+                    # 縮小時讓 JPEG 解碼器直接以 1/2~1/8 比例解碼；
+                    # 有裁剪時依裁剪區域換算，確保縮小後的每個區域仍不小於各自的目標尺寸
+                    full_size = img.size
+                    requested = (
+                        max(math.ceil(full_size[0] * plan["target"][0] / plan["region_size"][0]) for plan in plans),
+                        max(math.ceil(full_size[1] * plan["target"][1] / plan["region_size"][1]) for plan in plans),
+                    )
+                    img.draft(img.mode, requested)
+                    if img.size != full_size:
+                        sx = img.width / full_size[0]
+                        sy = img.height / full_size[1]
+                        for plan in plans:
+                            box = plan["box"]
+                            if box:
+                                plan["box"] = (
+                                    int(box[0] * sx), int(box[1] * sy),
+                                    min(img.width, math.ceil(box[2] * sx)), min(img.height, math.ceil(box[3] * sy)),
+                                )
+
+                for plan in plans:
+                    box = plan["box"]
+                    plan["region_size"] = (box[2] - box[0], box[3] - box[1]) if box else img.size
+                    plan["output_size"] = plan["target"] or plan["region_size"]
+                # 由大到小處理，較小的輸出才能從較大的中間結果縮放
+                plans.sort(key=lambda plan: plan["output_size"][0] * plan["output_size"][1], reverse=True)
+
+                timer.lap("open")
+
+                # 解碼前依（draft 後的）檔頭尺寸預約記憶體，預算不足時在此等待；
+                # 除了最大的區域與輸出，其餘輸出作為中間結果保留到處理完成
+                if memory_budget is not None:
+                    region = None
+                    if any(plan["box"] for plan in plans):
+                        region = max((plan["region_size"] for plan in plans), key=lambda s: s[0] * s[1])
+                    reserved = estimate_working_set(img.size, img.mode, region, plans[0]["target"])
+                    reserved += 4 * sum(w * h for w, h in (plan["output_size"] for plan in plans[1:]))
+                    large_image = memory_budget.acquire(reserved)
+                    timer.lap("admit")
+
                 # 確保在檔案關閉前載入圖片資料
                 img.load()
-            
-            # 處理透明度問題：如果目標格式不支援透明度 (如 JPEG, BMP)，且圖片有 RGBA/P 模式，則轉換為 RGB
-            output_format_upper = output_format.upper()
-            if output_format_upper in ['JPEG', 'BMP'] and (img.mode == 'RGBA' or img.mode == 'P'):
-                img = img.convert('RGB')
-
-            # 圖片縮放
-            if resize_options and resize_options.get('type') != 'none':
-                img = self._resize_image(img, resize_options)
-
-            # 準備輸出路徑
-            base_name = os.path.basename(input_path)
-            file_name, _ = os.path.splitext(base_name)
-            output_path = os.path.join(output_dir, f"{file_name}.{output_format.lower()}")
-
-            # 準備儲存選項
-            save_options = {}
-            if output_format.upper() == 'JPEG':
-                save_options['quality'] = quality
-            elif output_format.upper() == 'GIF':
-                save_options['optimize'] = True
-            
-            # 儲存圖片
-            img.save(output_path, format=output_format, **save_options)
+                timer.lap("decode")
 
-            # 獲取壓縮後大小
-            compressed_size = os.path.getsize(output_path)
+            timer.count("bytes_decoded", img.width * img.height * len(img.getbands()))
+
+            intermediates = {} # (裁剪框, 模式) -> 由大到小的圖片，第一個是未縮放的區域
+            for plan in plans:
+                spec = plan["spec"]
+                output_format, output_ext = self._resolve_output_format(spec.get("format"), source_format, input_path)
+                output_format_upper = output_format.upper()
+
+                # 處理透明度問題：如果目標格式不支援透明度 (如 JPEG, BMP)，且圖片有 RGBA/P 模式，則轉換為 RGB
+                mode = 'RGB' if output_format_upper in ['JPEG', 'BMP'] and img.mode in ('RGBA', 'P') else img.mode
+                chain = intermediates.setdefault((plan["box"], mode), [])
+                if not chain:
+                    region = img
+                    if plan["box"]:
+                        region = img.crop(plan["box"])
+                        timer.lap("crop")
+                    if mode != img.mode:
+                        region = region.convert(mode)
+                    timer.lap("convert")
+                    chain.append(region)
+
+                # 圖片縮放（在儲存的方向上進行，目標尺寸已依方向交換）
+                target_size = plan["target"]
+                rendition = chain[0]
+                if target_size:
+                    rendition = min((c for c in chain if c.width >= target_size[0] and c.height >= target_size[1]),
+                                    key=lambda c: c.width * c.height, default=chain[0])
+                if target_size and target_size != rendition.size:
+                    reducing_gap = LARGE_IMAGE_REDUCING_GAP if large_image else None
+                    rendition = rendition.resize(target_size, LANCZOS, reducing_gap=reducing_gap)
+                    chain.append(rendition)
+                    timer.lap("resize")
+
+                # 轉正方向：在縮放後的較小圖片上 transpose
+                rendition = apply_orientation(rendition, orientation)
+                timer.lap("orient")
+
+                output_name = self._output_name(input_path, output_ext, spec.get("name_suffix", ""), spec.get("subdir"))
+                save_options = self._save_options(output_format_upper, spec.get("quality", 95), keep_metadata, keep_icc, exif, icc_profile,
+                                                  spec.get("encoder_preset"), spec.get("encoder_options"))
+                output_name, compressed_size, data = self._write_output(rendition, output_format, save_options, output_dir, output_name, archive, timer)
+                results[plan["index"]] = (output_name, compressed_size)
+
+                if cache_keys[plan["index"]]:
+                    key = cache_keys[plan["index"]][0]
+                    if data is not None:
+                        result_cache.store_bytes(key, data)
+                    else:
+                        result_cache.store_file(key, os.path.join(output_dir, output_name))
+                    timer.lap("cache")
 
             # 回傳詳細資訊
-            return {
-                "filename": os.path.basename(output_path),
-                "original_size": original_size,
-                "compressed_size": compressed_size
-            }
+            return self._render_summary(results, original_size)
 
         except Exception as e:
             # 將錯誤向上拋出，由外層的 process_batch 捕捉
             raise e
+        finally:
+            if reserved:
+                memory_budget.release(reserved)
+
+    def _resolve_output_format(self, output_format, source_format, input_path):
+        """回傳 (編碼格式, 副檔名)；未指定輸出格式時沿用原始格式與副檔名。"""
+        if output_format:
+            return output_format, output_format.lower()
+        output_format = 'JPEG' if source_format == 'MPO' else (source_format or 'PNG')
+        return output_format, os.path.splitext(input_path)[1].lstrip('.') or output_format.lower()
+
+    def _save_options(self, output_format_upper, quality, keep_metadata, keep_icc, exif, icc_profile, encoder_preset=None, overrides=None):
+        """依輸出格式與編碼預設準備 Image.save 的參數。"""
+        save_options = encoder_options(output_format_upper, quality, encoder_preset, overrides)
 
-    def _resize_image(self, img, resize_options):
+        # 中繼資料：保留時像素已轉正，因此將 orientation 重設為 1
+        if keep_metadata and output_format_upper in EXIF_FORMATS and exif:
+            exif[ORIENTATION_TAG] = 1
+            save_options['exif'] = exif.tobytes()
+        if output_format_upper in ICC_FORMATS:
+            if keep_icc and icc_profile:
+                save_options['icc_profile'] = icc_profile
+            elif not keep_icc:
+                # 明確移除，避免編碼器（例如 PNG）沿用 img.info 中的描述檔
+                save_options['icc_profile'] = None
+        return save_options
+
+    def _write_output(self, img, output_format, save_options, output_dir, output_name, archive, timer):
         """
-        根據提供的選項縮放圖片。
+        編碼並寫出一個輸出。
+
+        Returns:
+            tuple: (輸出名稱, 大小, 編碼後的 bytes)；寫入檔案時 bytes 為 None。
+        """
+        # 儲存圖片：封存模式在記憶體中編碼後直接寫入封存檔
+        if archive is not None:
+            buffer = io.BytesIO()
+            img.save(buffer, format=output_format, **save_options)
+            timer.lap("encode")
+            data = buffer.getvalue()
+            output_name = archive.write_bytes(output_name, data)
+            compressed_size = len(data)
+        else:
+            data = None
+            output_path = os.path.join(output_dir, output_name)
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            # 既有輸出可能是快取檔的硬連結，先移除再寫入，避免截斷快取內容
+            if os.path.exists(output_path) and os.stat(output_path).st_nlink > 1:
+                os.remove(output_path)
+            img.save(output_path, format=output_format, **save_options)
+            timer.lap("encode")
+            # 獲取壓縮後大小
+            compressed_size = os.path.getsize(output_path)
+        timer.lap("write")
+        timer.count("bytes_written", compressed_size)
+        return output_name, compressed_size, data
+
+    def _place_cached(self, result_cache, key, output_dir, output_name, archive):
+        """把快取結果放到輸出位置，回傳 (輸出名稱, 大小)；沒有快取時回傳 None。"""
+        if archive is not None:
+            data = result_cache.read_bytes(key)
+            if data is None:
+                return None
+            return archive.write_bytes(output_name, data), len(data)
+        output_path = os.path.join(output_dir, output_name)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        size = result_cache.materialize(key, output_path)
+        return (output_name, size) if size is not None else None
+
+    def _render_summary(self, results, original_size):
+        return {
+            "filename": results[0][0],
+            "outputs": [name for name, _ in results],
+            "original_size": original_size,
+            "compressed_size": sum(size for _, size in results),
+        }
+
+    def _output_name(self, input_path, output_ext, name_suffix, subdir=None):
+        file_name, _ = os.path.splitext(os.path.basename(input_path))
+        output_name = f"{file_name}{name_suffix}.{output_ext}"
+        # 封存檔成員一律以 "/" 分隔
+        return f"{subdir}/{output_name}" if subdir else output_name
+
+    def _compute_crop_box(self, width, height, crop_options):
+        """
+        依裁剪選項計算 (left, top, right, bottom)，座標以轉正後的圖片為準。
+
+        支援的 type：
+            'absolute': x, y, width, height（像素）
+            'percent':  x, y, width, height（相對於圖片寬高的百分比）
+            'aspect':   ratio=[寬, 高]，以 anchor=[0-1, 0-1] 決定位置，取該比例下最大的框
+        另外 process_batch 可傳入 {'type': 'boxes', 'boxes': {路徑: crop_options}} 逐檔指定。
+        超出圖片的部分會被截掉；裁剪後沒有剩餘範圍時拋出 ValueError。
+        """
+        crop_type = crop_options.get('type')
+
+        if crop_type == 'absolute':
+            x, y = crop_options.get('x', 0), crop_options.get('y', 0)
+            w, h = crop_options.get('width', width), crop_options.get('height', height)
+
+        elif crop_type == 'percent':
+            x = width * crop_options.get('x', 0) / 100
+            y = height * crop_options.get('y', 0) / 100
+            w = width * crop_options.get('width', 100) / 100
+            h = height * crop_options.get('height', 100) / 100
+
+        elif crop_type == 'aspect':
+            ratio_w, ratio_h = crop_options.get('ratio', (1, 1))
+            anchor_x, anchor_y = crop_options.get('anchor', (0.5, 0.5))
+            ratio = ratio_w / ratio_h
+            if width / height > ratio:
+                w, h = height * ratio, height
+            else:
+                w, h = width, width / ratio
+            x = (width - w) * anchor_x
+            y = (height - h) * anchor_y
+
+        else:
+            raise ValueError(f"Unknown crop type: {crop_type}")
+
+        left = max(0, min(int(round(x)), width))
+        top = max(0, min(int(round(y)), height))
+        right = min(width, left + int(round(w)))
+        bottom = min(height, top + int(round(h)))
+        if right <= left or bottom <= top:
+            raise ValueError("Crop box is outside the image")
+        return (left, top, right, bottom)
+
+    def _compute_stored_target(self, stored_size, resize_options, swap_axes=False):
+        """
+        依縮放選項計算在「儲存方向」上的目標尺寸。
+
+        縮放選項是以轉正後（顯示方向）的寬高描述，swap_axes 為 True 時
+        先交換來源寬高計算，再把結果交換回儲存方向。不需縮放時回傳 None。
+        """
+        width, height = stored_size
+        if swap_axes:
+            width, height = height, width
+        target = self._compute_resize_target(width, height, resize_options)
+        if not target:
+            return None
+        if swap_axes:
+            target = (target[1], target[0])
+        return target
+
+    def _fit_box_to_aspect(self, box, resize_options):
+        """在 box 內取出置中、符合目標寬高比的最大區域（填滿模式使用）。"""
+        left, top, right, bottom = box
+        box_w, box_h = right - left, bottom - top
+        ratio = resize_options['width'] / resize_options['height']
+        if box_w / box_h > ratio:
+            new_w = max(1, int(round(box_h * ratio)))
+            left += (box_w - new_w) // 2
+            return (left, top, left + new_w, bottom)
+        new_h = max(1, int(round(box_w / ratio)))
+        top += (box_h - new_h) // 2
+        return (left, top, right, top + new_h)
+
+    def _compute_resize_target(self, width, height, resize_options):
+        """
+        根據縮放選項計算目標尺寸 (寬, 高)，不需縮放時回傳 None。
+
+        支援的 type：
+            'scale':    value 為百分比
+            'fixed':    width, height；keep_aspect 為 True 時等同 'fit'
+            'fit':      縮放至完全放入 width x height，維持長寬比
+            'fill':     縮放至 width x height（來源需先依 _fit_box_to_aspect 裁成相同比例）
+            'max_edge': 長邊縮放為 value 像素，維持長寬比
+        no_enlarge 為 True 時不會放大超過原始尺寸。
         """
         resize_type = resize_options.get('type')
-        
+        no_enlarge = resize_options.get('no_enlarge', False)
+        target_w = resize_options.get('width')
+        target_h = resize_options.get('height')
+        if resize_type == 'fixed' and resize_options.get('keep_aspect'):
+            resize_type = 'fit'
+
         # 按比例縮放
         if resize_type == 'scale':
-            scale_percent = resize_options.get('value', 100)
-            new_width = int(img.width * scale_percent / 100)
-            new_height = int(img.height * scale_percent / 100)
-            return img.resize((new_width, new_height), LANCZOS)
-            
-        # 按固定尺寸縮放
+            scale = resize_options.get('value', 100) / 100
+
+        # 按固定尺寸縮放（不維持長寬比，各邊獨立限制）
         elif resize_type == 'fixed':
-            width = resize_options.get('width')
-            height = resize_options.get('height')
-            if width and height:
-                return img.resize((width, height), LANCZOS)
-                
-        return img
+            if not (target_w and target_h):
+                return None
+            if no_enlarge:
+                target_w, target_h = min(target_w, width), min(target_h, height)
+            return (target_w, target_h)
+
+        # 放入範圍內
+        elif resize_type == 'fit':
+            if not (target_w and target_h):
+                return None
+            scale = min(target_w / width, target_h / height)
+
+        # 填滿範圍：來源已是目標比例，兩邊縮放比例相同
+        elif resize_type == 'fill':
+            if not (target_w and target_h):
+                return None
+            if no_enlarge and (target_w > width or target_h > height):
+                scale = min(width / target_w, height / target_h)
+                return (max(1, int(target_w * scale)), max(1, int(target_h * scale)))
+            return (target_w, target_h)
+
+        # 限制最長邊
+        elif resize_type == 'max_edge':
+            edge = resize_options.get('value')
+            if not edge:
+                return None
+            scale = edge / max(width, height)
+
+        else:
+            return None
+
+        if no_enlarge:
+            scale = min(scale, 1.0)
+        return (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
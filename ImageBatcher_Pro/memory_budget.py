@@ -0,0 +1,138 @@
+#記憶體預算
+import os
+import threading
+import time
+
+# 未能取得實體記憶體大小時的預設預算
+FALLBACK_BUDGET_BYTES = 2 * 1024 ** 3
+# 預設預算佔實體記憶體的比例
+DEFAULT_BUDGET_FRACTION = 0.5
+# 單一模式的每個像素位元組數；多通道影像在 Pillow 內部一律以 32 位元儲存（RGB 也會補成 4 bytes）
+MODE_PIXEL_BYTES = {"1": 1, "L": 1, "P": 1, "I;16": 2, "I;16L": 2, "I;16B": 2, "I;16N": 2, "I": 4, "F": 4}
+
+
+def physical_memory_bytes():
+    """回傳實體記憶體大小，平台不支援時回傳 None。"""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_budget_bytes(fraction=DEFAULT_BUDGET_FRACTION):
+    """以實體記憶體的一部分作為解碼預算。"""
+    total = physical_memory_bytes()
+    return int(total * fraction) if total else FALLBACK_BUDGET_BYTES
+
+
+def pixel_bytes(mode):
+    """Pillow 儲存一個像素實際使用的位元組數。"""
+    return MODE_PIXEL_BYTES.get(mode, 4)
+
+
+def estimate_working_set(size, mode, region_size=None, target_size=None):
+    """
+    依檔頭資訊估計處理單一圖片的峰值記憶體（不需解碼）。
+
+    解碼後的來源加上處理過程中同時存在的一份衍生影像（裁剪、轉換或縮放的結果）；
+    衍生影像以最大的中間尺寸與 4 bytes/像素估計，涵蓋調色盤轉 RGBA 等情況。
+
+    Args:
+        size (tuple): 解碼尺寸 (寬, 高)，JPEG 已套用 draft 時為縮小後的尺寸。
+        mode (str): 圖片模式。
+        region_size (tuple): 裁剪後的尺寸，沒有裁剪時為 None。
+        target_size (tuple): 縮放目標尺寸，不縮放時為 None。
+
+    Returns:
+        int: 估計的位元組數。
+    """
+    decoded = size[0] * size[1] * pixel_bytes(mode)
+    derived = max(w * h for w, h in (region_size or size, target_size or (0, 0)))
+    return decoded + derived * 4
+
+
+class MemoryBudget:
+    """
+    以估計的解碼大小控制同時處理的圖片：預約的總量超過 limit 時，
+    新的工作會等待其他圖片處理完成並釋放預約。
+
+    超過 large_threshold 的圖片以獨佔方式執行：等到沒有其他圖片在處理才開始，
+    且執行期間不允許其他圖片進入。單張就超過 limit 的圖片也會以獨佔方式放行，
+    避免永遠等待。
+    """
+
+    def __init__(self, limit_bytes=None, large_threshold=None):
+        """
+        Args:
+            limit_bytes (int): 同時預約的上限，None 表示依實體記憶體決定。
+            large_threshold (int): 視為大圖的估計大小，None 表示 limit 的一半。
+        """
+        self.limit = limit_bytes or default_budget_bytes()
+        self.large_threshold = large_threshold or self.limit // 2
+        self.in_use = 0
+        self.peak = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self._exclusive = False
+        self._pending_exclusive = 0
+        self._condition = threading.Condition()
+
+    def is_large(self, nbytes):
+        return nbytes >= self.large_threshold
+
+    def _fits(self, nbytes, exclusive):
+        if self._exclusive:
+            return False
+        if exclusive or nbytes > self.limit:
+            return self.in_use == 0
+        # 有大圖在等待時不再放行新工作，讓進行中的工作結束後大圖能夠開始
+        return not self._pending_exclusive and self.in_use + nbytes <= self.limit
+
+    def acquire(self, nbytes, exclusive=None):
+        """
+        預約 nbytes，預算不足時阻塞直到可以放行。
+
+        Args:
+            nbytes (int): 估計的記憶體用量。
+            exclusive (bool): 是否獨佔，None 表示依 large_threshold 判斷。
+
+        Returns:
+            bool: 是否以獨佔方式放行。
+        """
+        if exclusive is None:
+            exclusive = self.is_large(nbytes)
+        exclusive = exclusive or nbytes > self.limit
+        with self._condition:
+            if not self._fits(nbytes, exclusive):
+                self.waits += 1
+                start = time.perf_counter()
+                if exclusive:
+                    self._pending_exclusive += 1
+                try:
+                    self._condition.wait_for(lambda: self._fits(nbytes, exclusive))
+                finally:
+                    if exclusive:
+                        self._pending_exclusive -= 1
+                self.wait_time += time.perf_counter() - start
+            self.in_use += nbytes
+            self.peak = max(self.peak, self.in_use)
+            self._exclusive = exclusive
+        return exclusive
+
+    def release(self, nbytes):
+        with self._condition:
+            self.in_use = max(0, self.in_use - nbytes)
+            if self.in_use == 0:
+                self._exclusive = False
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "large_threshold": self.large_threshold,
+                "in_use": self.in_use,
+                "peak": self.peak,
+                "waits": self.waits,
+                "wait_time": self.wait_time,
+            }
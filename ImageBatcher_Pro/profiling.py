@@ -0,0 +1,242 @@
+#效能分析
+import bisect
+import csv
+import json
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource # 僅 Unix 提供，用於讀取行程的峰值 RSS
+except ImportError:
+    resource = None
+
+# 階段耗時的直方圖分界（秒），與 Prometheus 預設的 bucket 相近
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def peak_rss_bytes():
+    """回傳目前行程的峰值常駐記憶體 (bytes)，平台不支援時回傳 None。"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 回報，macOS 以 bytes 回報
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageTimer:
+    """
+    以「分段計時」方式記錄單一檔案各處理階段的耗時。
+
+    每次呼叫 lap(name) 時，把上一個標記到現在的時間累加到該階段，
+    因此插入計時點不需要改動原本程式的縮排結構。
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.counters = {}
+        self._last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.timings[name] = self.timings.get(name, 0.0) + (now - self._last)
+        self._last = now
+
+    def count(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    @property
+    def total(self):
+        return sum(self.timings.values())
+
+
+class Histogram:
+    """固定分界的累計直方圖，同時保留總和、最小與最大值。"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # 最後一格為 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """以 bucket 上界估計分位數（與 Prometheus histogram_quantile 相同的精度）。"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets + (self.max,), self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+class BatchProfile:
+    """
+    彙整整批檔案的階段耗時直方圖、位元組計數與峰值記憶體，
+    批次結束時寫入所有 sink。
+
+    sink 是任何具有 write(summary) 方法的物件，例如 JsonSink、CsvSink、PrometheusSink。
+    """
+
+    def __init__(self, sinks=None, track_memory=False, buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            sinks (list): 批次結束時要寫入的 sink。
+            track_memory (bool): 是否記錄 Python 配置的峰值 (tracemalloc) 與行程峰值 RSS。
+            buckets (tuple): 直方圖分界（秒）。
+        """
+        self.sinks = list(sinks or [])
+        self.track_memory = track_memory
+        self.buckets = buckets
+        self.stages = {}
+        self.counters = {}
+        self.files = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._started_tracing = False
+        self._wall_start = None
+        self.wall_time = None
+        self.memory = {}
+
+    def start(self):
+        self._wall_start = time.perf_counter()
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+
+    def record(self, timer):
+        """加入一個成功處理的檔案的 StageTimer。"""
+        with self._lock:
+            self.files += 1
+            for name, seconds in timer.timings.items():
+                self.stages.setdefault(name, Histogram(self.buckets)).observe(seconds)
+            self.stages.setdefault("total", Histogram(self.buckets)).observe(timer.total)
+            for name, value in timer.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    def finish(self):
+        """結束計時、收集記憶體資訊並寫入所有 sink，回傳摘要。"""
+        if self._wall_start is not None:
+            self.wall_time = time.perf_counter() - self._wall_start
+        memory = {}
+        if self.track_memory:
+            memory["python_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+            memory["peak_rss_bytes"] = peak_rss_bytes()
+        self.memory = memory
+
+        summary = self.summary()
+        for sink in self.sinks:
+            sink.write(summary)
+        return summary
+
+    def summary(self):
+        with self._lock:
+            return {
+                "files": self.files,
+                "failures": self.failures,
+                "wall_time": self.wall_time,
+                "throughput": self.files / self.wall_time if self.wall_time else None,
+                "stages": {name: hist.to_dict() for name, hist in self.stages.items()},
+                "counters": dict(self.counters),
+                "memory": dict(self.memory),
+            }
+
+
+class JsonSink:
+    """把摘要完整寫成 JSON 檔。"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, summary):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+class CsvSink:
+    """每個階段一列：count, sum, mean, min, max, p50, p95, p99。"""
+
+    FIELDS = ("stage", "count", "sum", "mean", "min", "max", "p50", "p95", "p99")
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, summary):
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.FIELDS)
+            for name, stats in summary["stages"].items():
+                writer.writerow([name] + [stats[field] for field in self.FIELDS[1:]])
+
+
+class PrometheusSink:
+    """以 Prometheus 文字格式輸出，可交給 node_exporter 的 textfile collector。"""
+
+    def __init__(self, path, prefix="imagebatcher"):
+        self.path = path
+        self.prefix = prefix
+
+    def write(self, summary):
+        p = self.prefix
+        lines = [
+            f"# TYPE {p}_stage_seconds histogram",
+        ]
+        for name, stats in summary["stages"].items():
+            cumulative = 0
+            for bound, count in stats["buckets"].items():
+                cumulative += count
+                lines.append(f'{p}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_stage_seconds_sum{{stage="{name}"}} {stats["sum"]}')
+            lines.append(f'{p}_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+        # bytes_* 計數器放在同一個 _bytes_total 家族；其他計數（例如 cache_hits）各自輸出為 _<name>_total
+        byte_counters = {name: value for name, value in summary["counters"].items() if name.startswith("bytes_")}
+        lines.append(f"# TYPE {p}_bytes_total counter")
+        for name, value in byte_counters.items():
+            lines.append(f'{p}_bytes_total{{kind="{name}"}} {value}')
+        for name, value in summary["counters"].items():
+            if name not in byte_counters:
+                lines.append(f"# TYPE {p}_{name}_total counter")
+                lines.append(f"{p}_{name}_total {value}")
+        lines.append(f"# TYPE {p}_files_total counter")
+        lines.append(f'{p}_files_total{{status="success"}} {summary["files"]}')
+        lines.append(f'{p}_files_total{{status="failure"}} {summary["failures"]}')
+        for name, value in summary["memory"].items():
+            if value is not None:
+                lines.append(f"# TYPE {p}_{name} gauge")
+                lines.append(f"{p}_{name} {value}")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
@@ -0,0 +1,199 @@
+#結果快取
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from crop_presets import PRESET_DIR
+
+DEFAULT_CACHE_DIR = os.path.join(PRESET_DIR, "result_cache")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+# 處理流程的輸出改變時遞增，讓舊的快取自然失效
+CACHE_VERSION = 2
+HASH_CHUNK = 1024 * 1024
+
+
+def file_digest(path):
+    """計算檔案內容的 SHA-256。"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def settings_key(settings):
+    """
+    把處理設定正規化成穩定的字串：鍵排序、縮放與裁剪的 'none' 視為未設定，
+    格式一律大寫。
+    """
+    normalized = dict(settings)
+    for name in ("resize_options", "crop_options"):
+        options = normalized.get(name)
+        if not options or options.get("type") == "none":
+            normalized[name] = None
+    if normalized.get("output_format"):
+        normalized["output_format"] = normalized["output_format"].upper()
+    normalized["version"] = CACHE_VERSION
+    return json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class ResultCache:
+    """
+    以「輸入內容雜湊 + 正規化設定」為鍵的輸出快取。
+
+    命中時直接把快取的編碼結果以硬連結（不支援時複製）放到輸出位置，
+    不需重新解碼與編碼。快取總大小超過 max_bytes 時，依最後使用時間淘汰最舊的項目；
+    使用時間記錄在檔案的 mtime 上，重新啟動後仍能沿用。
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, link=True):
+        """
+        Args:
+            directory (str): 快取資料夾。
+            max_bytes (int): 快取總大小上限。
+            link (bool): 命中時是否優先使用硬連結。
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.link = link
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = {} # 鍵 -> [大小, 最後使用時間]
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".tmp"):
+                    continue # 上次中斷留下的暫存檔
+                stat = entry.stat()
+                self._entries[entry.name] = [stat.st_size, stat.st_mtime]
+                self._total += stat.st_size
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def make_key(self, digest, settings):
+        """以已計算的內容雜湊產生快取鍵，同一輸入的多個輸出只需雜湊一次。"""
+        combined = f"{digest}\n{settings_key(settings)}"
+        return hashlib.sha256(combined.encode("utf-8")).hexdigest()
+
+    def lookup(self, key):
+        """回傳快取檔路徑並更新使用時間，沒有時回傳 None。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry[1] = time.time()
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except OSError: # 檔案被外部刪除
+            self._missing(key)
+            return None
+        return path
+
+    def materialize(self, key, dest_path):
+        """
+        把快取結果放到 dest_path。
+
+        Returns:
+            int: 輸出檔大小；快取不存在（或剛被其他執行緒淘汰）時回傳 None。
+        """
+        source = self.lookup(key)
+        if source is None:
+            return None
+        # 先建立在暫存名稱再取代，不會截斷 dest_path 原本指向的檔案（可能是另一個硬連結）
+        tmp_path = dest_path + ".tmp"
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            try:
+                if not self.link:
+                    raise OSError
+                os.link(source, tmp_path)
+            except FileNotFoundError:
+                raise
+            except OSError:
+                shutil.copyfile(source, tmp_path)
+        except FileNotFoundError:
+            # lookup 之後快取檔被其他執行緒的 _evict 刪除，視為未命中
+            self._missing(key)
+            return None
+        os.replace(tmp_path, dest_path)
+        return os.path.getsize(dest_path)
+
+    def read_bytes(self, key):
+        """讀取快取內容（封存模式使用），沒有時回傳 None。"""
+        source = self.lookup(key)
+        if source is None:
+            return None
+        try:
+            with open(source, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            self._missing(key)
+            return None
+
+    def store_file(self, key, path):
+        """以複製的方式加入快取，之後修改輸出檔不會影響快取內容。"""
+        self._store(key, lambda tmp_path: shutil.copyfile(path, tmp_path))
+
+    def store_bytes(self, key, data):
+        def write(tmp_path):
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+        self._store(key, write)
+
+    def _store(self, key, write):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = [size, time.time()]
+            self._total += size
+            self._evict()
+
+    def _missing(self, key):
+        """命中的快取檔已不存在：移除項目，並把這次查詢改記為未命中。"""
+        with self._lock:
+            self._forget(key)
+            self.hits -= 1
+            self.misses += 1
+
+    def _forget(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._total -= entry[0]
+
+    def _evict(self):
+        """淘汰最久未使用的項目直到總大小不超過上限（需持有鎖）。"""
+        if self._total <= self.max_bytes:
+            return
+        for key, _ in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            self._forget(key)
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._total, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
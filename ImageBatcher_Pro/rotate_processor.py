@@ -0,0 +1,284 @@
+#旋轉圖片
+import os
+import shutil
+import struct
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from PIL import Image, ImageSequence # pyright: ignore[reportMissingImports]
+
+# 處理 Pillow 版本相容性問題
+try:
+    # Pillow 10.0.0+
+    Transpose = Image.Transpose
+except AttributeError:
+    # Pillow < 10.0.0
+    Transpose = Image
+
+ORIENTATION_TAG = 0x0112
+
+# 順時針旋轉角度對應的 transpose 方法（不需插值，也不會改變像素值）
+ROTATE_METHODS = {
+    90: Transpose.ROTATE_270,
+    180: Transpose.ROTATE_180,
+    270: Transpose.ROTATE_90,
+}
+
+# EXIF orientation 值對應「把儲存的像素轉成正確方向」所需的 transpose 方法
+ORIENTATION_METHODS = {
+    2: Transpose.FLIP_LEFT_RIGHT,
+    3: Transpose.ROTATE_180,
+    4: Transpose.FLIP_TOP_BOTTOM,
+    5: Transpose.TRANSPOSE,
+    6: Transpose.ROTATE_270,
+    7: Transpose.TRANSVERSE,
+    8: Transpose.ROTATE_90,
+}
+
+JPEG_FORMATS = ("JPEG", "MPO")
+
+
+def _build_orientation_table():
+    """
+    以一張小的非對稱圖片實際套用轉換，建立 (目前 orientation, 順時針角度) -> 新 orientation 的對照表。
+    """
+    probe = Image.new("L", (3, 2))
+    probe.putdata(range(6))
+
+    def display(orientation):
+        method = ORIENTATION_METHODS.get(orientation)
+        return probe.transpose(method) if method is not None else probe
+
+    displays = {o: display(o).tobytes() + bytes(display(o).size) for o in range(1, 9)}
+    table = {}
+    for orientation in range(1, 9):
+        for angle, method in ROTATE_METHODS.items():
+            target = display(orientation).transpose(method)
+            key = target.tobytes() + bytes(target.size)
+            table[(orientation, angle)] = next(o for o, d in displays.items() if d == key)
+    return table
+
+
+_ORIENTATION_TABLE = _build_orientation_table()
+
+
+def compose_orientation(orientation, angle):
+    """回傳在原本 orientation 之上再順時針旋轉 angle 度後的 orientation 值。"""
+    angle %= 360
+    if orientation not in ORIENTATION_METHODS:
+        orientation = 1
+    if angle == 0:
+        return orientation
+    return _ORIENTATION_TABLE[(orientation, angle)]
+
+
+def _iter_jpeg_segments(data):
+    """
+    依序產出 JPEG 檔頭區段 (marker, start, end)，遇到 SOS 後停止。
+    """
+    if data[:2] != b"\xff\xd8":
+        raise ValueError("Not a JPEG file")
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            raise ValueError("Corrupt JPEG marker")
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        yield marker, pos, pos + 2 + length
+        if marker == 0xDA: # SOS：之後為壓縮影像資料
+            return
+        pos += 2 + length
+
+
+def _patch_orientation(tiff, orientation):
+    """
+    直接改寫 TIFF/EXIF 區塊中 IFD0 的 orientation 值，其餘位元組完全不變。
+    找不到 orientation 標籤時回傳 None。
+    """
+    endian = {b"II": "<", b"MM": ">"}.get(bytes(tiff[:2]))
+    if endian is None:
+        return None
+    ifd_offset = struct.unpack(endian + "I", tiff[4:8])[0]
+    count = struct.unpack(endian + "H", tiff[ifd_offset:ifd_offset + 2])[0]
+    for i in range(count):
+        entry = ifd_offset + 2 + i * 12
+        tag, field_type = struct.unpack(endian + "HH", tiff[entry:entry + 4])
+        if tag == ORIENTATION_TAG and field_type == 3:
+            patched = bytearray(tiff)
+            patched[entry + 8:entry + 10] = struct.pack(endian + "H", orientation)
+            return bytes(patched)
+    return None
+
+
+def rewrite_jpeg_orientation(src_path, dst_path, angle):
+    """
+    只改寫 EXIF orientation 來旋轉 JPEG，壓縮資料原封不動（無損、無需解碼）。
+
+    Returns:
+        int: 寫入的新 orientation 值。
+    """
+    with open(src_path, "rb") as f:
+        data = f.read()
+
+    exif_segment = None
+    insert_at = 2
+    for marker, start, end in _iter_jpeg_segments(data):
+        if marker == 0xE1 and data[start + 4:start + 10] == b"Exif\x00\x00":
+            exif_segment = (start, end)
+            break
+        if marker in (0xE0,): # JFIF APP0 必須位於最前面
+            insert_at = end
+
+    if exif_segment:
+        start, end = exif_segment
+        tiff = data[start + 10:end]
+        with Image.open(src_path) as img:
+            current = img.getexif().get(ORIENTATION_TAG, 1)
+        new_orientation = compose_orientation(current, angle)
+        patched = _patch_orientation(tiff, new_orientation)
+        if patched is None:
+            # EXIF 中沒有 orientation 標籤，改以 Pillow 重建 EXIF 區塊
+            with Image.open(src_path) as img:
+                exif = img.getexif()
+            exif[ORIENTATION_TAG] = new_orientation
+            payload = exif.tobytes()
+        else:
+            payload = b"Exif\x00\x00" + patched
+        head, tail = data[:start], data[end:]
+    else:
+        new_orientation = compose_orientation(1, angle)
+        exif = Image.Exif()
+        exif[ORIENTATION_TAG] = new_orientation
+        payload = exif.tobytes()
+        head, tail = data[:insert_at], data[insert_at:]
+
+    if len(payload) + 2 > 0xFFFF:
+        raise ValueError("EXIF segment too large")
+    segment = b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+    with open(dst_path, "wb") as f:
+        f.write(head)
+        f.write(segment)
+        f.write(tail)
+    return new_orientation
+
+
+class RotateProcessor:
+    """負責旋轉圖片的存檔：JPEG 走無損路徑，其他格式只解碼與轉換一次。"""
+
+    def __init__(self, use_jpegtran=True):
+        """
+        Args:
+            use_jpegtran (bool): 系統有 jpegtran 時，優先用它在 DCT 域真正轉置像素。
+        """
+        self.jpegtran = shutil.which("jpegtran") if use_jpegtran else None
+
+    def rotate_file(self, src_path, dst_path, angle):
+        """
+        依累計的順時針角度旋轉單一檔案並儲存。
+
+        Returns:
+            str: 使用的方法 ("copy", "jpegtran", "exif", "transpose")。
+        """
+        angle %= 360
+        if angle % 90:
+            raise ValueError("Only multiples of 90 degrees are supported")
+        if angle == 0:
+            shutil.copy2(src_path, dst_path)
+            return "copy"
+
+        with Image.open(src_path) as img:
+            img_format = img.format
+            orientation = img.getexif().get(ORIENTATION_TAG, 1)
+
+        if img_format in JPEG_FORMATS:
+            # jpegtran 旋轉的是儲存的像素，只有在沒有 orientation 時結果才等同視覺旋轉
+            if self.jpegtran and orientation in (0, 1) and self._run_jpegtran(src_path, dst_path, angle):
+                return "jpegtran"
+            rewrite_jpeg_orientation(src_path, dst_path, angle)
+            return "exif"
+
+        self._transpose_and_save(src_path, dst_path, angle, orientation)
+        return "transpose"
+
+    def _run_jpegtran(self, src_path, dst_path, angle):
+        # -perfect：尺寸不是 MCU 倍數時失敗，而不是裁掉邊緣，失敗後改用 EXIF 路徑
+        cmd = [self.jpegtran, "-copy", "all", "-perfect", "-rotate", str(angle), "-outfile", dst_path, src_path]
+        try:
+            result = subprocess.run(cmd, capture_output=True, timeout=120)
+        except (OSError, subprocess.SubprocessError):
+            return False
+        if result.returncode != 0:
+            if os.path.exists(dst_path):
+                os.remove(dst_path)
+            return False
+        return True
+
+    def _transpose_and_save(self, src_path, dst_path, angle, orientation=1):
+        """
+        非 JPEG 格式：解碼一次、transpose 一次、編碼一次；動態圖片逐格處理。
+        EXIF orientation 與旋轉角度合併為單一 transpose，輸出不再帶 orientation。
+        """
+        method = ORIENTATION_METHODS.get(compose_orientation(orientation, angle))
+        with Image.open(src_path) as img:
+            img_format = img.format
+            if getattr(img, "n_frames", 1) > 1:
+                frames = [frame.copy() for frame in ImageSequence.Iterator(img)]
+                if method is not None:
+                    frames = [frame.transpose(method) for frame in frames]
+                save_options = {
+                    "save_all": True,
+                    "append_images": frames[1:],
+                    "loop": img.info.get("loop", 0),
+                    "duration": img.info.get("duration", 100),
+                }
+                frames[0].save(dst_path, format=img_format, **save_options)
+                return
+            img.load()
+            save_options = {}
+            if "icc_profile" in img.info:
+                save_options["icc_profile"] = img.info["icc_profile"]
+            if method is not None:
+                img = img.transpose(method)
+            img.save(dst_path, format=img_format, **save_options)
+
+    def rotate_batch(self, jobs, output_dir, max_workers=None, progress_callback=None):
+        """
+        以多執行緒平行旋轉並儲存多個檔案。
+
+        Args:
+            jobs (list): (來源路徑, 順時針角度) 的列表。
+            output_dir (str): 輸出資料夾。
+            max_workers (int): 執行緒數，None 表示依 CPU 核心數決定。
+            progress_callback (function): 每完成一個檔案呼叫一次，接收結果字典。
+
+        Returns:
+            list: 成功輸出的檔案路徑。
+        """
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        def output_path(src_path):
+            name, ext = os.path.splitext(os.path.basename(src_path))
+            return os.path.join(output_dir, f"{name}_rotated{ext}")
+
+        total = len(jobs)
+        saved = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.rotate_file, src, output_path(src), angle): src
+                for src, angle in jobs
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                src = futures[future]
+                try:
+                    method = future.result()
+                    saved.append(output_path(src))
+                    result = {"filename": os.path.basename(src), "status": "success", "method": method}
+                except Exception as e:
+                    result = {"filename": os.path.basename(src), "status": "failure", "message": str(e)}
+                result["progress"] = done / total * 100
+                if progress_callback:
+                    progress_callback(result)
+        return saved
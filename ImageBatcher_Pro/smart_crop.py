@@ -0,0 +1,118 @@
+#自動裁剪
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+from PIL import Image # pyright: ignore[reportMissingImports]
+
+from image_processor import SWAP_AXES_ORIENTATIONS, get_orientation, load_oriented_thumbnail
+
+# 分析用縮圖的最長邊；JPEG 會透過 draft 以 DCT 縮放直接解碼成接近此尺寸
+ANALYSIS_SIZE = 256
+
+
+def saliency_map(img):
+    """
+    以灰階梯度強度作為顯著度：邊緣與紋理多的區域分數較高，平坦背景分數接近 0。
+
+    Returns:
+        numpy.ndarray: 與圖片同尺寸的 float32 陣列。
+    """
+    gray = np.asarray(img.convert("L"), dtype=np.float32)
+    saliency = np.zeros_like(gray)
+    saliency[:, 1:] += np.abs(np.diff(gray, axis=1))
+    saliency[1:, :] += np.abs(np.diff(gray, axis=0))
+    return saliency
+
+
+def best_crop_box(saliency, ratio):
+    """
+    找出指定寬高比下顯著度總和最大的裁剪框。
+
+    裁剪框取該比例下最大的尺寸，因此只會沿一個方向滑動，
+    以累積和在 O(寬 + 高) 內算出所有位置的分數。分數相同時取最靠近中央的位置。
+
+    Args:
+        saliency (numpy.ndarray): saliency_map 的結果。
+        ratio (float): 目標寬 / 高。
+
+    Returns:
+        tuple: (left, top, right, bottom)，座標以 saliency 的尺寸為準。
+    """
+    height, width = saliency.shape
+    if width / height > ratio:
+        box_w, box_h = max(1, int(round(height * ratio))), height
+        profile = saliency.sum(axis=0)
+    else:
+        box_w, box_h = width, max(1, int(round(width / ratio)))
+        profile = saliency.sum(axis=1)
+
+    window = box_w if box_h == height else box_h
+    cumulative = np.concatenate(([0.0], np.cumsum(profile, dtype=np.float64)))
+    scores = cumulative[window:] - cumulative[:-window]
+    candidates = np.flatnonzero(scores >= scores.max() - 1e-6)
+    center = (len(scores) - 1) / 2
+    offset = int(candidates[np.argmin(np.abs(candidates - center))])
+
+    if box_h == height:
+        return (offset, 0, offset + box_w, height)
+    return (0, offset, width, offset + box_h)
+
+
+def find_smart_crop(file_path, ratio):
+    """
+    在縮小的轉正圖片上計算顯著度，回傳原始解析度（轉正後座標）的裁剪選項。
+
+    Returns:
+        dict: {'type': 'absolute', 'x', 'y', 'width', 'height'}，可直接作為 crop_options。
+    """
+    with Image.open(file_path) as img:
+        full_w, full_h = img.size
+        if get_orientation(img) in SWAP_AXES_ORIENTATIONS:
+            full_w, full_h = full_h, full_w
+
+    thumb = load_oriented_thumbnail(file_path, (ANALYSIS_SIZE, ANALYSIS_SIZE))
+    left, top, right, bottom = best_crop_box(saliency_map(thumb), ratio)
+
+    # 換算回原始解析度，並以原始尺寸重新對齊目標比例
+    scale_x = full_w / thumb.width
+    scale_y = full_h / thumb.height
+    if full_w / full_h > ratio:
+        width, height = int(round(full_h * ratio)), full_h
+        x = min(max(0, int(round(left * scale_x))), full_w - width)
+        y = 0
+    else:
+        width, height = full_w, int(round(full_w / ratio))
+        x = 0
+        y = min(max(0, int(round(top * scale_y))), full_h - height)
+    return {"type": "absolute", "x": x, "y": y, "width": width, "height": height}
+
+
+def analyze_batch(file_list, ratio, max_workers=None, progress_callback=None):
+    """
+    平行分析多個檔案的自動裁剪框。
+
+    Args:
+        file_list (list): 圖片檔案路徑。
+        ratio (float): 目標寬 / 高。
+        max_workers (int): 執行緒數，None 表示依 CPU 核心數決定。
+        progress_callback (function): 每完成一個檔案呼叫一次，接收結果字典。
+
+    Returns:
+        dict: 檔案路徑 -> crop_options；分析失敗的檔案不會出現在結果中。
+    """
+    total = len(file_list)
+    boxes = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(find_smart_crop, path, ratio): path for path in file_list}
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                boxes[path] = future.result()
+                result = {"filename": os.path.basename(path), "status": "success"}
+            except Exception as e:
+                result = {"filename": os.path.basename(path), "status": "failure", "message": str(e)}
+            result["progress"] = done / total * 100
+            if progress_callback:
+                progress_callback(result)
+    return boxes
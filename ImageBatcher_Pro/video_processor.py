@@ -1,38 +1,323 @@
 #影片截圖
+import io
+import os
+import time
+from array import array
+from collections import OrderedDict
+
 import cv2
-from PIL import Image
+import numpy as np
+from PIL import GifImagePlugin, Image, ImageChops, ImageFile
+
+
+class SceneDetector:
+    """
+    以縮小後的灰階影格比較相鄰畫面，判斷是否為場景變化。
+
+    只保留上一張影格的特徵（直方圖或雜湊值），不保留任何完整影格，
+    因此可以處理任意長度的影片。
+    """
+
+    def __init__(self, method="hist", threshold=0.35, min_gap=0, sample_size=(64, 36)):
+        """
+        Args:
+            method (str): "hist" 使用灰階直方圖距離，"phash" 使用差異雜湊 (dHash)。
+            threshold (float): 新穎度門檻 (0-1)，超過才視為場景變化。
+            min_gap (int): 兩次輸出之間至少間隔的影格數，避免閃光造成連續輸出。
+            sample_size (tuple): 計算直方圖時的縮小尺寸。
+        """
+        if method not in ("hist", "phash"):
+            raise ValueError(f"Unknown scene detection method: {method}")
+        self.method = method
+        self.threshold = threshold
+        self.min_gap = min_gap
+        self.sample_size = sample_size
+        self.reset()
+
+    def reset(self):
+        """清除上一張影格的特徵。"""
+        self._last_feature = None
+        self._last_emit_index = None
+
+    def _feature(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.method == "hist":
+            small = cv2.resize(gray, self.sample_size, interpolation=cv2.INTER_AREA)
+            hist = cv2.calcHist([small], [0], None, [32], [0, 256])
+            cv2.normalize(hist, hist)
+            return hist
+        # dHash: 9x8 縮圖，比較水平相鄰像素
+        small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+        return (small[:, 1:] > small[:, :-1]).flatten()
+
+    def _distance(self, a, b):
+        if self.method == "hist":
+            # Bhattacharyya 距離：0 為相同，1 為完全不同
+            return cv2.compareHist(a, b, cv2.HISTCMP_BHATTACHARYYA)
+        return float((a != b).sum()) / a.size
+
+    def score(self, frame):
+        """
+        計算影格相對於上一張影格的新穎度 (0-1)，並更新內部狀態。
+        第一張影格的新穎度為 1。
+        """
+        feature = self._feature(frame)
+        if self._last_feature is None:
+            novelty = 1.0
+        else:
+            novelty = self._distance(self._last_feature, feature)
+        self._last_feature = feature
+        return novelty
+
+    def is_new_scene(self, frame, frame_index):
+        """判斷影格是否應該輸出。"""
+        novelty = self.score(frame)
+        if novelty < self.threshold:
+            return False
+        if self._last_emit_index is not None and frame_index - self._last_emit_index < self.min_gap:
+            return False
+        self._last_emit_index = frame_index
+        return True
+
+
+# 可選的解碼後端名稱對應 OpenCV 常數（不支援的平台會略過）
+VIDEO_BACKENDS = {
+    "auto": "CAP_ANY",
+    "ffmpeg": "CAP_FFMPEG",
+    "gstreamer": "CAP_GSTREAMER",
+    "msmf": "CAP_MSMF",
+    "dshow": "CAP_DSHOW",
+    "avfoundation": "CAP_AVFOUNDATION",
+}
+# 這些容器沒有逐格索引，CAP_PROP_FRAME_COUNT 多半是以長度與 fps 推算的估計值
+UNRELIABLE_FRAME_COUNT_EXTENSIONS = (".webm", ".mkv", ".flv", ".ts", ".m2ts", ".mts", ".ogv", ".vob", ".wmv", ".asf")
+
+
+class _ExportCancelled(Exception):
+    """匯出途中取消，用來中止編碼器的迭代。"""
+
+
+class _FrameStream(ImageFile.ImageFile):
+    """
+    以多影格影像（n_frames / seek）逐格提供解碼中的影格，
+    讓 save_all 的 append_images 不必先持有整段影格。
+
+    依 Pillow 自訂影像外掛的方式實作：_open 設定模式與尺寸，seek 取得下一格後
+    以 raw 解碼器的 tile 描述像素，由 load() 解碼，不直接替換 Image 的內部緩衝區
+    （已在 Pillow 12.3 驗證）。
+    只能依序 seek；來源提早結束時重複最後一格補足 n_frames。
+    """
+
+    format = "FRAMES"
+    format_description = "Decoded video frames"
+
+    def __init__(self, first, frames, n_frames):
+        self._frames = frames
+        self._first = first
+        self._frame_count = n_frames
+        super().__init__(io.BytesIO())
+
+    def _open(self):
+        self._mode = self._first.mode
+        self._size = self._first.size
+        self.n_frames = self._frame_count
+        self.is_animated = self._frame_count > 1
+        self.decoded = 0
+        self._index = -1
+        self._data = self._first.tobytes() # 來源沒有更多影格時重複使用
+        self._first = None
+
+    def seek(self, frame):
+        while self._index < frame:
+            image = next(self._frames, None)
+            if image is not None:
+                self._data = image.tobytes()
+                self.decoded += 1
+            self._index += 1
+        self.fp = io.BytesIO(self._data)
+        self.tile = [("raw", (0, 0) + self.size, 0, (self.mode, 0, 1))]
+
+    def tell(self):
+        return self._index
+
 
 class VideoProcessor:
     """使用 OpenCV 處理影片載入和畫面擷取。"""
     
     def __init__(self):
         self.cap = None
+        self.file_path = None
         self.total_frames = 0
         self.fps = 0
         self.duration = 0
+        self.width = 0
+        self.height = 0
+        # 最後顯示的影格，切換工作階段後可回到原位置
+        self.position = 0
+        # 解碼設定，背景擷取（場景偵測、動畫匯出）也使用相同設定
+        self.backend = "auto"
+        self.threads = None
+        # 影格數預設取自中繼資料，VFR 影片常常不準，需掃描後才確定
+        self.frame_count_verified = False
+        self._frame_timestamps = None
+        self._decode_frames = 0
+        self._decode_seconds = 0.0
+        # 顯示用的預先配置緩衝區，尺寸改變時才重新配置
+        self._resize_buf = None
+        self._rgb_buf = None
+
+    def _open_capture(self):
+        """依目前的後端與執行緒設定開啟新的 VideoCapture。"""
+        api = getattr(cv2, VIDEO_BACKENDS.get(self.backend, "CAP_ANY"), cv2.CAP_ANY)
+        threads = self.threads if self.threads else (os.cpu_count() or 1)
+        if hasattr(cv2, "CAP_PROP_N_THREADS"):
+            try:
+                cap = cv2.VideoCapture(self.file_path, api, [cv2.CAP_PROP_N_THREADS, threads])
+                if cap.isOpened():
+                    return cap
+                cap.release()
+            except cv2.error:
+                pass
+        # 舊版 OpenCV 或後端不接受參數時，退回預設開啟方式
+        return cv2.VideoCapture(self.file_path, api)
         
-    def load_video(self, file_path):
-        """載入影片檔案。"""
+    def load_video(self, file_path, backend="auto", threads=None):
+        """
+        載入影片檔案。
+
+        Args:
+            file_path (str): 影片路徑。
+            backend (str): 解碼後端，見 VIDEO_BACKENDS。
+            threads (int): 解碼執行緒數，None 表示使用所有 CPU 核心。
+        """
+        if backend not in VIDEO_BACKENDS:
+            raise ValueError(f"Unknown video backend: {backend}")
         if self.cap:
             self.cap.release()
-            
-        self.cap = cv2.VideoCapture(file_path)
+
+        self.file_path = file_path
+        self.backend = backend
+        self.threads = threads
+        self.cap = self._open_capture()
         if not self.cap.isOpened():
             raise ValueError("Could not open video file")
+        self.frame_count_verified = False
+        self._frame_timestamps = None
+        self._decode_frames = 0
+        self._decode_seconds = 0.0
             
         self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
         self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.position = 0
         if self.fps > 0:
             self.duration = self.total_frames / self.fps
         else:
             self.duration = 0
             
+        return self.get_info()
+
+    def get_info(self):
+        """回傳目前影片的基本資訊。"""
         return {
             "total_frames": self.total_frames,
             "fps": self.fps,
-            "duration": self.duration
+            "duration": self.duration,
+            "frame_count_verified": self.frame_count_verified
+        }
+
+    def frame_count_needs_scan(self):
+        """中繼資料的影格數是否不可靠，需要掃描才能確定。"""
+        if self.frame_count_verified or not self.file_path:
+            return False
+        if self.total_frames <= 0 or self.fps <= 0:
+            return True
+        return os.path.splitext(self.file_path)[1].lower() in UNRELIABLE_FRAME_COUNT_EXTENSIONS
+
+    def scan_frame_timestamps(self, progress_callback=None, cancel_event=None):
+        """
+        以獨立的 VideoCapture 掃描整部影片每一格的時間戳，只 grab 不轉換成影像。
+
+        不修改處理器的狀態，可在背景執行緒中執行；完成後於 UI 執行緒呼叫
+        apply_frame_timestamps 更新影格數與長度，之後可用 timestamp_of 查詢實際時間。
+
+        Args:
+            progress_callback (function): 接收 (已掃描影格, 中繼資料影格數) 的回報函式。
+            cancel_event (threading.Event): 設定後中止掃描。
+
+        Returns:
+            array: 每格的時間戳 (ms)；取消時回傳 None。
+        """
+        if not self.file_path:
+            return None
+        cap = self._open_capture()
+        if not cap.isOpened():
+            raise ValueError("Could not open video file")
+        timestamps = array("d")
+        try:
+            while cap.grab():
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+                if progress_callback and len(timestamps) % 500 == 0:
+                    progress_callback(len(timestamps), self.total_frames)
+        finally:
+            cap.release()
+        return timestamps
+
+    def apply_frame_timestamps(self, timestamps):
+        """套用 scan_frame_timestamps 的結果，更新影格數與長度，回傳實際影格數。"""
+        self._frame_timestamps = timestamps
+        self.total_frames = len(timestamps)
+        if len(timestamps) > 1 and timestamps[-1] > timestamps[0]:
+            # 以實際時間戳推算，VFR 影片的長度才會正確
+            frame_interval = (timestamps[-1] - timestamps[0]) / (len(timestamps) - 1)
+            self.duration = (timestamps[-1] - timestamps[0] + frame_interval) / 1000
+        elif self.fps > 0:
+            self.duration = self.total_frames / self.fps
+        self.frame_count_verified = True
+        return self.total_frames
+
+    def timestamp_of(self, frame_index):
+        """回傳影格的時間（秒）；已掃描時使用實際時間戳，否則以 fps 推算。"""
+        if self._frame_timestamps and 0 <= frame_index < len(self._frame_timestamps):
+            return self._frame_timestamps[frame_index] / 1000
+        return frame_index / self.fps if self.fps > 0 else 0
+
+    def _read(self):
+        """讀取下一張影格並累計解碼耗時。"""
+        start = time.perf_counter()
+        ret, frame = self.cap.read()
+        self._decode_seconds += time.perf_counter() - start
+        if ret:
+            self._decode_frames += 1
+        return ret, frame
+
+    def get_decode_stats(self):
+        """回傳預覽擷取的解碼統計：影格數、耗時（秒）與每秒解碼影格數。"""
+        fps = self._decode_frames / self._decode_seconds if self._decode_seconds > 0 else 0
+        return {
+            "frames": self._decode_frames,
+            "seconds": self._decode_seconds,
+            "decode_fps": fps,
+            "backend": self.cap.getBackendName() if self.cap and self.cap.isOpened() else self.backend,
+            "threads": self.threads or (os.cpu_count() or 1),
         }
 
+    def estimated_memory(self):
+        """
+        估算此工作階段佔用的記憶體（位元組）。
+
+        解碼器通常保留數張參考影格，這裡以 4 張原始 BGR 影格估算，
+        再加上顯示用緩衝區。
+        """
+        frame_bytes = self.width * self.height * 3
+        display_bytes = 0
+        if self._resize_buf is not None:
+            display_bytes = self._resize_buf.nbytes + self._rgb_buf.nbytes
+        return frame_bytes * 4 + display_bytes
+
     def get_frame(self, frame_index):
         """擷取特定影格並轉換為 PIL 圖片。"""
         if not self.cap or not self.cap.isOpened():
@@ -40,7 +325,7 @@ class VideoProcessor:
             
         # Set position
         self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-        ret, frame = self.cap.read()
+        ret, frame = self._read()
         
         if ret:
             frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -52,7 +337,7 @@ class VideoProcessor:
         if not self.cap or not self.cap.isOpened():
             return None, -1
             
-        ret, frame = self.cap.read()
+        ret, frame = self._read()
         if ret:
             # Get current frame index
             idx = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
@@ -60,8 +345,346 @@ class VideoProcessor:
             return Image.fromarray(frame_rgb), idx
         return None, -1
 
+    def _to_display_buffer(self, frame, max_width, max_height):
+        """
+        在 BGR 緩衝區上先縮放再轉色，並寫入預先配置的緩衝區。
+
+        回傳的 NumPy 陣列會在下一次呼叫時被覆寫，呼叫端需在此之前使用完畢。
+        """
+        src_h, src_w = frame.shape[:2]
+        scale = min(max_width / src_w, max_height / src_h)
+        new_w = max(1, int(src_w * scale))
+        new_h = max(1, int(src_h * scale))
+
+        if self._resize_buf is None or self._resize_buf.shape[:2] != (new_h, new_w):
+            self._resize_buf = np.empty((new_h, new_w, 3), dtype=np.uint8)
+            self._rgb_buf = np.empty((new_h, new_w, 3), dtype=np.uint8)
+
+        # 縮小時 INTER_AREA 品質最佳，放大時使用較快的 INTER_LINEAR
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        cv2.resize(frame, (new_w, new_h), dst=self._resize_buf, interpolation=interpolation)
+        cv2.cvtColor(self._resize_buf, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
+        return self._rgb_buf
+
+    def get_display_frame(self, frame_index, max_width, max_height):
+        """擷取特定影格，縮放至顯示尺寸並回傳 RGB 緩衝區。"""
+        if not self.cap or not self.cap.isOpened():
+            return None
+
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        ret, frame = self._read()
+        if ret:
+            self.position = frame_index
+            return self._to_display_buffer(frame, max_width, max_height)
+        return None
+
+    def get_next_display_frame(self, max_width, max_height):
+        """擷取下一個影格（用於播放迴圈），縮放至顯示尺寸並回傳 (RGB 緩衝區, 索引)。"""
+        if not self.cap or not self.cap.isOpened():
+            return None, -1
+
+        ret, frame = self._read()
+        if ret:
+            idx = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+            self.position = idx
+            return self._to_display_buffer(frame, max_width, max_height), idx
+        return None, -1
+
+    def iter_scene_frames(self, detector=None, step=1, start_frame=0, end_frame=None, progress_callback=None):
+        """
+        依序讀取影片並只產出場景變化的影格。
+
+        使用獨立的 VideoCapture 順序解碼，不影響預覽用的播放位置，
+        且每次只持有一張影格，適合在背景執行緒處理長影片。
+
+        Args:
+            detector (SceneDetector): 場景偵測器，預設使用直方圖方式。
+            step (int): 每隔幾張影格比較一次，跳過的影格只 grab 不轉換。
+            start_frame (int): 起始影格。
+            end_frame (int): 結束影格（不含），None 表示到影片結尾。
+            progress_callback (function): 接收 (目前影格, 總影格) 的回報函式。
+
+        Yields:
+            tuple: (影格索引, PIL 圖片)
+        """
+        if not self.file_path:
+            return
+        detector = detector or SceneDetector()
+        detector.reset()
+        step = max(1, int(step))
+
+        cap = self._open_capture()
+        if not cap.isOpened():
+            raise ValueError("Could not open video file")
+        try:
+            if start_frame > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            total = end_frame if end_frame is not None else self.total_frames
+            idx = start_frame
+            while end_frame is None or idx < end_frame:
+                if (idx - start_frame) % step:
+                    # 不需要比較的影格只 grab，省去解碼後的色彩轉換
+                    if not cap.grab():
+                        break
+                    idx += 1
+                    continue
+
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if detector.is_new_scene(frame, idx):
+                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    yield idx, Image.fromarray(frame_rgb)
+                if progress_callback:
+                    progress_callback(idx, total)
+                idx += 1
+        finally:
+            cap.release()
+
+    def _build_shared_palette(self, cap, start_frame, end_frame, size, samples=12):
+        """
+        從區間內平均取樣數張影格，拼成一張圖後量化，產生所有影格共用的調色盤。
+        共用調色盤可避免 GIF 每一格色彩跳動，也讓每格只需做一次查表量化。
+        """
+        count = max(1, min(samples, end_frame - start_frame))
+        stride = (end_frame - start_frame) / count
+        width, height = size
+        mosaic = Image.new("RGB", (width, height * count))
+        for i in range(count):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(start_frame + i * stride))
+            ret, frame = cap.read()
+            if not ret:
+                continue
+            small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            mosaic.paste(Image.fromarray(cv2.cvtColor(small, cv2.COLOR_BGR2RGB)), (0, i * height))
+        return mosaic.quantize(colors=256, method=Image.Quantize.MEDIANCUT)
+
+    def export_clip(self, output_path, start_frame, end_frame, fps=10, max_size=480,
+                    max_frames=1500, progress_callback=None, cancel_event=None):
+        """
+        將影片區間匯出為動態 GIF 或 WebP。
+
+        以獨立的 VideoCapture 依序解碼，不需要的影格只 grab；每張輸出影格
+        立即在 BGR 緩衝區上縮小，並在解碼後馬上交給編碼器，不會累積整段影格，
+        記憶體用量與片段長度無關。
+        GIF 會先建立共用調色盤，再將每張影格量化為 P 模式並逐格寫入檔案；
+        WebP 影格維持 RGB，不經過調色盤。
+        輸出先寫入暫存檔，完成後才取代 output_path，取消或失敗時不留下不完整的檔案。
+
+        Args:
+            output_path (str): 輸出檔案路徑，副檔名決定格式 (.gif / .webp)。
+            start_frame (int): 起點影格（含）。
+            end_frame (int): 終點影格（含）。
+            fps (float): 輸出動畫的每秒影格數。
+            max_size (int): 輸出動畫最長邊的像素數。
+            max_frames (int): 允許的最大輸出影格數，超過則拋出 ValueError。
+            progress_callback (function): 接收 (已完成影格, 總影格) 的回報函式。
+            cancel_event (threading.Event): 設定後中止匯出。
+
+        Returns:
+            int: 輸出的影格數，取消時回傳 0。
+        """
+        if not self.file_path:
+            raise ValueError("No video loaded")
+        ext = os.path.splitext(output_path)[1].lower()
+        if ext not in (".gif", ".webp"):
+            raise ValueError(f"Unsupported animation format: {ext}")
+
+        start_frame = max(0, int(start_frame))
+        end_frame = int(end_frame)
+        if end_frame < start_frame:
+            start_frame, end_frame = end_frame, start_frame
+
+        src_fps = self.fps if self.fps > 0 else 30
+        fps = min(fps, src_fps)
+        src_step = src_fps / fps
+        total = int((end_frame - start_frame) / src_step) + 1
+        if total > max_frames:
+            raise ValueError(f"Clip too long: {total} frames (max {max_frames})")
+
+        scale = min(1.0, max_size / max(self.width, self.height))
+        size = (max(1, int(self.width * scale)), max(1, int(self.height * scale)))
+        duration = int(round(1000 / fps))
+
+        cap = self._open_capture()
+        if not cap.isOpened():
+            raise ValueError("Could not open video file")
+        tmp_path = output_path + ".part"
+        try:
+            palette = None
+            if ext == ".gif":
+                palette = self._build_shared_palette(cap, start_frame, end_frame + 1, size)
+
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            frames = self._iter_clip_frames(cap, start_frame, end_frame, src_step, total, size, palette,
+                                             progress_callback, cancel_event)
+            first = next(frames, None)
+            if first is None:
+                if cancel_event is not None and cancel_event.is_set():
+                    return 0
+                raise ValueError("No frames decoded in the selected range")
+
+            if ext == ".gif":
+                with open(tmp_path, "wb") as f:
+                    count = self._write_gif_stream(f, first, frames, duration)
+            else:
+                stream = _FrameStream(first, frames, total - 1)
+                first.save(tmp_path, format="WEBP", save_all=True, append_images=[stream],
+                           duration=duration, loop=0, quality=80)
+                count = 1 + stream.decoded
+            if cancel_event is not None and cancel_event.is_set():
+                return 0
+            os.replace(tmp_path, output_path)
+            return count
+        except _ExportCancelled:
+            return 0
+        finally:
+            cap.release()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _iter_clip_frames(self, cap, start_frame, end_frame, src_step, total, size, palette,
+                          progress_callback=None, cancel_event=None):
+        """
+        依序產生匯出用的影格（已縮小；有 palette 時量化為 P 模式）。
+
+        產生第一格之後才取消時拋出 _ExportCancelled，讓編碼器中止。
+        """
+        next_pick = float(start_frame)
+        idx = start_frame
+        count = 0
+        while idx <= end_frame and count < total:
+            if cancel_event is not None and cancel_event.is_set():
+                if count:
+                    raise _ExportCancelled()
+                return
+            if idx < int(round(next_pick)):
+                if not cap.grab():
+                    break
+                idx += 1
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+            small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            image = Image.fromarray(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+            if palette is not None:
+                image = image.quantize(palette=palette, dither=Image.Dither.FLOYDSTEINBERG)
+            count += 1
+            next_pick += src_step
+            idx += 1
+            if progress_callback:
+                progress_callback(count, total)
+            yield image
+
+    def _write_gif_stream(self, fp, first, frames, duration):
+        """
+        逐格寫出共用調色盤的 GIF，只保留上一格用來計算變動區域。
+
+        與 Pillow 的 save_all 相同，之後的影格只寫入與上一格不同的矩形區域。
+
+        Returns:
+            int: 寫入的影格數。
+        """
+        header, _ = GifImagePlugin.getheader(first, None, {"loop": 0, "duration": duration})
+        fp.write(b"".join(header))
+        fp.write(b"".join(GifImagePlugin.getdata(first, duration=duration)))
+        previous = first
+        count = 1
+        for frame in frames:
+            # 所有影格使用同一調色盤，索引值相同即顏色相同
+            bbox = ImageChops.difference(frame, previous).getbbox() or (0, 0, 1, 1)
+            fp.write(b"".join(GifImagePlugin.getdata(frame.crop(bbox), offset=bbox[:2], duration=duration)))
+            previous = frame
+            count += 1
+        fp.write(b";")
+        return count
 
     def release(self):
         """釋放影片資源。"""
         if self.cap:
             self.cap.release()
+            self.cap = None
+        self._resize_buf = None
+        self._rgb_buf = None
+
+
+class VideoSessionPool:
+    """
+    保留多個已開啟的影片工作階段，避免切換影片時重複開檔與探測。
+
+    以 LRU 順序管理，超過數量上限或記憶體預算時釋放最久未使用的工作階段。
+    """
+
+    def __init__(self, max_sessions=4, memory_budget_mb=512, on_release=None):
+        """
+        Args:
+            max_sessions (int): 同時保留的工作階段數量上限。
+            memory_budget_mb (int): 所有工作階段估算記憶體的總預算 (MB)。
+            on_release (function): 工作階段被釋放（淘汰或關閉）時以影片路徑呼叫，
+                                   例如取消該影片仍在進行的背景工作。
+        """
+        self.max_sessions = max(1, max_sessions)
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.on_release = on_release
+        self._sessions = OrderedDict()
+
+    @staticmethod
+    def _key(file_path):
+        return os.path.normcase(os.path.abspath(file_path))
+
+    def acquire(self, file_path, **load_options):
+        """
+        取得指定影片的工作階段；若尚未開啟則載入，並標記為最近使用。
+
+        Args:
+            file_path (str): 影片路徑。
+            **load_options: 傳給 VideoProcessor.load_video 的解碼設定。
+
+        Returns:
+            VideoProcessor: 已載入影片的處理器。
+        """
+        key = self._key(file_path)
+        processor = self._sessions.get(key)
+        if processor is not None and processor.cap is not None and processor.cap.isOpened():
+            self._sessions.move_to_end(key)
+            return processor
+
+        processor = VideoProcessor()
+        processor.load_video(file_path, **load_options)
+        self._sessions[key] = processor
+        self._sessions.move_to_end(key)
+        self._evict(keep=key)
+        return processor
+
+    def _evict(self, keep=None):
+        """依 LRU 順序釋放工作階段，直到符合數量與記憶體限制。"""
+        while len(self._sessions) > 1:
+            over_count = len(self._sessions) > self.max_sessions
+            over_budget = self.memory_usage() > self.memory_budget
+            if not over_count and not over_budget:
+                break
+            oldest_key = next(iter(self._sessions))
+            if oldest_key == keep:
+                break
+            self._release(self._sessions.pop(oldest_key))
+
+    def memory_usage(self):
+        """所有工作階段估算的記憶體總和（位元組）。"""
+        return sum(p.estimated_memory() for p in self._sessions.values())
+
+    def release_all(self):
+        """關閉所有工作階段。"""
+        for processor in self._sessions.values():
+            self._release(processor)
+        self._sessions.clear()
+
+    def _release(self, processor):
+        if self.on_release:
+            self.on_release(processor.file_path)
+        processor.release()
+
+    def paths(self):
+        """回傳目前開啟的影片路徑，最近使用的排在最前面。"""
+        return [p.file_path for p in reversed(self._sessions.values())]
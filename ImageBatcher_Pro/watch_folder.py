@@ -0,0 +1,359 @@
+#監看資料夾
+"""
+持續監看輸入資料夾，新檔案寫入完成後自動以 ImageProcessor 轉換。
+
+有安裝 watchdog 時使用系統事件（Linux 為 inotify），否則以輪詢掃描資料夾。
+兩種方式都會等檔案大小與修改時間維持不變一段時間才開始處理，避免讀到寫到一半的檔案。
+狀態定期寫入 JSON 檔，可供監控或其他程式讀取。
+
+用法：
+    python watch_folder.py /mnt/share/camera -o /mnt/share/converted --format JPEG --quality 85 --max-edge 2048
+    python watch_folder.py in1 in2 -o out --status watch_status.json --workers 2 --existing
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from watchdog.events import FileSystemEventHandler # pyright: ignore[reportMissingImports]
+    from watchdog.observers import Observer # pyright: ignore[reportMissingImports]
+except ImportError: # 未安裝 watchdog 時改用輪詢
+    FileSystemEventHandler = object
+    Observer = None
+
+from encoder_presets import PRESET_NAMES
+from file_discovery import IMAGE_EXTENSIONS, iter_image_files
+from image_processor import ImageProcessor
+from memory_budget import MemoryBudget
+
+# 狀態檔中保留的最近結果數
+RECENT_RESULTS = 20
+
+
+class _EventHandler(FileSystemEventHandler):
+    """把 watchdog 的建立、修改與移入事件轉成候選檔案。"""
+
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.dest_path)
+
+
+class WatchFolder:
+    """
+    監看一或多個資料夾並持續轉換新的圖片。
+
+    候選檔案的大小與修改時間連續 stable_seconds 沒有改變才會排入佇列；
+    同時處理的檔案數不超過 max_workers，其餘在佇列中等待。
+    已處理過的檔案以 (大小, 修改時間) 記錄，內容被覆寫時會重新轉換。
+    """
+
+    def __init__(self, input_dirs, output_dir, output_format="JPEG", quality=95, resize_options=None,
+                 keep_metadata=False, name_suffix="", recursive=True, max_workers=2, poll_interval=2.0,
+                 stable_seconds=2.0, status_path=None, process_existing=False, use_watchdog=True, memory_budget=None,
+                 encoder_preset=None, keep_icc=True):
+        """
+        Args:
+            input_dirs (list): 要監看的資料夾。
+            output_dir (str): 輸出資料夾；子資料夾中的檔案會保留相對路徑。
+            output_format, quality, resize_options, keep_metadata, name_suffix: 與 process_batch 相同。
+            recursive (bool): 是否包含子資料夾。
+            max_workers (int): 同時轉換的檔案數上限。
+            poll_interval (float): 檢查候選檔案（及輪詢模式下掃描資料夾）的間隔秒數。
+            stable_seconds (float): 檔案需維持不變多久才視為寫入完成。
+            status_path (str): 狀態 JSON 檔路徑，None 表示不寫入。
+            process_existing (bool): 是否處理啟動時已存在的檔案。
+            use_watchdog (bool): 有安裝 watchdog 時是否使用系統事件。
+            memory_budget (MemoryBudget): 解碼記憶體預算，None 表示依實體記憶體建立。
+            encoder_preset (str): 編碼預設，與 process_batch 相同。
+            keep_icc (bool): 是否保留 ICC 色彩描述檔，與 process_batch 相同。
+        """
+        self.input_dirs = [os.path.abspath(d) for d in input_dirs]
+        self.output_dir = os.path.abspath(output_dir)
+        self.settings = {
+            "output_format": output_format,
+            "quality": quality,
+            "resize_options": resize_options,
+            "keep_metadata": keep_metadata,
+            "name_suffix": name_suffix,
+            "encoder_preset": encoder_preset,
+            "keep_icc": keep_icc,
+        }
+        self.recursive = recursive
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.stable_seconds = stable_seconds
+        self.status_path = status_path
+        self.process_existing = process_existing
+        self.backend = "watchdog" if use_watchdog and Observer is not None else "polling"
+        self.memory_budget = memory_budget or MemoryBudget()
+        self.processor = ImageProcessor()
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._candidates = {} # 路徑 -> (大小, 修改時間, 最後一次變動的時間)
+        self._queue = [] # 已穩定、等待轉換的路徑
+        self._queued = set()
+        self._active = set()
+        self._processed = {} # 路徑 -> (大小, 修改時間)
+        self._failed = {} # 轉換失敗的檔案，內容改變前不再重試
+        self._recent = []
+        self._counts = {"processed": 0, "failed": 0}
+        self._started = None
+        self._executor = None
+
+    # --- 探索 ---
+    def _is_input(self, path):
+        path = os.path.abspath(path)
+        if not path.lower().endswith(IMAGE_EXTENSIONS):
+            return False
+        # 輸出資料夾位於輸入資料夾內時，避免把輸出再當成輸入
+        return not (path + os.sep).startswith(self.output_dir + os.sep)
+
+    def notify(self, path):
+        """
+        登記一個可能是新檔案或已變動的路徑（可由任何執行緒呼叫）。
+
+        (大小, 修改時間) 與已處理或已失敗的記錄相同時直接略過，
+        輪詢時未變動的檔案不會再進入候選清單。
+        """
+        if not self._is_input(path):
+            return
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return # 已被刪除或移走
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if signature in (self._processed.get(path), self._failed.get(path)):
+                return
+            if path not in self._candidates and path not in self._queued and path not in self._active:
+                self._candidates[path] = signature + (time.monotonic(),)
+
+    def _scan(self):
+        for directory in self.input_dirs:
+            for path in iter_image_files(directory, recursive=self.recursive):
+                self.notify(path)
+
+    def _mark_existing(self):
+        """把啟動時已存在的檔案記為已處理。"""
+        for directory in self.input_dirs:
+            for path in iter_image_files(directory, recursive=self.recursive):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                self._processed[os.path.abspath(path)] = (stat.st_size, stat.st_mtime_ns)
+
+    def _check_candidates(self):
+        """檔案大小與修改時間維持不變 stable_seconds 後移入佇列。"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = list(self._candidates.items())
+        for path, (size, mtime, changed_at) in candidates:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                with self._lock:
+                    self._candidates.pop(path, None) # 已被刪除或移走
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            with self._lock:
+                if current != (size, mtime):
+                    self._candidates[path] = current + (now,)
+                elif now - changed_at >= self.stable_seconds:
+                    del self._candidates[path]
+                    done = current in (self._processed.get(path), self._failed.get(path))
+                    if not done and stat.st_size > 0:
+                        self._queue.append(path)
+                        self._queued.add(path)
+                        self._queued.add(path)
+
+    # --- 轉換 ---
+    def _output_dir_for(self, path):
+        for directory in self.input_dirs:
+            if (path + os.sep).startswith(directory + os.sep):
+                relative = os.path.relpath(os.path.dirname(path), directory)
+                return os.path.normpath(os.path.join(self.output_dir, relative))
+        return self.output_dir
+
+    def _convert(self, path):
+        start = time.time()
+        signature = None
+        try:
+            stat = os.stat(path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+            s = self.settings
+            result = self.processor.convert_file(
+                path, self._output_dir_for(path), s["output_format"], quality=s["quality"],
+                resize_options=s["resize_options"], keep_metadata=s["keep_metadata"], keep_icc=s["keep_icc"],
+                name_suffix=s["name_suffix"], memory_budget=self.memory_budget, encoder_preset=s["encoder_preset"],
+            )
+            entry = {"file": path, "status": "success", "output": result["filename"],
+                     "original_size": result["original_size"], "compressed_size": result["compressed_size"]}
+        except Exception as e:
+            entry = {"file": path, "status": "failure", "message": str(e)}
+        entry["duration"] = time.time() - start
+        entry["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+        with self._lock:
+            self._active.discard(path)
+            succeeded = entry["status"] == "success"
+            self._counts["processed" if succeeded else "failed"] += 1
+            if signature:
+                (self._processed if succeeded else self._failed)[path] = signature
+            self._recent = ([entry] + self._recent)[:RECENT_RESULTS]
+        # 空出的位置立即交給佇列中的下一個檔案，不必等到下一次輪詢
+        self._dispatch()
+
+    def _dispatch(self):
+        """在不超過 max_workers 的前提下，把佇列中的檔案交給執行緒池。"""
+        with self._lock:
+            if self._executor is None or self._stop.is_set():
+                return
+            while self._queue and len(self._active) < self.max_workers:
+                path = self._queue.pop(0)
+                self._queued.discard(path)
+                self._active.add(path)
+                self._executor.submit(self._convert, path)
+
+    # --- 狀態 ---
+    def status(self):
+        with self._lock:
+            return {
+                "state": "stopped" if self._stop.is_set() else "running",
+                "backend": self.backend,
+                "watching": self.input_dirs,
+                "output_dir": self.output_dir,
+                "started_at": self._started,
+                "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "pending": len(self._candidates),
+                "queued": len(self._queue),
+                "active": sorted(self._active),
+                "processed": self._counts["processed"],
+                "failed": self._counts["failed"],
+                "recent": list(self._recent),
+            }
+
+    def _write_status(self):
+        if not self.status_path:
+            return
+        # 先寫入暫存檔再取代，讀取端不會讀到寫到一半的內容
+        tmp_path = self.status_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.status(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.status_path)
+
+    # --- 主迴圈 ---
+    def run(self):
+        """持續監看直到呼叫 stop()。"""
+        self._started = time.strftime("%Y-%m-%dT%H:%M:%S")
+        os.makedirs(self.output_dir, exist_ok=True)
+        if not self.process_existing:
+            self._mark_existing()
+
+        observer = None
+        if self.backend == "watchdog":
+            observer = Observer()
+            handler = _EventHandler(self)
+            for directory in self.input_dirs:
+                observer.schedule(handler, directory, recursive=self.recursive)
+            observer.start()
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            self._scan() # 事件模式也先掃描一次，涵蓋啟動前就存在但尚未處理的檔案
+            while not self._stop.is_set():
+                self._check_candidates()
+                self._dispatch()
+                self._write_status()
+                self._stop.wait(self.poll_interval)
+                if self.backend == "polling":
+                    self._scan()
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            self._stop.set() # 進行中的檔案完成後不再派送新的檔案
+            with self._lock:
+                self._queue.clear()
+                self._queued.clear()
+                executor, self._executor = self._executor, None
+            executor.shutdown(wait=True) # 等待進行中的檔案完成
+            self._write_status()
+
+    def stop(self):
+        self._stop.set()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="監看資料夾並自動轉換新圖片")
+    parser.add_argument("input_dirs", nargs="+", help="要監看的資料夾")
+    parser.add_argument("-o", "--output", required=True, help="輸出資料夾")
+    parser.add_argument("--format", default="JPEG", help="輸出格式；KEEP 表示沿用原始格式 (預設 JPEG)")
+    parser.add_argument("--quality", type=int, default=95, help="JPEG 品質 (預設 95)")
+    resize = parser.add_mutually_exclusive_group()
+    resize.add_argument("--scale", type=int, help="依百分比縮放")
+    resize.add_argument("--max-edge", type=int, help="限制最長邊的像素數")
+    parser.add_argument("--keep-metadata", action="store_true", help="保留 EXIF")
+    parser.add_argument("--strip-icc", action="store_true", help="移除 ICC 色彩描述檔（預設保留）")
+    parser.add_argument("--preset", choices=PRESET_NAMES, help="編碼預設 (fast / balanced / smallest)")
+    parser.add_argument("--suffix", default="", help="附加在輸出檔名後的字串")
+    parser.add_argument("--no-recursive", action="store_true", help="不包含子資料夾")
+    parser.add_argument("--workers", type=int, default=2, help="同時轉換的檔案數 (預設 2)")
+    parser.add_argument("--poll", type=float, default=2.0, help="檢查間隔秒數 (預設 2)")
+    parser.add_argument("--stable", type=float, default=2.0, help="檔案需維持不變的秒數 (預設 2)")
+    parser.add_argument("--status", help="狀態 JSON 檔路徑")
+    parser.add_argument("--existing", action="store_true", help="也處理啟動時已存在的檔案")
+    parser.add_argument("--polling", action="store_true", help="即使有 watchdog 也使用輪詢")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    resize_options = {"type": "none"}
+    if args.scale:
+        resize_options = {"type": "scale", "value": args.scale}
+    elif args.max_edge:
+        resize_options = {"type": "max_edge", "value": args.max_edge, "no_enlarge": True}
+
+    watcher = WatchFolder(
+        args.input_dirs, args.output,
+        output_format=None if args.format.upper() == "KEEP" else args.format.upper(),
+        quality=args.quality, resize_options=resize_options, keep_metadata=args.keep_metadata,
+        name_suffix=args.suffix, recursive=not args.no_recursive, max_workers=args.workers,
+        poll_interval=args.poll, stable_seconds=args.stable, status_path=args.status,
+        process_existing=args.existing, use_watchdog=not args.polling, encoder_preset=args.preset,
+        keep_icc=not args.strip_icc,
+    )
+    # SIGTERM（例如 systemd 停止服務）與 Ctrl+C 都會在目前的檔案完成後結束
+    signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+    print(f"監看 {', '.join(watcher.input_dirs)} -> {watcher.output_dir}（{watcher.backend}）")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    status = watcher.status()
+    print(f"已停止：成功 {status['processed']}，失敗 {status['failed']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())